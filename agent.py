@@ -1,48 +1,185 @@
 # agent.py
 
-import time
-import requests
-from config import USER_ID, SERVER_URL, SEND_INTERVAL
-from features.file_work.file_activity import collect_file_features
+import signal
+import argparse
+import threading
+from config import (
+    USER_ID, SERVER_URL, SEND_INTERVAL, WARMUP_AFTER_FIRST_TICK, COLLECTOR_SCHEDULE,
+    OUTBOX_FILE, OUTBOX_MAX_SAMPLES, OUTBOX_MAX_BYTES, SERVER_BATCH_URL, SEND_BATCH_SIZE, SEND_GZIP, SEND_TIMEOUT,
+    SEND_BINARY, TELEMETRY_PORT, TELEMETRY_HOST, SEND_AGENT_HEALTH, PROFILE_TRIGGER_FILE, PROFILE_DIR,
+    PROFILE_SAMPLE_INTERVAL, AGENT_NICE, AGENT_IONICE_IDLE, GOVERNOR_MAX_BACKOFF,
+    RELAY_HOST, RELAY_PORT, RELAY_CONNECTIONS, RELAY_BATCH_SIZE, RELAY_BATCH_DELAY, RELAY_RESPONSE_TIMEOUT,
+    RELAY_MEMORY_SAMPLES, RELAY_SPILL_FILE, RELAY_SPILL_MAX_SAMPLES, RELAY_SPILL_MAX_BYTES, RELAY_MAX_BODY,
+    RELAY_MAX_AGENTS, RELAY_IDLE_TIMEOUT, UPLOAD_TOP_REPORTED
+)
+from features.file_work.file_activity import (
+    collect_file_features, get_analysis_cache_stats, get_scan_queue_stats, take_late_results
+)
 from features.process_activity.processes_work import collect_process_features
-from features.behavioral_context.behavioral_signs import collect_behavioral_context
+from features.behavioral_context.behavioral_signs import collect_behavioral_context, get_clipboard_stats
 from features.usb_activity.usb_monitor import collect_usb_features
-from features.network_activity.network_monitor import collect_network_features
+from features.network_activity.network_monitor import (
+    collect_network_features, get_resolver_stats, get_sampler_stats, get_top_uploaders
+)
 from utils.system import get_timestamp
+from utils.scheduler import CollectorScheduler, combine_features
+from utils.outbox import Outbox
+from utils.sender import Sender
+from utils import telemetry
+from utils.governor import GOVERNOR, lower_priority
+from utils.relay import Relay, serve as serve_relay
+from utils.text_extraction import warm_up as warm_up_extraction
+from features.file_work.file_classifier import warm_up as warm_up_file_model
+from features.network_activity.site_semantic_evaluator import warm_up as warm_up_site_model
+from features.network_activity.site_semantic_evaluator import get_score_cache
 
 
-def send_to_server(features: dict):
+_sender = None
+
+
+def get_sender() -> Sender:
+    global _sender
+    if _sender is None:
+        outbox = Outbox(OUTBOX_FILE, OUTBOX_MAX_SAMPLES, OUTBOX_MAX_BYTES)
+        _sender = Sender(
+            SERVER_URL, outbox, batch_url=SERVER_BATCH_URL, batch_size=SEND_BATCH_SIZE,
+            timeout=SEND_TIMEOUT, use_gzip=SEND_GZIP, use_binary=SEND_BINARY
+        ).start()
+    return _sender
+
+
+def send_to_server(features: dict, stale=()):
+    """Ставит образец в очередь отправки; доставка — в фоновом потоке."""
     payload = {
         "user_id": USER_ID,
         "timestamp": get_timestamp(),
         "features": features  # <-- группы признаков
     }
+    if stale:
+        # Группы, сборщики которых не уложились в срок (значения из прошлого образца)
+        payload["stale_groups"] = list(stale)
+
+    get_sender().submit(payload)
+
+
+def start_telemetry():
+    """Источники метрик агента и HTTP-сервер /metrics (если задан TELEMETRY_PORT)."""
+    telemetry.REGISTRY.add_source("analysis_cache", get_analysis_cache_stats)
+    telemetry.REGISTRY.add_source("dns_cache", get_resolver_stats)
+    telemetry.REGISTRY.add_source("site_cache", lambda: get_score_cache().stats())
+    telemetry.REGISTRY.add_source("conn_sampler", get_sampler_stats)
+    telemetry.REGISTRY.add_source("clipboard", get_clipboard_stats)
+    telemetry.REGISTRY.add_source("sender", lambda: get_sender().stats())
+    telemetry.REGISTRY.add_source("governor", GOVERNOR.stats)
+    telemetry.REGISTRY.add_source("scan_queue", get_scan_queue_stats)
+    if TELEMETRY_PORT:
+        if telemetry.start_metrics_server(TELEMETRY_PORT, TELEMETRY_HOST):
+            print(f"📈 Метрики агента: http://{TELEMETRY_HOST}:{TELEMETRY_PORT}/metrics")
+
+
+def warm_up():
+    """Фоновая загрузка моделей и библиотек разбора, чтобы первый документ не ждал их."""
+    for step in (warm_up_extraction, warm_up_file_model, warm_up_site_model):
+        try:
+            step()
+        except Exception as e:
+            print(f"⚠️ Ошибка фоновой загрузки: {e}")
 
-    try:
-        response = requests.post(SERVER_URL, json=payload, timeout=5)
-        if response.status_code == 200:
-            risk = response.json().get("risk_level")
-            print(f"[{payload['timestamp']}] ✅ Отправлено → уровень риска: {risk}")
-        else:
-            print(f"[{payload['timestamp']}] ⚠️ Ошибка сервера: {response.status_code} → {response.text}")
-    except requests.exceptions.RequestException as e:
-        print(f"[{payload['timestamp']}] ❌ Ошибка соединения: {e}")
+
+# Сборщики признаков; combine объединяет результаты частых запусков за интервал отправки
+COLLECTORS = {
+    "file_activity": (collect_file_features, None),
+    "process_activity": (collect_process_features, combine_features(
+        sum_keys=("unknown_processes_started", "time_in_terminal_sec"),
+        max_keys=("admin_tools_used", "automation_tool_detected", "screen_capture_tools_used")
+    )),
+    "behavioral_context": (collect_behavioral_context, combine_features(
+        sum_keys=("clipboard_sensitive_matches", "clipboard_sensitive_events"),
+        max_keys=("activity_outside_work_hours", "activity_weekend_hours")
+    )),
+    "usb_activity": (collect_usb_features, None),
+    "network_activity": (collect_network_features, None),
+}
+
+
+def build_scheduler(on_sample) -> CollectorScheduler:
+    scheduler = CollectorScheduler(SEND_INTERVAL, on_sample, max_backoff=GOVERNOR_MAX_BACKOFF)
+    for name, (func, combine) in COLLECTORS.items():
+        interval, deadline = COLLECTOR_SCHEDULE.get(name, (SEND_INTERVAL, SEND_INTERVAL))
+        scheduler.add(name, func, interval, deadline, combine)
+    return scheduler
 
 
 def main_loop():
-    print("🗂️  Агент DLP: мониторинг файловой активности активен\n")
+    # До запуска потоков: в Linux приоритет наследуется от создающего потока
+    applied = lower_priority(AGENT_NICE, AGENT_IONICE_IDLE)
+    print("🗂️  Агент DLP: мониторинг файловой активности активен"
+          + (f" (приоритет: {', '.join(applied)})" if applied else "") + "\n")
+
+    start_telemetry()
+    health = telemetry.HealthTracker(
+        queue_length=lambda: len(get_sender().outbox),
+        deferred=lambda: GOVERNOR.last_period()["deferred"]
+    )
+    profiler = telemetry.TickProfiler(PROFILE_TRIGGER_FILE, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL)
+    first_tick = True
+
+    def on_sample(features, stale):
+        nonlocal first_tick
+        if SEND_AGENT_HEALTH:
+            features["agent_health"] = health.sample(scheduler.durations(), stale)
+        # Документы, проанализированные позже интервала, в котором они изменились
+        late = take_late_results()
+        if late:
+            features["file_activity_late"] = {"intervals": late}
+        # Кто выгружал данные в этом интервале (учёт по процессам, Linux)
+        uploaders = get_top_uploaders(UPLOAD_TOP_REPORTED) if UPLOAD_TOP_REPORTED else {}
+        if uploaders:
+            features["network_uploaders"] = uploaders
+        send_to_server(features, stale)
+        profiler.on_sample()
+        if first_tick and WARMUP_AFTER_FIRST_TICK:
+            threading.Thread(target=warm_up, name="dlp-warmup", daemon=True).start()
+        first_tick = False
 
-    while True:
-        features = {
-            "file_activity": collect_file_features(),
-            "process_activity": collect_process_features(),
-            "behavioral_context": collect_behavioral_context(),
-            "usb_activity": collect_usb_features(),
-            "network_activity": collect_network_features()
-        }
-        send_to_server(features)
-        time.sleep(SEND_INTERVAL)
+    scheduler = build_scheduler(on_sample)
+    telemetry.REGISTRY.add_source("collector_interval", scheduler.intervals)
+    scheduler.run_forever()
+
+
+def relay_loop(host=RELAY_HOST, port=RELAY_PORT):
+    """Режим ретранслятора: приём образцов агентов и пересылка на сервер (см. utils/relay.py)."""
+    relay = Relay(
+        SERVER_URL, SERVER_BATCH_URL, connections=RELAY_CONNECTIONS, spill_path=RELAY_SPILL_FILE,
+        max_memory=RELAY_MEMORY_SAMPLES, spill_samples=RELAY_SPILL_MAX_SAMPLES, spill_bytes=RELAY_SPILL_MAX_BYTES,
+        batch_size=RELAY_BATCH_SIZE, batch_delay=RELAY_BATCH_DELAY, response_timeout=RELAY_RESPONSE_TIMEOUT,
+        timeout=SEND_TIMEOUT, use_gzip=SEND_GZIP, max_agents=RELAY_MAX_AGENTS
+    ).start()
+    telemetry.REGISTRY.add_source("relay", relay.stats)
+    if TELEMETRY_PORT:
+        telemetry.start_metrics_server(TELEMETRY_PORT, TELEMETRY_HOST)
+
+    server = serve_relay(relay, host, port, max_body=RELAY_MAX_BODY, idle_timeout=RELAY_IDLE_TIMEOUT)
+    # SIGTERM (остановка службы): serve_forever завершается, очереди переносятся на диск
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"📡 Ретранслятор DLP: приём на {host}:{port}, пересылка на {SERVER_BATCH_URL or SERVER_URL}\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        relay.stop()
+        print(f"✅ Ретранслятор остановлен, в очереди на диске: {relay.stats()['queued']}")
 
 
 if __name__ == "__main__":
-    main_loop()
+    parser = argparse.ArgumentParser(description="Агент DLP")
+    parser.add_argument("--relay", action="store_true", help="режим ретранслятора образцов других агентов")
+    parser.add_argument("--host", default=RELAY_HOST, help="адрес приёма в режиме ретранслятора")
+    parser.add_argument("--port", type=int, default=RELAY_PORT, help="порт приёма в режиме ретранслятора")
+    args = parser.parse_args()
+    if args.relay:
+        relay_loop(args.host, args.port)
+    else:
+        main_loop()
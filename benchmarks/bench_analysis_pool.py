@@ -0,0 +1,57 @@
+# benchmarks/bench_analysis_pool.py
+#
+# Пропускная способность сканирования документов (док/с) в зависимости от числа
+# рабочих процессов AnalysisPool. Документы — синтетические .txt с
+# чувствительным содержимым.
+# Запуск из корня репозитория: python -m benchmarks.bench_analysis_pool [число_документов] [размер_КБ]
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+from features.file_work.file_activity import scan_document
+from features.file_work.analysis_pool import AnalysisPool
+from benchmarks.bench_detection import make_prose
+
+
+def make_documents(folder, count, size_kb, rng):
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"doc_{i:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(make_prose(size_kb * 1024, rng))
+        paths.append(path)
+    return paths
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    size_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = make_documents(folder, count, size_kb, rng)
+        print(f"{count} документов по {size_kb} КБ, ядер: {os.cpu_count()}")
+
+        start = time.perf_counter()
+        for path in paths:
+            scan_document(path)
+        elapsed = time.perf_counter() - start
+        print(f"  без пула        {count / elapsed:8.1f} док/с")
+
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            pool = AnalysisPool(workers)
+            pool.run(paths[:workers])  # запуск процессов и загрузка моделей
+            start = time.perf_counter()
+            pool.run(paths)
+            elapsed = time.perf_counter() - start
+            pool.close()
+            print(f"  процессов: {workers:<3}  {count / elapsed:8.1f} док/с")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# benchmarks/bench_collectors.py
+#
+# Масштабирование сборщиков признаков на синтетических данных: дерево
+# документов (benchmarks/fixtures.py) для файлового сборщика и USB-индекса,
+# подставные таблицы процессов и соединений для сборщиков процессов и сети.
+# Каждый сборщик замеряется в отдельном процессе: время, процессорное время
+# (вместе с дочерними процессами), пиковый RSS и число системных вызовов
+# чтения/записи (syscr/syscw из /proc/<pid>/io; stat и чтение каталогов
+# в эти счётчики не входят).
+#
+# Результаты сравниваются с сохранёнными базовыми значениями
+# (benchmarks/baselines/collectors.json); при превышении порога запуск
+# завершается с кодом 1. Базовые значения зависят от машины: их сохраняют
+# ключом --save-baseline на той же машине, где затем выполняется проверка.
+# Семантическая оценка сайтов не входит в замер сетевого сборщика (см. bench_site_fetch).
+#
+# Запуск из корня репозитория:
+#   python -m benchmarks.bench_collectors [--files 10000] [--processes 2000] [--connections 2000]
+#   python -m benchmarks.bench_collectors --files 1000000 --only file,usb
+#   python -m benchmarks.bench_collectors --save-baseline
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+
+from benchmarks import fixtures
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(HERE, "baselines", "collectors.json")
+COLLECTORS = ("file", "usb", "process", "network")
+METRICS = ("wall_s", "cpu_s", "peak_rss_mb", "syscalls_read", "syscalls_write")
+# Допуск сверх относительного порога: шум коротких замеров не считается регрессией
+SLACK = {"wall_s": 0.05, "cpu_s": 0.05, "peak_rss_mb": 5, "syscalls_read": 100, "syscalls_write": 100}
+
+
+def _usage():
+    """Процессорное время и системные вызовы процесса вместе с живыми дочерними."""
+    import psutil
+    me = psutil.Process()
+    cpu = time.process_time()
+    reads = writes = 0
+    for proc in [me] + me.children(recursive=True):
+        try:
+            if proc.pid != me.pid:
+                times = proc.cpu_times()
+                cpu += times.user + times.system
+            io = proc.io_counters()
+            reads += io.read_count
+            writes += io.write_count
+        except (psutil.Error, AttributeError):
+            continue
+    return cpu, reads, writes
+
+
+def _measure_raw(func):
+    cpu, reads, writes = _usage()
+    start = time.perf_counter()
+    func()
+    wall = time.perf_counter() - start
+    cpu_end, reads_end, writes_end = _usage()
+    return wall, cpu_end - cpu, reads_end - reads, writes_end - writes
+
+
+_overhead = None
+
+
+def measure(func):
+    """Замер вызова func(); вычитаются вызовы, которые делает сам замер (чтение /proc)."""
+    global _overhead
+    if _overhead is None:
+        _overhead = min((_measure_raw(lambda: None) for _ in range(3)), key=lambda m: m[2])
+    wall, cpu, reads, writes = _measure_raw(func)
+    return {
+        "wall_s": round(wall, 4),
+        "cpu_s": round(max(0.0, cpu - _overhead[1]), 4),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "syscalls_read": max(0, reads - _overhead[2]),
+        "syscalls_write": max(0, writes - _overhead[3]),
+    }
+
+
+# --- Замеры в отдельном процессе -------------------------------------------------
+
+def run_file(args, workdir):
+    from features.file_work import file_activity
+    from features.file_work.file_index import FileIndex
+    from features.file_work.analysis_cache import AnalysisCache
+    from features.file_work.scan_queue import ScanQueue
+
+    manifest = fixtures.build_tree(args.fixtures, args.files, seed=args.seed)
+    file_activity.WATCH_DIRS = [manifest["root"]]
+    file_activity.SYSTEM_DIRS = []
+    # Режим опроса: полный обход дерева (наихудший случай)
+    file_activity._watcher_started = True
+    file_activity._watcher = None
+    file_activity._index = FileIndex(os.path.join(workdir, "index.db"))
+    file_activity._analysis_cache = AnalysisCache(path=None)
+    file_activity._scan_queue = ScanQueue(os.path.join(workdir, "queue.db"))
+
+    fixtures.touch_recent(manifest)
+    result = {}
+    result["cold"] = measure(file_activity.collect_file_features)
+    result["warm"] = measure(file_activity.collect_file_features)
+    if file_activity._analysis_pool is not None:
+        file_activity._analysis_pool.close()
+    return result
+
+
+def run_usb(args, workdir):
+    from features.usb_activity import usb_monitor
+    from features.usb_activity.usb_index import volume_id, _Throttle
+
+    manifest = fixtures.build_tree(args.fixtures, args.files, seed=args.seed)
+    partition = fixtures.removable_partition(os.path.dirname(manifest["root"]))
+    snapshot = fixtures.make_snapshot(partitions=[partition])
+    indexer = usb_monitor._indexer
+    indexer.scan_rate = args.usb_scan_rate
+    vid = volume_id(partition)
+
+    def wait_index():
+        while vid not in indexer._indexes or not indexer._indexes[vid].ready:
+            time.sleep(0.01)
+
+    result = {}
+    result["tick"] = measure(lambda: usb_monitor.collect_usb_features(snapshot))
+    result["index_build"] = measure(wait_index)
+    indexer.stop()
+
+    # Копирование на носитель: новые файлы в одном каталоге, затем повторный обход с отсечением по mtime
+    incoming = os.path.join(partition.mountpoint, "incoming")
+    os.makedirs(incoming, exist_ok=True)
+    try:
+        for i in range(100):
+            with open(os.path.join(incoming, f"copy{i}.txt"), "w") as f:
+                f.write("x" * 1000)
+        index = indexer._indexes[vid]
+        added = []
+        result["rescan"] = measure(lambda: added.append(index.scan(_Throttle(args.usb_scan_rate, threading.Event()))))
+        assert added[0][0] == 100, added
+    finally:
+        shutil.rmtree(incoming)
+    return result
+
+
+def run_process(args, workdir):
+    from features.process_activity.processes_work import collect_process_features
+
+    processes = fixtures.make_processes(args.processes, seed=args.seed)
+    changed = fixtures.churn_processes(processes, 0.05, seed=args.seed + 1)
+    result = {}
+    result["cold"] = measure(lambda: collect_process_features(fixtures.make_snapshot(processes=processes)))
+    result["churn"] = measure(lambda: collect_process_features(fixtures.make_snapshot(processes=changed)))
+    return result
+
+
+def run_network(args, workdir):
+    from features.network_activity import network_monitor
+    from features.network_activity.dns_resolver import ReverseResolver
+
+    connections, host_names = fixtures.make_connections(args.connections, seed=args.seed)
+
+    def lookup(ip):
+        if ip not in host_names:
+            raise OSError("нет PTR-записи")
+        return host_names[ip], [], [ip]
+
+    network_monitor._sampler = None
+    network_monitor._uploads = None
+    network_monitor._resolver = ReverseResolver(budget=5, lookup=lookup)
+    network_monitor.evaluate_multiple_sites = lambda urls: {"site_semantic_risk_score": 0.0}
+    processes = fixtures.make_processes(200, seed=args.seed)
+
+    result = {}
+    result["cold"] = measure(lambda: network_monitor.collect_network_features(
+        fixtures.make_snapshot(processes, connections, sent=10 ** 9)))
+    result["warm"] = measure(lambda: network_monitor.collect_network_features(
+        fixtures.make_snapshot(processes, connections, sent=10 ** 9 + 10 ** 6)))
+    return result
+
+
+RUNNERS = {"file": run_file, "usb": run_usb, "process": run_process, "network": run_network}
+
+
+def scale_label(name, args) -> str:
+    if name in ("file", "usb"):
+        return f"files={args.files}"
+    if name == "process":
+        return f"processes={args.processes}"
+    return f"connections={args.connections}"
+
+
+# --- Управляющий процесс ---------------------------------------------------------
+
+def run_worker(name, args) -> dict:
+    command = [sys.executable, "-m", "benchmarks.bench_collectors", "--worker", name,
+               "--files", str(args.files), "--processes", str(args.processes),
+               "--connections", str(args.connections), "--seed", str(args.seed),
+               "--fixtures", args.fixtures, "--usb-scan-rate", str(args.usb_scan_rate)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        print(completed.stdout + completed.stderr)
+        raise RuntimeError(f"замер {name} завершился с ошибкой")
+    return json.loads(lines[-1])
+
+
+def check(results, baseline, threshold) -> list:
+    regressions = []
+    for key, metrics in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric in METRICS:
+            if metric not in base:
+                continue
+            limit = base[metric] * (1 + threshold) + SLACK[metric]
+            if metrics[metric] > limit:
+                regressions.append(f"{key} {metric}: {metrics[metric]} > {limit:.2f} (база {base[metric]})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры сборщиков признаков на синтетических данных")
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=2000)
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", default=",".join(COLLECTORS), help="сборщики через запятую: " + ",".join(COLLECTORS))
+    parser.add_argument("--fixtures", default=None, help="каталог синтетических данных (переиспользуется между запусками)")
+    parser.add_argument("--usb-scan-rate", type=float, default=1e9,
+                        help="ограничение скорости обхода USB-индекса, записей/с (по умолчанию без ограничения)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимый относительный рост метрик")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fixtures is None:
+        args.fixtures = os.path.join(tempfile.gettempdir(), "dlp_bench_fixtures", f"files{args.files}_seed{args.seed}")
+    os.makedirs(args.fixtures, exist_ok=True)
+
+    if args.worker:
+        # Замеряется полная стоимость сбора: бюджет ресурсов агента не ограничивает работу
+        from utils.governor import GOVERNOR
+        GOVERNOR.cpu_budget = GOVERNOR.read_budget = None
+        with tempfile.TemporaryDirectory() as workdir:
+            print(json.dumps(RUNNERS[args.worker](args, workdir)))
+        return
+
+    start = time.perf_counter()
+    manifest = fixtures.build_tree(args.fixtures, args.files, seed=args.seed)
+    print(f"Дерево: {manifest['files']} документов, {manifest['bytes'] / 1024 / 1024:.1f} МБ, "
+          f"чувствительных {manifest['sensitive']}, изменённых за тик {len(manifest['recent'])} "
+          f"({time.perf_counter() - start:.1f} с)")
+
+    results = {}
+    for name in args.only.split(","):
+        for stage, metrics in run_worker(name, args).items():
+            key = f"{name}.{stage}@{scale_label(name, args)}"
+            results[key] = metrics
+            print(f"  {key:<38} {metrics['wall_s']:8.3f} с  ЦП {metrics['cpu_s']:8.3f} с  "
+                  f"RSS {metrics['peak_rss_mb']:7.1f} МБ  чтений {metrics['syscalls_read']:8d}  "
+                  f"записей {metrics['syscalls_write']:7d}")
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+
+    if args.save_baseline:
+        stored.setdefault("results", {}).update(results)
+        stored["machine"] = {"python": platform.python_version(), "platform": platform.platform(),
+                             "cpus": os.cpu_count()}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"✅ Базовые значения сохранены: {args.baseline}")
+        return
+
+    regressions = check(results, stored.get("results", {}), args.threshold)
+    if regressions:
+        print("❌ Регрессия относительно базовых значений:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    if stored:
+        print(f"✅ В пределах базовых значений (порог {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
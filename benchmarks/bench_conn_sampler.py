@@ -0,0 +1,56 @@
+# benchmarks/bench_conn_sampler.py
+#
+# Затраты опроса соединений через /proc/net при разных периодах опроса
+# и числе открытых соединений; для сравнения — psutil.net_connections().
+# Открывается count локальных TCP-соединений (по два сокета на соединение).
+# Запуск из корня репозитория: python -m benchmarks.bench_conn_sampler [число_соединений]
+
+import sys
+import time
+import socket
+import resource
+
+from features.network_activity.connection_sampler import ConnectionSampler
+
+
+def open_connections(count):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, count * 2 + 256)), hard))
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1024)
+    sockets = [server]
+    for _ in range(count):
+        sockets.append(socket.create_connection(server.getsockname()))
+        sockets.append(server.accept()[0])
+    return sockets
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    sockets = open_connections(count)
+    print(f"{count} соединений")
+
+    try:
+        import psutil
+        start = time.perf_counter()
+        psutil.net_connections(kind="inet")
+        print(f"  psutil.net_connections: {(time.perf_counter() - start) * 1000:7.2f} мс")
+    except ImportError:
+        print("  psutil.net_connections: недоступен")
+
+    for interval in (1.0, 0.25, 0.1):
+        sampler = ConnectionSampler(interval=interval, capacity=count * 4).start()
+        time.sleep(3)
+        sampler.stop()
+        stats = sampler.stats()
+        print(f"  период {interval:4.2f} с: опросов {stats['samples']:3d}  "
+              f"{stats['cpu_per_sample_ms']:7.2f} мс ЦП/опрос  доля ЦП {stats['cpu_share'] * 100:5.2f}%  "
+              f"соединений за интервал {len(sampler.drain())}")
+
+    for sock in sockets:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_detection.py
+#
+# Сравнение однопроходного SensitiveDataScanner с прежним кодом
+# (по str.count на каждое слово + отдельные регулярные выражения).
+# Запуск из корня репозитория: python -m benchmarks.bench_detection [размер_МБ]
+
+import re
+import sys
+import time
+import random
+
+from features.file_work.file_activity import SENSITIVE_KEYWORDS, DOCUMENT_SCANNER
+
+LEGACY_CARD_REGEX = re.compile(r"\b(?:\d[ -]*?){13,16}\b")
+LEGACY_PASSPORT_REGEX = re.compile(r"\b\d{4}\s?\d{6}\b")
+
+WORDS = ["отчёт", "клиенты", "квартал", "сумма", "итого", "договор", "компания", "дата", "report", "total"]
+
+
+def legacy_scan(text):
+    match_count = sum(text.lower().count(kw) for kw in SENSITIVE_KEYWORDS)
+    card = 1 if LEGACY_CARD_REGEX.search(text) else 0
+    passport = 1 if LEGACY_PASSPORT_REGEX.search(text) else 0
+    return match_count, card, passport
+
+
+def make_prose(size, rng):
+    parts = []
+    total = 0
+    while total < size:
+        chunk = " ".join(rng.choice(WORDS) for _ in range(12)) + ".\n"
+        if rng.random() < 0.01:
+            chunk += "паспорт 4510 123456, карта 4111 1111 1111 1111\n"
+        parts.append(chunk)
+        total += len(chunk)
+    return "".join(parts)
+
+
+def make_spreadsheet(size, rng):
+    # Таблица, выгруженная в текст: длинные цепочки цифр через пробел
+    parts = []
+    total = 0
+    while total < size:
+        row = " ".join(str(rng.randrange(10 ** 5)) for _ in range(8)) + "\n"
+        parts.append(row)
+        total += len(row)
+    return "".join(parts)
+
+
+def bench(name, func, text, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    mb = len(text.encode("utf-8")) / 1024 / 1024
+    print(f"  {name:<10} {best * 1000:9.1f} мс  {mb / best:8.1f} МБ/с")
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    size = int(size_mb * 1024 * 1024)
+    rng = random.Random(42)
+    for title, text in (("Текст", make_prose(size, rng)), ("Таблица", make_spreadsheet(size, rng))):
+        print(f"{title} ({len(text) / 1024 / 1024:.1f} млн символов):")
+        bench("прежний", legacy_scan, text)
+        bench("сканер", DOCUMENT_SCANNER.scan, text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_governor.py
+#
+# Нагрузочный тест бюджета ресурсов (utils/governor.py): за один тик изменяется
+# пачка документов (массовое копирование или распаковка архива), после чего
+# файловый сборщик запускается раз в период, пока не разберёт очередь
+# документов. Для каждой доли ядра (GOVERNOR_CPU_SHARE) выводятся процессорное
+# время агента за тик (вместе с рабочими процессами пула) — наибольшее и среднее
+# в долях периода, наибольшая длительность тика и число тиков до разбора всей пачки.
+# Период сокращён относительно SEND_INTERVAL (и подставлен сборщику вместо него):
+# бюджет задаётся долей периода, поэтому доли ЦП и число тиков переносятся
+# на настоящий интервал.
+#
+# Запуск из корня репозитория:
+#   python -m benchmarks.bench_governor [--docs 1000] [--size-kb 64] [--period 2] [--shares 0.05,0.1,0.2,0]
+
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from features.file_work import file_activity
+from features.file_work.file_index import FileIndex
+from features.file_work.analysis_cache import AnalysisCache
+from features.file_work.scan_queue import ScanQueue
+from utils.governor import Governor
+from benchmarks.bench_analysis_pool import make_documents
+
+# Предел числа тиков на одну долю (пачка не разобрана — бюджет слишком мал)
+MAX_TICKS = 200
+
+
+def agent_cpu():
+    pool = file_activity._analysis_pool
+    return time.process_time() + (pool.cpu_seconds() if pool is not None else 0.0)
+
+
+def run_share(share, paths, folder, workdir, period):
+    file_activity.WATCH_DIRS = [folder]
+    file_activity.SYSTEM_DIRS = []
+    file_activity._watcher_started = True
+    file_activity._watcher = None
+    file_activity._index = FileIndex(os.path.join(workdir, f"index_{share}.db"))
+    file_activity._analysis_cache = AnalysisCache(path=None)
+    file_activity._analysis_pool = None
+    file_activity._scan_queue = queue = ScanQueue(os.path.join(workdir, f"queue_{share}.db"))
+    file_activity._last_tick = None
+    file_activity.SEND_INTERVAL = period
+    governor = Governor(period, cpu_budget=share * period if share else None)
+    file_activity.GOVERNOR = governor
+
+    now = time.time()
+    for path in paths:
+        os.utime(path, (now, now))
+
+    ticks = []
+    while len(ticks) < MAX_TICKS:
+        # Начало тика выровнено по периоду, как у планировщика
+        time.sleep(period - time.time() % period + 0.001)
+        cpu = agent_cpu()
+        start = time.perf_counter()
+        file_activity.collect_file_features()
+        wall = time.perf_counter() - start
+        time.sleep(max(0.0, period - time.time() % period - 0.01))
+        ticks.append((agent_cpu() - cpu, wall))
+        if not len(queue):
+            break
+
+    if file_activity._analysis_pool is not None:
+        file_activity._analysis_pool.close()
+    shares = [cpu / period for cpu, _ in ticks]
+    return {
+        "ticks": len(ticks),
+        "drained": not len(queue),
+        "peak_share": max(shares),
+        "mean_share": sum(shares) / len(shares),
+        "max_wall": max(wall for _, wall in ticks),
+        "cpu_total": sum(cpu for cpu, _ in ticks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест бюджета ресурсов агента")
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--period", type=float, default=2.0, help="длительность тика, с")
+    parser.add_argument("--shares", default="0.05,0.1,0.2,0", help="доли ядра через запятую (0 — без ограничения)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder, tempfile.TemporaryDirectory() as workdir:
+        paths = make_documents(folder, args.docs, args.size_kb, random.Random(42))
+        print(f"Пачка: {args.docs} документов по {args.size_kb} КБ, период {args.period:g} с, ядер: {os.cpu_count()}")
+        for share in (float(s) for s in args.shares.split(",")):
+            result = run_share(share, paths, folder, workdir, args.period)
+            label = f"{share:.0%}" if share else "без огр."
+            print(f"  доля {label:<9} ЦП за тик: макс {result['peak_share']:6.1%}  сред {result['mean_share']:6.1%}  "
+                  f"тик до {result['max_wall']:6.2f} с  тиков {result['ticks']:3d}"
+                  f"{'' if result['drained'] else ' (не разобрано)'}  ЦП всего {result['cpu_total']:6.2f} с")
+
+
+if __name__ == "__main__":
+    main()
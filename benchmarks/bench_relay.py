@@ -0,0 +1,182 @@
+# benchmarks/bench_relay.py
+#
+# Нагрузочный тест ретранслятора (utils/relay.py): N агентов одновременно
+# (как в момент отправки, выровненный по часам) отправляют по образцу через
+# ретранслятор на локальный стенд сервера. Считаются пропускная способность
+# (образцов/с), задержка ответа агенту (p50/p95/p99), число запросов и
+# соединений к серверу, объём тел и доставка после медленного или
+# недоступного сервера (образцы с диска).
+#
+# Сценарии: сервер отвечает быстро; сервер медленный (delay с на запрос);
+# сервер недоступен первые раунды. Для сравнения — агенты напрямую к серверу.
+#
+# Запуск из корня репозитория:
+#   python -m benchmarks.bench_relay [--agents 1000] [--rounds 5] [--slow-delay 3]
+
+import gzip
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.relay import Relay, serve
+from benchmarks.bench_sender import make_payload
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+    stats = None
+    lock = threading.Lock()
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.delay:
+            time.sleep(self.delay)
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = json.loads(gzip.decompress(data))
+        else:
+            body = json.loads(data)
+        samples = body["samples"] if self.path == "/predict_batch" else [body]
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["samples"] += len(samples)
+            self.stats["bytes"] += len(data)
+            self.stats["connections"].add(self.client_address)
+        results = [{"risk_level": "high" if s["user_id"].endswith("7") else "low", "user_id": s["user_id"]}
+                   for s in samples]
+        answer = {"results": results} if self.path == "/predict_batch" else results[0]
+        out = json.dumps(answer).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))] if ordered else 0.0
+
+
+def run(args, scenario):
+    import requests
+
+    _Upstream.stats = {"requests": 0, "samples": 0, "bytes": 0, "connections": set()}
+    _Upstream.delay = args.slow_delay if scenario == "slow" else 0.0
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    upstream.daemon_threads = True
+    up_port = upstream.server_port
+    if scenario == "down":
+        upstream.server_close()     # поднимается после args.down_rounds раундов
+    else:
+        start_server(upstream)
+
+    relay = server = None
+    spill = tempfile.TemporaryDirectory()
+    if scenario == "direct":
+        target = f"http://127.0.0.1:{up_port}/predict"
+    else:
+        relay = Relay(f"http://127.0.0.1:{up_port}/predict", f"http://127.0.0.1:{up_port}/predict_batch",
+                      connections=args.connections, spill_path=f"{spill.name}/spill.db", max_memory=args.memory,
+                      response_timeout=args.response_timeout).start()
+        server = start_server(serve(relay, "127.0.0.1", 0))
+        target = f"http://127.0.0.1:{server.server_port}/predict"
+
+    rng = random.Random(1)
+    sessions = [requests.Session() for _ in range(args.agents)]
+    latencies = []
+    queued = 0
+    errors = 0
+    lock = threading.Lock()
+
+    def agent_send(n, round_no):
+        nonlocal queued, errors
+        payload = make_payload(round_no, rng)
+        payload["user_id"] = f"user{n}"
+        data = gzip.compress(json.dumps(payload).encode("utf-8"))
+        start = time.perf_counter()
+        try:
+            response = sessions[n].post(target, data=data, timeout=30, headers={
+                "Content-Type": "application/json", "Content-Encoding": "gzip"})
+            answer = response.json()
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            queued += bool(answer.get("queued"))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(args.agents, args.client_threads)) as pool:
+        for round_no in range(args.rounds):
+            if scenario == "down" and round_no == args.down_rounds:
+                upstream = start_server(ThreadingHTTPServer(("127.0.0.1", up_port), _Upstream))
+            list(pool.map(lambda n: agent_send(n, round_no), range(args.agents)))
+    elapsed = time.perf_counter() - started
+
+    sent = args.agents * args.rounds - errors
+    spilled = 0
+    if relay is not None:
+        deadline = time.monotonic() + 120
+        while relay.stats()["queued"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        spilled = relay.stats()["spilled"]
+        server.shutdown()
+        relay.stop()
+    drained = time.perf_counter() - started
+    upstream.shutdown()
+    for session in sessions:
+        session.close()
+    spill.cleanup()
+
+    stats = _Upstream.stats
+    return {
+        "throughput": sent / elapsed,
+        "p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95), "p99": percentile(latencies, 0.99),
+        "requests": stats["requests"], "connections": len(stats["connections"]),
+        "delivered": stats["samples"], "sent": sent, "errors": errors,
+        "queued": queued, "spilled": spilled, "kb": stats["bytes"] / 1024, "drained": drained,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест ретранслятора образцов")
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--memory", type=int, default=5000, help="образцов в памяти ретранслятора")
+    parser.add_argument("--response-timeout", type=float, default=2.0)
+    parser.add_argument("--slow-delay", type=float, default=3.0, help="задержка медленного сервера на запрос, с")
+    parser.add_argument("--down-rounds", type=int, default=2, help="раундов, пока сервер недоступен")
+    parser.add_argument("--client-threads", type=int, default=200)
+    parser.add_argument("--only", default="direct,relay,slow,down")
+    args = parser.parse_args()
+
+    print(f"{args.agents} агентов × {args.rounds} раундов, соединений ретранслятора: {args.connections}")
+    for scenario in args.only.split(","):
+        r = run(args, scenario)
+        print(f"  {scenario:<7} {r['throughput']:8.0f} обр/с  задержка p50 {r['p50'] * 1000:6.1f} мс  "
+              f"p95 {r['p95'] * 1000:6.1f} мс  p99 {r['p99'] * 1000:7.1f} мс  "
+              f"к серверу: запросов {r['requests']:5d}, соединений {r['connections']:4d}, {r['kb']:8.1f} КБ  "
+              f"доставлено {r['delivered']}/{r['sent']} (ответ из очереди {r['queued']}, на диск {r['spilled']}, "
+              f"всё доставлено за {r['drained']:.1f} с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_sender.py
+#
+# Доставка образцов через Outbox/Sender на локальный стенд сервера /predict:
+# сервер недоступен, пока копится очередь, затем поднимается. Считаются
+# доставленные образцы, число HTTP-запросов и объём тел (с gzip и без).
+# Запуск из корня репозитория: python -m benchmarks.bench_sender [число_образцов]
+
+import sys
+import gzip
+import json
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.outbox import Outbox
+from utils.sender import Sender
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    stats = {"requests": 0, "samples": 0, "bytes": 0}
+    accept_batches = True
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.stats["requests"] += 1
+        self.stats["bytes"] += len(data)
+        if self.headers.get("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        body = json.loads(data)
+        if self.path == "/predict_batch" and self.accept_batches:
+            self.stats["samples"] += len(body["samples"])
+            answer = {"results": [{"risk_level": "low"} for _ in body["samples"]]}
+        elif self.path == "/predict":
+            self.stats["samples"] += 1
+            answer = {"risk_level": "low"}
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        out = json.dumps(answer).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_payload(i, rng):
+    groups = ("file_activity", "process_activity", "behavioral_context", "usb_activity", "network_activity")
+    return {
+        "user_id": "user42",
+        "timestamp": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}",
+        "features": {g: {f"{g}_{k}": rng.randint(0, 5) for k in range(8)} for g in groups}
+    }
+
+
+def run(count, batch, use_gzip):
+    rng = random.Random(1)
+    _Handler.stats = {"requests": 0, "samples": 0, "bytes": 0}
+    _Handler.accept_batches = batch
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    port = server.server_port
+    server.server_close()
+
+    # Сервер недоступен: образцы копятся в очереди
+    sender = Sender(f"http://127.0.0.1:{port}/predict", Outbox(), batch_url=f"http://127.0.0.1:{port}/predict_batch",
+                    use_gzip=use_gzip, backoff_min=0.2, backoff_max=0.5)
+    for i in range(count):
+        sender.outbox.append(make_payload(i, rng))
+    sender.start()
+    time.sleep(0.5)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start = time.perf_counter()
+    while len(sender.outbox):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    sender.stop()
+    server.shutdown()
+    stats = _Handler.stats
+    return elapsed, stats
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"{count} образцов в очереди до подъёма сервера")
+    for batch, use_gzip in ((False, False), (False, True), (True, False), (True, True)):
+        elapsed, stats = run(count, batch, use_gzip)
+        print(f"  пачки: {'да ' if batch else 'нет'} gzip: {'да ' if use_gzip else 'нет'}  "
+              f"{elapsed:6.2f} с  запросов: {stats['requests']:5d}  "
+              f"доставлено: {stats['samples']:5d}  тела: {stats['bytes'] / 1024:8.1f} КБ")
+
+
+if __name__ == "__main__":
+    main()
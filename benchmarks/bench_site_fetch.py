@@ -0,0 +1,75 @@
+# benchmarks/bench_site_fetch.py
+#
+# Семантическая оценка сайтов на локальном HTTP-сервере: страницы отвечают
+# с задержкой, часть «доменов» не отвечает вовсе. Сравнивается
+# последовательная загрузка (как раньше) с пулом потоков и кэшем по домену.
+# Запуск из корня репозитория: python -m benchmarks.bench_site_fetch [число_сайтов] [задержка_с]
+
+import sys
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from features.network_activity import site_semantic_evaluator as evaluator
+from features.network_activity.site_score_cache import SiteScoreCache
+
+PAGE = (
+    "<html><head><title>Файлообменник {n}</title><script>var x = 1;</script></head>"
+    "<body><h1>Загрузите файлы</h1><h2>Бесплатно</h2>"
+    "<p>Обмен файлами без регистрации.</p><p>Пароль к архиву {n}.</p></body></html>"
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    delay = 0.5
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        if self.path.startswith("/down"):
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = PAGE.format(n=self.path).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    _Handler.delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+    server = ThreadingHTTPServer(("0.0.0.0", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Разные «домены» — разные хосты 127.0.0.x; каждый пятый отвечает ошибкой
+    urls = [
+        f"http://127.0.0.{i + 1}:{server.server_port}/{'down' if i % 5 == 4 else 'page'}{i}"
+        for i in range(count)
+    ]
+    evaluator._score_cache = SiteScoreCache()
+    evaluator.get_model()
+    print(f"{count} сайтов, задержка ответа {_Handler.delay} с, потоков: {evaluator.SITE_FETCH_WORKERS}")
+
+    start = time.perf_counter()
+    for url in urls:
+        evaluator.extract_text_from_site(url)
+    print(f"  последовательно        {time.perf_counter() - start:6.2f} с")
+
+    start = time.perf_counter()
+    result = evaluator.evaluate_multiple_sites(urls)
+    print(f"  пул потоков            {time.perf_counter() - start:6.2f} с  "
+          f"(оценка {result['site_semantic_risk_score']}, сайтов {len(result['individual_scores'])})")
+
+    start = time.perf_counter()
+    evaluator.evaluate_multiple_sites(urls)
+    print(f"  повтор (кэш)           {time.perf_counter() - start:6.2f} с  {evaluator.get_score_cache().stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
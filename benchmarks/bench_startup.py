@@ -0,0 +1,81 @@
+# benchmarks/bench_startup.py
+#
+# Стоимость запуска агента: время импорта и прирост памяти (RSS) для каждой
+# подсистемы, а также стоимость фоновой загрузки моделей и библиотек (warm_up).
+# Каждый модуль импортируется в отдельном процессе, чтобы замеры не влияли друг на друга.
+# Запуск из корня репозитория: python -m benchmarks.bench_startup
+
+import os
+import sys
+import json
+import subprocess
+
+MODULES = [
+    "features.file_work.file_activity",
+    "features.process_activity.processes_work",
+    "features.behavioral_context.behavioral_signs",
+    "features.usb_activity.usb_monitor",
+    "features.network_activity.network_monitor",
+    "agent",
+]
+
+WARM_UPS = [
+    ("utils.text_extraction", "warm_up"),
+    ("features.file_work.file_classifier", "warm_up"),
+    ("features.network_activity.site_semantic_evaluator", "warm_up"),
+]
+
+# Код, выполняемый в дочернем процессе: замер RSS по /proc/self/statm до и после
+_PROBE = """
+import os, sys, json, time, importlib
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+module, func = sys.argv[1], sys.argv[2]
+before = rss()
+start = time.perf_counter()
+try:
+    imported = importlib.import_module(module)
+    if func:
+        getattr(imported, func)()
+    error = None
+except Exception as e:
+    error = f"{type(e).__name__}: {e}"
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "rss": rss() - before, "error": error}))
+"""
+
+
+def measure(module, func=""):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE, module, func],
+        cwd=root, capture_output=True, text=True
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"error": (proc.stderr.strip().splitlines() or ["?"])[-1]}
+    return json.loads(lines[-1])
+
+
+def report(title, result):
+    if result.get("error"):
+        print(f"  {title:<60} недоступен ({result['error']})")
+    else:
+        print(f"  {title:<60} {result['seconds'] * 1000:8.1f} мс  {result['rss'] / 1024 / 1024:7.1f} МБ")
+
+
+def main():
+    print("Импорт подсистем:")
+    for module in MODULES:
+        report(module, measure(module))
+
+    print("Фоновая загрузка (импорт модуля + warm_up):")
+    for module, func in WARM_UPS:
+        report(f"{module}.{func}", measure(module, func))
+
+
+if __name__ == "__main__":
+    main()
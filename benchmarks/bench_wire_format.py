@@ -0,0 +1,92 @@
+# benchmarks/bench_wire_format.py
+#
+# Размер и время кодирования/декодирования образцов: JSON, JSON+gzip,
+# двоичный формат (полные и разностные кадры), пачками и по одному.
+# Образцы синтетические: большинство признаков нулевые или не меняются между тиками.
+# Запуск из корня репозитория: python -m benchmarks.bench_wire_format [число_образцов]
+
+import sys
+import gzip
+import json
+import time
+import random
+import datetime
+
+from utils import wire_format
+
+
+def make_samples(count, rng):
+    samples = []
+    features = {g: {name: 0.0 if kind == "f" else 0 for name, kind in wire_format.SCHEMA[g]} for g in wire_format.GROUPS}
+    start = datetime.datetime(2026, 1, 1, 9, 0, 0)
+    for i in range(count):
+        features = {g: dict(v) for g, v in features.items()}
+        features["process_activity"]["process_count"] = 240 + rng.randint(-3, 3)
+        features["network_activity"]["http_requests_count"] = rng.randint(0, 40)
+        features["network_activity"]["upload_volume_MB"] = round(rng.random() * 2, 2)
+        if rng.random() < 0.1:
+            features["file_activity"]["file_update_count"] = rng.randint(0, 5)
+            features["file_activity"]["file_confidentiality_score"] = round(rng.random(), 3)
+        if rng.random() < 0.05:
+            features["behavioral_context"]["clipboard_sensitive_matches"] = rng.randint(0, 3)
+        samples.append({
+            "user_id": "user42",
+            "timestamp": (start + datetime.timedelta(seconds=30 * i)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "features": features
+        })
+    return samples
+
+
+def measure(name, encode, decode, samples):
+    start = time.perf_counter()
+    encoded = encode(samples)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = decode(encoded)
+    decode_time = time.perf_counter() - start
+    assert decoded == samples, name
+    size = sum(len(part) for part in encoded)
+    print(f"  {name:<34} {size / len(samples):8.1f} Б/образец  "
+          f"кодирование {encode_time / len(samples) * 1e6:7.1f} мкс  декодирование {decode_time / len(samples) * 1e6:7.1f} мкс")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    samples = make_samples(count, random.Random(7))
+    print(f"{count} образцов")
+
+    measure("JSON, по одному",
+            lambda ss: [json.dumps(s).encode() for s in ss],
+            lambda parts: [json.loads(p) for p in parts], samples)
+    measure("JSON+gzip, по одному",
+            lambda ss: [gzip.compress(json.dumps(s).encode()) for s in ss],
+            lambda parts: [json.loads(gzip.decompress(p)) for p in parts], samples)
+    measure("двоичный, полные кадры",
+            lambda ss: [wire_format.encode(s, i + 1) for i, s in enumerate(ss)],
+            lambda parts: [wire_format.decode(p)[0] for p in parts], samples)
+
+    def encode_delta(ss):
+        encoder = wire_format.WireEncoder()
+        parts = []
+        for s in ss:
+            parts.append(encoder.encode_batch([s]))
+            encoder.ack()
+        return parts
+
+    def decode_delta(parts):
+        decoder = wire_format.WireDecoder()
+        return [decoder.decode_batch(p)[0] for p in parts]
+
+    measure("двоичный, разностные по одному", encode_delta, decode_delta, samples)
+
+    batch = 50
+    measure(f"JSON+gzip, пачки по {batch}",
+            lambda ss: [gzip.compress(json.dumps({"samples": ss[i:i + batch]}).encode()) for i in range(0, len(ss), batch)],
+            lambda parts: [s for p in parts for s in json.loads(gzip.decompress(p))["samples"]], samples)
+    measure(f"двоичный+gzip, пачки по {batch}",
+            lambda ss: [gzip.compress(wire_format.encode_batch(ss[i:i + batch], i + 1)) for i in range(0, len(ss), batch)],
+            lambda parts: [f[0] for p in parts for f in wire_format.decode_batch(gzip.decompress(p))], samples)
+
+
+if __name__ == "__main__":
+    main()
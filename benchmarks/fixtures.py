@@ -0,0 +1,203 @@
+# benchmarks/fixtures.py
+#
+# Синтетические данные для замеров сборщиков: дерево документов
+# (TXT/DOCX/PDF с заданной долей чувствительного содержимого) и снимки
+# системы с подставными таблицами процессов и соединений.
+# Все данные детерминированы зерном генератора.
+
+import os
+import json
+import time
+import random
+import zipfile
+from collections import namedtuple
+
+from utils.snapshot import SystemSnapshot, ProcessInfo
+
+WORDS = ["отчёт", "квартал", "сумма", "итого", "компания", "дата", "report", "total", "проект", "план"]
+SENSITIVE_WORDS = ["договор", "зарплата", "паспорт", "ИНН", "клиенты", "карта"]
+# Доли форматов документов в дереве
+FORMATS = (("txt", 0.7), ("docx", 0.2), ("pdf", 0.1))
+FILES_PER_DIR = 100
+MANIFEST = "manifest.json"
+
+Address = namedtuple("Address", ["ip", "port"])
+Connection = namedtuple("Connection", ["fd", "family", "type", "laddr", "raddr", "status", "pid"])
+Partition = namedtuple("Partition", ["device", "mountpoint", "fstype", "opts"])
+NetIO = namedtuple("NetIO", ["bytes_sent", "bytes_recv"])
+
+
+def card_number(rng) -> str:
+    """Номер карты с верной контрольной суммой Луна."""
+    digits = [4] + [rng.randint(0, 9) for _ in range(14)]
+    total = 0
+    for i, d in enumerate(reversed(digits)):
+        d = d * 2 if i % 2 == 0 else d
+        total += d - 9 if d > 9 else d
+    digits.append((10 - total % 10) % 10)
+    return "".join(map(str, digits))
+
+
+def make_text(rng, sensitive: bool, words=120) -> str:
+    parts = [rng.choice(WORDS) for _ in range(words)]
+    if sensitive:
+        for _ in range(rng.randint(1, 4)):
+            parts.insert(rng.randrange(len(parts)), rng.choice(SENSITIVE_WORDS))
+        if rng.random() < 0.5:
+            parts.insert(rng.randrange(len(parts)), card_number(rng))
+        if rng.random() < 0.3:
+            parts.insert(rng.randrange(len(parts)), f"{rng.randint(10, 99)}{rng.randint(10, 99)} {rng.randint(100000, 999999)}")
+    return " ".join(parts)
+
+
+def write_docx(path, text):
+    """Минимальный документ Word (один абзац), без python-docx."""
+    body = text.replace("&", "&amp;").replace("<", "&lt;")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml",
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/word/document.xml" '
+                   'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+                   '</Types>')
+        z.writestr("_rels/.rels",
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Target="word/document.xml" '
+                   'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+                   '</Relationships>')
+        z.writestr("word/document.xml",
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                   f'<w:body><w:p><w:r><w:t>{body}</w:t></w:r></w:p></w:body></w:document>')
+
+
+def write_pdf(path, text):
+    """Минимальный PDF из одной страницы (латиница и цифры; кириллица заменяется)."""
+    line = text.encode("latin-1", "replace").decode("latin-1").replace("\\", "").replace("(", "").replace(")", "")
+    stream = f"BT /F1 10 Tf 40 800 Td ({line[:2000]}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def build_tree(root, count, seed=1, sensitive_share=0.1, recent_share=0.005, max_recent=200) -> dict:
+    """
+    Создаёт дерево из count документов (если в root уже есть дерево с теми же
+    параметрами — переиспользует его). Время изменения всех файлов — сутки назад;
+    в манифесте перечислены файлы, которые touch_recent() делает «изменёнными в этом тике».
+    """
+    params = {"count": count, "seed": seed, "sensitive_share": sensitive_share}
+    manifest_path = os.path.join(root, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["params"] == params:
+            return manifest
+
+    rng = random.Random(seed)
+    old = time.time() - 86400
+    files = []
+    sensitive = 0
+    size = 0
+    for i in range(count):
+        folder = os.path.join(root, "docs", f"d{i // (FILES_PER_DIR * 100)}", f"d{i // FILES_PER_DIR % 100}")
+        if i % FILES_PER_DIR == 0:
+            os.makedirs(folder, exist_ok=True)
+        ext = rng.choices([f for f, _ in FORMATS], [w for _, w in FORMATS])[0]
+        is_sensitive = rng.random() < sensitive_share
+        text = make_text(rng, is_sensitive, words=rng.randint(40, 300))
+        path = os.path.join(folder, f"f{i}.{ext}")
+        if ext == "txt":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        elif ext == "docx":
+            write_docx(path, text)
+        else:
+            write_pdf(path, text)
+        os.utime(path, (old, old))
+        files.append(path)
+        sensitive += is_sensitive
+        size += os.path.getsize(path)
+
+    recent = rng.sample(files, min(max_recent, max(1, int(count * recent_share))))
+    manifest = {"params": params, "root": os.path.join(root, "docs"), "files": count,
+                "sensitive": sensitive, "bytes": size, "recent": recent}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return manifest
+
+
+def touch_recent(manifest, now=None):
+    """Отмечает файлы манифеста как изменённые сейчас."""
+    now = time.time() if now is None else now
+    for path in manifest["recent"]:
+        os.utime(path, (now, now))
+
+
+PROCESS_NAMES = ["chrome", "firefox", "code", "python3", "bash", "sshd", "systemd", "cmd.exe",
+                 "explorer.exe", "svchost.exe", "powershell.exe", "outlook.exe", "winword.exe", "tor.exe"]
+
+
+def make_processes(count, seed=1, start_pid=1000) -> list:
+    rng = random.Random(seed)
+    base = time.time() - 3600
+    return [ProcessInfo(start_pid + i, rng.choice(PROCESS_NAMES), base + rng.random() * 3000) for i in range(count)]
+
+
+def churn_processes(processes, share, seed=2) -> list:
+    """Заменяет долю share процессов новыми (завершились и запустились другие)."""
+    rng = random.Random(seed)
+    result = list(processes)
+    next_pid = max(p.pid for p in result) + 1
+    now = time.time()
+    for i in rng.sample(range(len(result)), int(len(result) * share)):
+        result[i] = ProcessInfo(next_pid, rng.choice(PROCESS_NAMES), now)
+        next_pid += 1
+    return result
+
+
+def make_connections(count, seed=1, hosts=400) -> tuple:
+    """
+    Таблица соединений и соответствие IP -> имя для обратного разрешения.
+    Адреса из документационных диапазонов; часть имён — почта и файлообменники.
+    """
+    rng = random.Random(seed)
+    names = ["mail.ru", "gmail.com", "dropbox.com", "mega.nz", "example.com", "vpn-gate.net", "cdn.example.org"]
+    ips = [f"198.51.{i // 250}.{i % 250 + 1}" for i in range(hosts)]
+    host_names = {ip: f"h{n}.{rng.choice(names)}" for n, ip in enumerate(ips) if rng.random() < 0.8}
+    ports = [443] * 8 + [80, 21, 25, 8080, 22]
+    connections = [
+        Connection(-1, 2, 1, Address("10.0.0.2", 40000 + i % 20000),
+                   Address(rng.choice(ips), rng.choice(ports)), "ESTABLISHED", None)
+        for i in range(count)
+    ]
+    return connections, host_names
+
+
+def make_snapshot(processes=(), connections=(), partitions=(), sent=0) -> SystemSnapshot:
+    return SystemSnapshot(processes=list(processes), connections=list(connections),
+                          partitions=list(partitions), net_io_counters=NetIO(sent, 0),
+                          net_io_counters_pernic={"eth0": NetIO(sent, 0)})
+
+
+def removable_partition(mountpoint) -> Partition:
+    return Partition("/dev/sdz1", mountpoint, "vfat", "rw,removable")
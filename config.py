@@ -1,5 +1,10 @@
 # config.py
 
+import os
+
+# Корень проекта (от него отсчитываются пути к моделям по умолчанию)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # Уникальный идентификатор пользователя или рабочей станции
 USER_ID = "user42"
 
@@ -20,3 +25,185 @@ FEATURE_NAMES = [
     "process_count",
     "websites_visited"
 ]
+
+# Режим отслеживания файловой активности:
+# "auto" — события inotify, при недоступности или исчерпании лимита наблюдений — опрос;
+# "events" — то же, что auto; "polling" — всегда полный обход каталогов
+FILE_MONITOR_MODE = "auto"
+
+# Кэш результатов анализа документов (по дайджесту содержимого):
+# число записей в памяти и файл для хранения между перезапусками (None — только память)
+ANALYSIS_CACHE_SIZE = 5000
+ANALYSIS_CACHE_FILE = os.path.expanduser("~/.dlp_analysis_cache.db")
+
+# Бюджеты потокового извлечения текста из одного документа:
+# объём текста (байты .txt / символы .pdf и .docx) и число страниц PDF
+EXTRACT_MAX_BYTES = 64 * 1024 * 1024
+EXTRACT_MAX_PAGES = 1000
+
+# Сколько первых символов документа передаётся классификатору
+CLASSIFIER_MAX_CHARS = 200_000
+
+# Анализ документов в рабочих процессах (испорченный документ прерывается по таймауту,
+# не останавливая агент): число процессов (0 — в основном процессе, без таймаута),
+# таймаут на документ (с) и предел очереди
+ANALYSIS_WORKERS = 2
+ANALYSIS_TIMEOUT = 20
+ANALYSIS_MAX_PENDING = 1000
+
+# Максимальное число документов в одном вызове классификатора
+CLASSIFIER_BATCH_SIZE = 64
+
+# Пути к моделям классификации документов и семантической оценки сайтов
+FILE_MODEL_PATH = os.path.join(BASE_DIR, "features", "file_work", "ml", "file_content_model.pkl")
+SITE_MODEL_PATH = os.path.join(BASE_DIR, "features", "network_activity", "models", "site_risk_model.pkl")
+
+# Использовать компактные модели (.dlpm рядом с .pkl), если они есть:
+# загружаются через отображение файла в память, без scikit-learn
+PREFER_COMPACT_MODELS = True
+
+# Фоновая загрузка моделей и библиотек после первого тика (иначе — при первом использовании)
+WARMUP_AFTER_FIRST_TICK = True
+
+# Семантическая оценка сайтов: параллельная загрузка страниц
+SITE_FETCH_WORKERS = 8
+# Таймаут одного запроса и общий бюджет загрузки за тик (в секундах);
+# страницы, не загруженные за бюджет, оцениваются в фоне и попадут в следующие тики
+SITE_FETCH_TIMEOUT = 5
+SITE_FETCH_BUDGET = 10
+# Максимальный объём читаемой страницы (в байтах)
+SITE_MAX_BYTES = 512 * 1024
+# Время жизни оценки домена и отрицательной записи (сайт недоступен), в секундах
+SITE_SCORE_TTL = 3600
+SITE_FAILURE_TTL = 300
+# Файл кэша оценок сайтов (None — только в памяти)
+SITE_SCORE_CACHE_FILE = os.path.expanduser("~/.dlp_site_scores.json")
+
+# Обратное разрешение IP-адресов соединений: число потоков и бюджет ожидания за тик (в секундах);
+# не разрешённые за бюджет адреса учитываются как IP, имена появятся в следующих тиках
+DNS_RESOLVE_WORKERS = 16
+DNS_RESOLVE_BUDGET = 0.5
+# Размер кэша имён и время жизни записей (имя найдено / PTR-записи нет), в секундах
+DNS_CACHE_SIZE = 4096
+DNS_POSITIVE_TTL = 3600
+DNS_NEGATIVE_TTL = 300
+
+# Индекс файлов USB-носителей: период фоновой перепроверки томов (в секундах)
+# и ограничение скорости обхода (записей каталогов в секунду)
+USB_RESCAN_INTERVAL = 5
+USB_SCAN_RATE = 2000
+# Сколько индексов отключённых томов хранить для быстрого повторного подключения
+# (вытесняются давно не подключавшиеся; подключённые тома не вытесняются)
+USB_INDEXED_VOLUMES = 16
+
+# Учёт исходящего трафика по процессам и сокетам (Linux, netlink sock_diag);
+# при недоступности — общий счётчик отправленных байт системы
+UPLOAD_ACCOUNTING = True
+# Процессы, чей исходящий трафик не считается выгрузкой (обновления ОС, резервное копирование)
+UPLOAD_ALLOWLIST = [
+    "apt", "apt-get", "dnf", "yum", "packagekitd", "snapd", "fwupd",
+    "wuauclt.exe", "usoclient.exe", "bacula-fd", "veeamagent"
+]
+# Сколько процессов хранится в накопленной статистике исходящего трафика
+UPLOAD_TRACKED_PROCESSES = 256
+# Сколько основных источников исходящего трафика за интервал (процессов и адресов)
+# добавляется в образец группой network_uploaders (0 — не добавлять)
+UPLOAD_TOP_REPORTED = 5
+
+# Опрос соединений чтением /proc/net между тиками (Linux): период в секундах (0 — отключить)
+# и наибольшее число соединений, запоминаемых за интервал
+CONN_SAMPLE_INTERVAL = 0.25
+CONN_SAMPLE_CAPACITY = 8192
+
+# Наблюдение за буфером обмена: период опроса (в секундах; в Windows между опросами
+# проверяется только счётчик изменений буфера) и максимум проверяемых символов содержимого
+CLIPBOARD_POLL_INTERVAL = 1.0
+CLIPBOARD_MAX_CHARS = 64 * 1024
+
+# Собственные метрики агента в формате Prometheus: http://TELEMETRY_HOST:TELEMETRY_PORT/metrics
+# (None — не открывать порт)
+TELEMETRY_PORT = 9464
+TELEMETRY_HOST = "127.0.0.1"
+# Добавлять в образец краткую группу agent_health (длительность сборщиков, ЦП, память, очередь)
+SEND_AGENT_HEALTH = False
+# Профилирование по запросу: при появлении файла следующий интервал отправки записывается
+# выборочным профилировщиком (период выборки в секундах) в каталог PROFILE_DIR
+PROFILE_TRIGGER_FILE = os.path.expanduser("~/.dlp_profile_next_tick")
+PROFILE_DIR = os.path.expanduser("~/.dlp_profiles")
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+# Бюджет ресурсов агента на интервал отправки (utils/governor.py): доля одного ядра
+# (процессорное время агента и рабочих процессов анализа) и объём читаемых документов, МБ
+# (None — без ограничения). Сверх бюджета документы, обход USB-томов и загрузка сайтов
+# откладываются на следующие интервалы. Значения подобраны по benchmarks/bench_governor.py
+GOVERNOR_CPU_SHARE = 0.1
+GOVERNOR_READ_BUDGET_MB = 256
+# Во сколько раз может увеличиваться интервал сборщика, не укладывающегося в него (1 — не менять)
+GOVERNOR_MAX_BACKOFF = 4
+# Приоритет процесса агента: nice (Linux/macOS; в Windows — «ниже среднего») и класс
+# ввода-вывода (False — низший best-effort, True — idle: диск только при простое)
+AGENT_NICE = 10
+AGENT_IONICE_IDLE = False
+
+# Очередь анализа документов (features/file_work/scan_queue.py): изменённые документы ставятся
+# в постоянную очередь с приоритетом по эвристикам риска (расширение, каталог, имя, размер,
+# недавняя активность USB или выгрузка в сеть). Сразу, в тике обнаружения, анализируются
+# документы с приоритетом не ниже SCAN_IMMEDIATE_PRIORITY и размером до SCAN_IMMEDIATE_MAX_BYTES;
+# остальные — когда загрузка ЦП системы ниже SCAN_IDLE_CPU_PERCENT или документ ждёт дольше
+# SCAN_MAX_DELAY секунд. Всё — в пределах бюджета ресурсов агента
+SCAN_QUEUE_FILE = os.path.expanduser("~/.dlp_scan_queue.db")
+SCAN_QUEUE_MAX_DOCS = 50000
+SCAN_IMMEDIATE_PRIORITY = 5
+SCAN_IMMEDIATE_MAX_BYTES = 2 * 1024 * 1024
+SCAN_IDLE_CPU_PERCENT = 30
+SCAN_MAX_DELAY = 3600
+# Сколько интервалов с поздними результатами анализа хранится до отправки (file_activity_late)
+SCAN_LATE_MAX_INTERVALS = 240
+
+# Расписание сборщиков признаков: группа -> (интервал запуска, срок выполнения), в секундах.
+# Моменты запуска выровнены по часам; сборщик, не уложившийся в срок, отправляется
+# с последним значением и отмечается как устаревший (stale_groups)
+COLLECTOR_SCHEDULE = {
+    "file_activity": (30, 25),
+    "process_activity": (5, 5),
+    "behavioral_context": (2, 2),
+    "usb_activity": (30, 20),
+    "network_activity": (30, 20),
+}
+
+# Отправка образцов: очередь на диске переживает перезапуск и недоступность сервера
+OUTBOX_FILE = os.path.expanduser("~/.dlp_outbox.db")
+OUTBOX_MAX_SAMPLES = 10000
+OUTBOX_MAX_BYTES = 50 * 1024 * 1024
+# Адрес приёма пачек образцов ({"samples": [...]}); None — отправка по одному на SERVER_URL
+SERVER_BATCH_URL = "http://127.0.0.1:8000/predict_batch"
+SEND_BATCH_SIZE = 50
+# Сжатие тел запросов (при отказе сервера принимать gzip отключается автоматически)
+SEND_GZIP = True
+# Двоичный формат образцов (utils/wire_format.py), если сервер его поддерживает (заголовок X-DLP-Wire)
+SEND_BINARY = True
+SEND_TIMEOUT = 5
+
+# Режим ретранслятора (python agent.py --relay): приём образцов агентов офиса и пересылка
+# на SERVER_URL / SERVER_BATCH_URL пачками через RELAY_CONNECTIONS постоянных соединений.
+# Агенты указывают адрес ретранслятора в SERVER_URL и SERVER_BATCH_URL (/predict, /predict_batch)
+RELAY_HOST = "0.0.0.0"
+RELAY_PORT = 8010
+RELAY_CONNECTIONS = 4
+RELAY_BATCH_SIZE = 500
+# Сколько ждать следующих образцов, чтобы отправить их одной пачкой (в секундах)
+RELAY_BATCH_DELAY = 0.05
+# Сколько агент ждёт ответа сервера на свой образец; дальше — последний известный
+# уровень риска агента и "queued": true (образец доставляется позже)
+RELAY_RESPONSE_TIMEOUT = 2.0
+# Образцов в памяти (на все соединения); остальные — на диске, в пределах ограничений на соединение
+RELAY_MEMORY_SAMPLES = 5000
+RELAY_SPILL_FILE = os.path.expanduser("~/.dlp_relay_spill.db")
+RELAY_SPILL_MAX_SAMPLES = 1_000_000
+RELAY_SPILL_MAX_BYTES = 512 * 1024 * 1024
+# Наибольший размер тела запроса агента (после распаковки gzip) и число запоминаемых ответов по агентам
+RELAY_MAX_BODY = 8 * 1024 * 1024
+RELAY_MAX_AGENTS = 100_000
+# Через сколько секунд простоя закрывается соединение агента (keep-alive); поток приёма
+# держится только за активными агентами. Больше SEND_INTERVAL, чтобы соединение переиспользовалось
+RELAY_IDLE_TIMEOUT = 3 * SEND_INTERVAL
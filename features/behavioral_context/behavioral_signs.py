@@ -1,27 +1,44 @@
 # features/behavioral_context/behavioral_signs.py
 
-import datetime
 import pyperclip
-import re
+from utils.sensitive_data import SensitiveDataScanner
+from utils.snapshot import SystemSnapshot
+from features.behavioral_context.clipboard_watcher import ClipboardWatcher
+from config import CLIPBOARD_POLL_INTERVAL, CLIPBOARD_MAX_CHARS, SEND_INTERVAL
 
-# Регулярки для чувствительных данных
-CARD_REGEX = re.compile(r"\b(?:\d[ -]*?){13,16}\b")
-EMAIL_REGEX = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
 PASSWORD_HINTS = [
     "password", "пароль", "pwd", "pass", "пароли", "паролчик", "123456", "qwerty", "letmein", "secret", "my_password", "admin", "login", "логин", "access"
 ]
 
+# Номера карт (Луна), e-mail и подсказки паролей — за один проход
+CLIPBOARD_SCANNER = SensitiveDataScanner(PASSWORD_HINTS, emails=True)
+
+
+def count_clipboard_matches(found) -> int:
+    # Подсказки паролей учитываются по одному разу на каждую найденную
+    return found["card_numbers"] + found["emails"] + len(found["keywords"])
+
+
+# Буфер обмена проверяется в фоне при каждом изменении, а не раз в тик;
+# повторное копирование того же текста в пределах интервала отправки — одно событие
+_watcher = ClipboardWatcher(
+    pyperclip.paste, CLIPBOARD_SCANNER, count_clipboard_matches,
+    poll_interval=CLIPBOARD_POLL_INTERVAL, max_chars=CLIPBOARD_MAX_CHARS, dedupe_window=SEND_INTERVAL
+)
+
 WORK_HOURS = (8, 18)  # рабочие часы с 8:00 до 18:00 по умолчанию
 
 _state = {
     "activity_outside_work_hours": 0,
     "activity_weekend_hours": 0,
-    "clipboard_sensitive_matches": 0
+    "clipboard_sensitive_matches": 0,
+    "clipboard_sensitive_events": 0
 }
 
-def collect_behavioral_context():
+def collect_behavioral_context(snapshot=None):
     reset_state()
-    now = datetime.datetime.now()
+    snapshot = snapshot or SystemSnapshot()
+    now = snapshot.now
 
     # Проверка времени
     hour = now.hour
@@ -33,21 +50,20 @@ def collect_behavioral_context():
     if weekday >= 5:
         _state["activity_weekend_hours"] = 1
 
-    # Проверка содержимого буфера обмена
-    try:
-        clip = pyperclip.paste()
-        if clip:
-            count = 0
-            count += len(CARD_REGEX.findall(clip))
-            count += len(EMAIL_REGEX.findall(clip))
-            count += sum(1 for pw in PASSWORD_HINTS if pw in clip.lower())
-            _state["clipboard_sensitive_matches"] = count
-    except Exception:
-        pass
+    # Совпадения во всех новых содержимых буфера с прошлого сбора и число таких
+    # копирований (одинаковое содержимое в пределах интервала — одно событие)
+    _watcher.start()
+    drained = _watcher.drain()
+    _state["clipboard_sensitive_matches"] = drained["matches"]
+    _state["clipboard_sensitive_events"] = drained["events"]
 
     return dict(_state)
 
 
+def get_clipboard_stats() -> dict:
+    return _watcher.stats()
+
+
 def reset_state():
     for key in _state:
         _state[key] = 0
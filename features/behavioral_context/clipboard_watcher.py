@@ -0,0 +1,120 @@
+# features/behavioral_context/clipboard_watcher.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def _windows_sequence_number():
+    """Счётчик изменений буфера обмена Windows (GetClipboardSequenceNumber) или None."""
+    try:
+        import ctypes
+        user32 = ctypes.windll.user32
+        user32.GetClipboardSequenceNumber()
+        return user32.GetClipboardSequenceNumber
+    except Exception:
+        return None
+
+
+class ClipboardWatcher:
+    """
+    Фоновое наблюдение за буфером обмена.
+
+    Буфер опрашивается раз в poll_interval секунд; в Windows сначала
+    проверяется счётчик изменений буфера, и содержимое читается только после
+    его изменения. Неизменившееся содержимое (тот же хеш) повторно не
+    проверяется; новое проверяется сканером не более чем на max_chars символов.
+    Событие — новое содержимое, в котором найдены чувствительные данные;
+    одно и то же содержимое, скопированное повторно в течение dedupe_window
+    секунд, учитывается один раз. drain() отдаёт итоги с прошлого вызова.
+    """
+
+    def __init__(self, reader, scanner, count_matches, poll_interval=1.0, max_chars=64 * 1024,
+                 dedupe_window=30, sequence=None):
+        self.reader = reader
+        self.scanner = scanner
+        self.count_matches = count_matches
+        self.poll_interval = poll_interval
+        self.max_chars = max_chars
+        self.dedupe_window = dedupe_window
+        self.sequence = sequence if sequence is not None else _windows_sequence_number()
+        self.polls = 0
+        self.scans = 0
+        self.errors = 0
+        self._last_sequence = None
+        self._last_hash = None
+        self._recent = OrderedDict()   # хеш -> время события
+        self._events = 0
+        self._matches = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="dlp-clipboard", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def poll(self, now=None):
+        """Одна проверка буфера."""
+        now = time.monotonic() if now is None else now
+        self.polls += 1
+        if self.sequence is not None:
+            number = self.sequence()
+            if number == self._last_sequence:
+                return
+            self._last_sequence = number
+        try:
+            text = self.reader()
+        except Exception:
+            self.errors += 1
+            return
+        if not text:
+            self._last_hash = None
+            return
+
+        sample = text[:self.max_chars]
+        digest = hashlib.blake2b(sample.encode("utf-8", "surrogatepass"), digest_size=16)
+        digest.update(len(text).to_bytes(8, "little"))
+        digest = digest.digest()
+        if digest == self._last_hash:
+            return
+        self._last_hash = digest
+
+        self.scans += 1
+        matches = self.count_matches(self.scanner.scan(sample))
+        if not matches:
+            return
+        with self._lock:
+            while self._recent and next(iter(self._recent.values())) < now - self.dedupe_window:
+                self._recent.popitem(last=False)
+            if digest in self._recent:
+                return
+            self._recent[digest] = now
+            self._events += 1
+            self._matches += matches
+
+    def drain(self) -> dict:
+        """События с чувствительными данными и число совпадений в них с прошлого вызова."""
+        with self._lock:
+            result = {"events": self._events, "matches": self._matches}
+            self._events = self._matches = 0
+        return result
+
+    def stats(self) -> dict:
+        return {"polls": self.polls, "scans": self.scans, "errors": self.errors,
+                "change_notifications": self.sequence is not None}
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Ошибка проверки буфера обмена: {e}")
+            self._stop.wait(self.poll_interval)
@@ -0,0 +1,121 @@
+# features/file_work/analysis_cache.py
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    used REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+class AnalysisCache:
+    """
+    Кэш результатов анализа документов, ключ — дайджест содержимого + версии
+    извлечения/детекторов/модели.
+
+    В памяти хранится не более max_entries записей (LRU). Если задан path,
+    записи дублируются в SQLite и переживают перезапуск агента; на диске
+    хранится не более disk_entries записей.
+    """
+
+    def __init__(self, max_entries=5000, path=None, disk_entries=50000):
+        self.max_entries = max_entries
+        self.disk_entries = disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            try:
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(_SCHEMA)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Кэш анализа работает только в памяти: {e}")
+                self._conn = None
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            value = self._load(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._conn is not None:
+                try:
+                    with self._conn:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO analysis (key, result, used) VALUES (?, ?, ?)",
+                            (key, json.dumps(value), time.time())
+                        )
+                    self._puts_since_prune += 1
+                    if self._puts_since_prune >= 1000:
+                        self._prune()
+                except sqlite3.Error:
+                    pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key):
+        if self._conn is None:
+            return _MISSING
+        try:
+            row = self._conn.execute("SELECT result FROM analysis WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return _MISSING
+            with self._conn:
+                self._conn.execute("UPDATE analysis SET used = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError):
+            return _MISSING
+
+    def _prune(self):
+        self._puts_since_prune = 0
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM analysis WHERE key IN ("
+                "SELECT key FROM analysis ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.disk_entries,)
+            )
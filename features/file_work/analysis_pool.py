@@ -0,0 +1,172 @@
+# features/file_work/analysis_pool.py
+
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+# Результат документа, анализ которого не завершился (таймаут, падение процесса,
+# переполнение очереди); в отличие от None такой результат не кэшируется
+FAILED = object()
+
+
+def _worker_main(conn):
+    """
+    Цикл рабочего процесса: библиотеки извлечения и детекторы загружаются один раз
+    при импорте, затем документы сканируются по одному до закрытия канала.
+    """
+    from features.file_work.file_activity import scan_document
+    from utils.text_extraction import warm_up
+
+    warm_up()
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        task_id, path = message
+        try:
+            result = scan_document(path)
+        except Exception:
+            result = None
+        try:
+            conn.send((task_id, result))
+        except (OSError, ValueError):
+            return
+
+
+class _Worker:
+    def __init__(self, ctx):
+        parent, child = ctx.Pipe()
+        self.conn = parent
+        self.process = ctx.Process(target=_worker_main, args=(child,), name="dlp-analysis-worker", daemon=True)
+        self.process.start()
+        child.close()
+        self.task = None
+        self.started = 0.0
+
+    def send(self, task_id, path):
+        self.task = (task_id, path)
+        self.started = time.monotonic()
+        self.conn.send((task_id, path))
+
+    def cpu_seconds(self) -> float:
+        """Процессорное время рабочего процесса (0, если его уже нет)."""
+        try:
+            import psutil
+            times = psutil.Process(self.process.pid).cpu_times()
+            return times.user + times.system
+        except Exception:
+            return 0.0
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(1)
+        except Exception:
+            pass
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class AnalysisPool:
+    """
+    Пул процессов для параллельного извлечения текста и сканирования документов.
+    Классификация выполняется в основном процессе одним пакетом на тик.
+
+    Каждый рабочий процесс держит не более одного документа; очередь ожидающих
+    документов ограничена max_pending. Документ, анализ которого длится дольше
+    timeout секунд (например, испорченный PDF), прерывается вместе с процессом,
+    вместо него запускается новый. Результаты возвращаются в порядке входного
+    списка, поэтому их слияние в счётчики детерминировано.
+
+    Процессы запускаются методом spawn: агент многопоточный, а fork копирует
+    блокировки, захваченные другими потоками в момент запуска.
+    """
+
+    def __init__(self, workers, timeout=20.0, max_pending=1000, start_method="spawn"):
+        self.size = max(1, workers)
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.timeouts = 0
+        self._finished_cpu = 0.0   # процессорное время завершённых рабочих процессов
+        self._ctx = multiprocessing.get_context(start_method)
+        self._workers = []
+
+    def run(self, paths) -> list:
+        """
+        Сканирует документы; возвращает список результатов scan_document
+        (None — текст не извлечён, FAILED — таймаут или аварийное завершение).
+        Документы сверх max_pending не анализируются (результат FAILED).
+        """
+        results = [FAILED] * len(paths)
+        pending = deque(list(enumerate(paths))[:self.max_pending])
+        while len(self._workers) < min(self.size, len(pending)):
+            self._workers.append(_Worker(self._ctx))
+
+        busy = {}
+        idle = list(self._workers)
+        while pending or busy:
+            while pending and idle:
+                worker = idle.pop()
+                task_id, path = pending.popleft()
+                try:
+                    worker.send(task_id, path)
+                    busy[worker.conn] = worker
+                except (OSError, ValueError):
+                    idle.append(self._replace(worker))
+                    pending.appendleft((task_id, path))
+
+            if not busy:
+                continue
+            now = time.monotonic()
+            deadline = min(w.started for w in busy.values()) + self.timeout
+            for conn in wait(list(busy), timeout=max(0.0, deadline - now)):
+                worker = busy.pop(conn)
+                try:
+                    task_id, result = conn.recv()
+                    results[task_id] = result
+                    worker.task = None
+                    idle.append(worker)
+                except (EOFError, OSError):
+                    # Процесс аварийно завершился на этом документе
+                    idle.append(self._replace(worker))
+
+            now = time.monotonic()
+            for conn, worker in list(busy.items()):
+                if now - worker.started > self.timeout:
+                    self.timeouts += 1
+                    print(f"⏱️ Анализ документа прерван по таймауту: {worker.task[1]}")
+                    del busy[conn]
+                    idle.append(self._replace(worker))
+
+        return results
+
+    def cpu_seconds(self) -> float:
+        """Процессорное время всех рабочих процессов пула, включая завершённые."""
+        return self._finished_cpu + sum(worker.cpu_seconds() for worker in self._workers)
+
+    def close(self):
+        for worker in self._workers:
+            self._finished_cpu += worker.cpu_seconds()
+            worker.stop()
+        self._workers = []
+
+    def _replace(self, worker):
+        self._finished_cpu += worker.cpu_seconds()
+        worker.kill()
+        fresh = _Worker(self._ctx)
+        self._workers[self._workers.index(worker)] = fresh
+        return fresh
@@ -2,12 +2,28 @@
 
 import os
 import time
-import re
-import json
+import threading
+from datetime import datetime
+from stat import S_ISREG
 from pathlib import Path
-from config import SEND_INTERVAL
-from utils.text_extraction import extract_text_from_file
-from features.file_work.file_classifier import classify_document
+from config import (
+    SEND_INTERVAL, FILE_MONITOR_MODE, ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_FILE, CLASSIFIER_MAX_CHARS,
+    ANALYSIS_WORKERS, ANALYSIS_TIMEOUT, ANALYSIS_MAX_PENDING,
+    SCAN_QUEUE_FILE, SCAN_QUEUE_MAX_DOCS, SCAN_IMMEDIATE_PRIORITY, SCAN_IMMEDIATE_MAX_BYTES,
+    SCAN_IDLE_CPU_PERCENT, SCAN_MAX_DELAY, SCAN_LATE_MAX_INTERVALS
+)
+from utils.text_extraction import iter_text_chunks, is_supported, EXTRACTOR_VERSION
+from utils.sensitive_data import SensitiveDataScanner
+from utils.snapshot import SystemSnapshot
+from features.file_work.file_classifier import classify_documents, get_model_version
+from features.file_work.file_watcher import start_watcher
+from features.file_work.file_index import FileIndex, make_record, file_digest, digest_read_size
+from features.file_work.analysis_cache import AnalysisCache
+from features.file_work.analysis_pool import AnalysisPool, FAILED
+from features.file_work.scan_queue import ScanQueue, document_priority
+from utils import telemetry
+from utils import activity
+from utils.governor import GOVERNOR
 
 WATCH_DIRS = [
     os.path.expanduser("~/Documents"),
@@ -17,10 +33,9 @@ WATCH_DIRS = [
 
 ARCHIVE_EXTENSIONS = [".zip", ".rar", ".7z"]
 SENSITIVE_KEYWORDS = ["договор", "зарплата", "паспорт", "ИНН", "клиенты", "карта", "отчёт"]
-CARD_REGEX = re.compile(r"\b(?:\d[ -]*?){13,16}\b")
-PASSPORT_REGEX = re.compile(r"\b\d{4}\s?\d{6}\b")
 
-CACHE_FILE = os.path.expanduser("~/.dlp_filecache.json")
+# Словарь, номера карт (Луна), ИНН (контрольные разряды) и паспорта — за один проход
+DOCUMENT_SCANNER = SensitiveDataScanner(SENSITIVE_KEYWORDS, count_numbers=False)
 
 SYSTEM_DIRS = [
     "C:/Windows",
@@ -43,56 +58,419 @@ _state = {
     "file_system_update_count": 0
 }
 
-def collect_file_features():
+# Наблюдатель inotify (None — события недоступны, работаем опросом)
+_watcher = None
+_watcher_started = False
+# Индекс сверен с диском полным обходом (до этого события покрывают не все файлы)
+_index_synced = False
+
+# Постоянный индекс файлов (размер, mtime, inode, права, дайджест)
+_index = None
+
+# Кэш результатов анализа документов по дайджесту содержимого
+_analysis_cache = None
+
+# Пул процессов для анализа документов (создаётся при первом промахе кэша)
+_analysis_pool = None
+
+# Постоянная очередь документов на анализ (приоритет, интервал изменения)
+_scan_queue = None
+
+# Время прошлого тика: изменения, найденные обходом, произошли не раньше него
+_last_tick = None
+
+# Результаты анализа документов, изменившихся в уже отправленных интервалах:
+# начало интервала -> сводка (отдаются в группе file_activity_late, см. take_late_results)
+_late = {}
+_late_lock = threading.Lock()
+
+# Сколько документов анализируется (и классифицируется одним вызовом) между проверками бюджета
+ANALYSIS_CHUNK = max(1, ANALYSIS_WORKERS) * 8
+
+# Сколько документов выбирается из очереди за один проход анализа
+SCAN_BATCH = ANALYSIS_CHUNK * 4
+
+# Сколько секунд после подключения USB-носителя или крупной выгрузки изменённые документы
+# получают надбавку к приоритету
+ACTIVITY_WINDOW = 2 * SEND_INTERVAL
+
+
+def collect_file_features(snapshot=None):
+    global _last_tick, _index_synced
     reset_state()
-    recent_files, current_file_map, current_perm_map = get_recent_files(WATCH_DIRS + SYSTEM_DIRS, last_seconds=SEND_INTERVAL)
-    previous_file_map = load_file_cache()
-    previous_perm_map = load_permission_cache()
+    snapshot = snapshot or SystemSnapshot()
+    index = get_index()
 
-    deleted_paths = set(previous_file_map.keys()) - set(current_file_map.keys())
-    _state["file_delete_count"] = len(deleted_paths)
+    watcher = get_watcher()
+    events = watcher.drain() if watcher else None
 
-    confidences = []
+    if events is None or events.overflowed or not _index_synced:
+        # Опрос: полный обход дерева (нет inotify, лимит наблюдений или потеря событий).
+        # С наблюдателем — один раз после запуска: индекс заполняется для всех файлов,
+        # чтобы изменения прав у файлов без прошлых событий не терялись
+        with telemetry.timed("stage_seconds", stage="file_walk"):
+            recent_files, current_records = get_recent_files(
+                WATCH_DIRS + SYSTEM_DIRS, last_seconds=SEND_INTERVAL, now=snapshot.time
+            )
+        telemetry.inc("files_walked_total", len(current_records))
+        # Первый обход (пустой индекс) — исходное состояние: в очередь идут только недавние файлы
+        baseline = len(index) == 0
+        diff = index.apply_scan(current_records)
+        _state["file_delete_count"] = len(diff.deleted)
+        for path, old, new in diff.changed:
+            report_permission_change(path, old, new)
+        _index_synced = True
+        if not baseline:
+            # Также файлы, изменившиеся между обходами вне окна mtime (копирование с сохранением
+            # времени, тики, пропущенные из-за нагрузки)
+            recent_files = list(dict.fromkeys(
+                recent_files + diff.added + [path for path, old, new in diff.changed if old[:3] != new[:3]]
+            ))
+    else:
+        recent_files = get_changed_files(events, index)
+        current_records = None
 
-    for path in recent_files:
-        try:
-            abs_path = os.path.abspath(path)
-            is_now_writable = os.access(abs_path, os.W_OK)
-            was_writable = previous_perm_map.get(abs_path)
-            if was_writable is not None and was_writable != is_now_writable:
-                print(f"🔒 Изменена доступность записи: {abs_path}")
-                _state["file_permission_changed_count"] += 1
-        except Exception:
+    enqueue_documents(recent_files, snapshot.time, current_records)
+    scan_queued(index, snapshot)
+    _last_tick = snapshot.time
+
+    return dict(_state)
+
+def reporting_interval(now):
+    """Начало интервала отправки, признаки которого собирает тик в момент now."""
+    return round(now / SEND_INTERVAL) * SEND_INTERVAL - SEND_INTERVAL
+
+def enqueue_documents(paths, now, records=None):
+    """
+    Ставит изменённые документы в очередь анализа с приоритетом по эвристикам риска.
+    Интервал изменения — по mtime файла, но не раньше прошлого тика (изменение
+    обнаружено только сейчас) и не позже интервала текущего тика.
+    """
+    since = _last_tick if _last_tick is not None else now - SEND_INTERVAL
+    current = reporting_interval(now)
+    recent_activity = min(
+        activity.seconds_since(activity.USB, now), activity.seconds_since(activity.UPLOAD, now)
+    ) <= ACTIVITY_WINDOW
+
+    documents = []
+    for path in paths:
+        if not is_supported(path):
             continue
-        text = extract_text_from_file(path)
-        if not text:
+        record = records.get(path) if records else None
+        try:
+            if record is None:
+                record = make_record(path)
+        except OSError:
             continue
+        changed = min(max(record.mtime, since), now)
+        changed_interval = min(changed // SEND_INTERVAL * SEND_INTERVAL, current)
+        priority = document_priority(path, record.size, WATCH_DIRS, SENSITIVE_KEYWORDS, recent_activity)
+        documents.append((path, priority, record.size, changed_interval))
+    get_scan_queue().push(documents, now)
+
+def scan_queued(index, snapshot):
+    """
+    Анализ документов из очереди по убыванию приоритета, в пределах бюджета ресурсов.
+    Пока система занята (загрузка ЦП не ниже SCAN_IDLE_CPU_PERCENT), анализируются
+    только небольшие документы высокого приоритета и документы, ждущие дольше
+    SCAN_MAX_DELAY; при простое — вся очередь. Результаты текущего интервала
+    попадают в признаки тика, более ранних — в сводки file_activity_late.
+    """
+    queue = get_scan_queue()
+    current = reporting_interval(snapshot.time)
+    idle = snapshot.cpu_percent() < SCAN_IDLE_CPU_PERCENT and _last_tick is not None
 
-        match_count = sum(text.lower().count(kw) for kw in SENSITIVE_KEYWORDS)
-        _state["file_sensitive_word_matches"] += match_count
-        if match_count > 0:
-            _state["file_access_sensitive_docs"] += 1
+    confidences = []
+    while True:
+        if idle:
+            batch = queue.peek(SCAN_BATCH)
+        else:
+            batch = queue.peek(
+                SCAN_BATCH, min_priority=SCAN_IMMEDIATE_PRIORITY, max_size=SCAN_IMMEDIATE_MAX_BYTES,
+                queued_before=snapshot.time - SCAN_MAX_DELAY
+            )
+        if not batch:
+            break
+        results = analyze_documents([document.path for document in batch], index)
+        queue.remove(results)
 
-        classification = classify_document(text)
-        confidences.append(classification["file_confidentiality_score"])
+        for document in batch:
+            result = results.get(document.path)
+            if result is None:
+                continue
+            if document.changed >= current:
+                add_result(_state, result)
+                confidences.append(result["file_confidentiality_score"])
+            else:
+                add_late_result(document.changed, result)
 
-        if CARD_REGEX.search(text):
-            _state["file_contains_card_number"] = 1
-        if PASSPORT_REGEX.search(text):
-            _state["file_contains_passport_data"] = 1
+        if len(results) < len(batch):
+            # Бюджет ресурсов интервала исчерпан: остаток — в следующих тиках
+            break
 
     if confidences:
         _state["file_confidentiality_score"] = round(sum(confidences) / len(confidences), 3)
 
-    save_file_cache(current_file_map)
-    save_permission_cache(current_perm_map)
-    return dict(_state)
+def add_result(summary, result):
+    summary["file_sensitive_word_matches"] += result["match_count"]
+    if result["match_count"] > 0:
+        summary["file_access_sensitive_docs"] += 1
+    if result["card_number"]:
+        summary["file_contains_card_number"] = 1
+    if result["passport_data"]:
+        summary["file_contains_passport_data"] = 1
+
+def add_late_result(interval_start, result):
+    with _late_lock:
+        summary = _late.get(interval_start)
+        if summary is None:
+            summary = _late[interval_start] = {
+                "documents": 0,
+                "file_access_sensitive_docs": 0,
+                "file_sensitive_word_matches": 0,
+                "file_contains_card_number": 0,
+                "file_contains_passport_data": 0,
+                "confidence_sum": 0.0,
+            }
+            while len(_late) > SCAN_LATE_MAX_INTERVALS:
+                del _late[min(_late)]
+                telemetry.inc("deferred_dropped_total", kind="late_results")
+        summary["documents"] += 1
+        summary["confidence_sum"] += result["file_confidentiality_score"]
+        add_result(summary, result)
+
+def take_late_results() -> list:
+    """
+    Сводки по документам, проанализированным после отправки интервала, в котором
+    они изменились (по возрастанию интервала). Каждая сводка отдаётся один раз.
+    """
+    global _late
+    with _late_lock:
+        late, _late = _late, {}
+    results = []
+    for start in sorted(late):
+        summary = dict(late[start])
+        confidence_sum = summary.pop("confidence_sum")
+        summary["file_confidentiality_score"] = round(confidence_sum / summary["documents"], 3)
+        results.append({
+            "interval_start": datetime.fromtimestamp(start).strftime("%Y-%m-%dT%H:%M:%S"),
+            "interval_sec": SEND_INTERVAL,
+            **summary
+        })
+    return results
+
+def analyze_documents(paths, index):
+    """
+    Анализирует документы: результаты берутся из кэша по дайджесту, промахи
+    сканируются пулом процессов с таймаутом на документ, тексты
+    классифицируются пакетными вызовами по ANALYSIS_CHUNK документов.
+    Возвращает {путь: результат} для обработанных документов (None — текст
+    не извлечён, файл недоступен или разбор не удался). Документы, не уложившиеся
+    в бюджет ресурсов (GOVERNOR), в результат не входят.
+    """
+    cache = get_analysis_cache()
+    version = f"{EXTRACTOR_VERSION}:{DOCUMENT_SCANNER.version}:{get_model_version()}"
+
+    results = {}
+    misses = []  # (путь, ключ кэша, размер)
+    hits = 0
+    for number, path in enumerate(paths):
+        if not is_supported(path):
+            results[path] = None
+            continue
+        try:
+            size = os.path.getsize(path)
+            # Резервируется чтение дайджеста (и для попаданий в кэш); разбор промахов — ниже
+            if not GOVERNOR.admit("documents", digest_read_size(size)):
+                GOVERNOR.defer("documents", len(paths) - number)
+                break
+            digest = file_digest(path)
+        except OSError:
+            results[path] = None
+            continue
+        index.set_digest(path, digest)
+
+        key = f"{digest}:{version}"
+        result = cache.get(key, default=FAILED)
+        if result is FAILED:
+            misses.append((path, key, size))
+        else:
+            results[path] = result
+            hits += 1
+
+    telemetry.inc("analysis_cache_hits_total", hits)
+    telemetry.inc("analysis_cache_misses_total", len(misses))
+    # Разбор — всегда в рабочих процессах (таймаут на документ); без пула — только при ANALYSIS_WORKERS = 0
+    parallel = ANALYSIS_WORKERS > 0
+    # Пачками, с проверкой бюджета между ними (классификация тоже входит в пачку)
+    for start in range(0, len(misses), ANALYSIS_CHUNK):
+        if start and GOVERNOR.exhausted():
+            GOVERNOR.defer("documents", len(misses) - start)
+            break
+        chunk = misses[start:start + ANALYSIS_CHUNK]
+        GOVERNOR.charge_read(sum(size for _, _, size in chunk))
+        for (path, key, _), result in zip(chunk, analyze_chunk([path for path, _, _ in chunk], parallel)):
+            if result is FAILED:
+                # Тайм-аут или сбой разбора: документ не кэшируется и не повторяется
+                result = None
+            else:
+                cache.put(key, result)
+            results[path] = result
+
+    return results
+
+def analyze_chunk(paths, parallel):
+    """Сканирование (пулом процессов при parallel) и пакетная классификация пачки документов."""
+    with telemetry.timed("stage_seconds", stage="extract"):
+        if parallel:
+            analyzed = get_analysis_pool().run(paths)
+        else:
+            analyzed = [scan_document(path) for path in paths]
+
+    scanned = [r for r in analyzed if r is not FAILED and r is not None]
+    texts = [r.pop("text") for r in scanned]
+    telemetry.inc("documents_scanned_total", len(paths))
+    telemetry.inc("extracted_chars_total", sum(len(text) for text in texts))
+    with telemetry.timed("stage_seconds", stage="classify"):
+        classifications = classify_documents(texts)
+    for result, classification in zip(scanned, classifications):
+        result["file_confidentiality_score"] = classification["file_confidentiality_score"]
+    return analyzed
+
+def get_scan_queue():
+    global _scan_queue
+    if _scan_queue is None:
+        _scan_queue = ScanQueue(SCAN_QUEUE_FILE, max_entries=SCAN_QUEUE_MAX_DOCS)
+    return _scan_queue
+
+def get_scan_queue_stats():
+    """Документы в очереди анализа и наибольшее ожидание (для метрик агента)."""
+    return get_scan_queue().stats()
+
+def get_analysis_pool():
+    global _analysis_pool
+    if _analysis_pool is None:
+        _analysis_pool = AnalysisPool(ANALYSIS_WORKERS, timeout=ANALYSIS_TIMEOUT, max_pending=ANALYSIS_MAX_PENDING)
+        GOVERNOR.add_cpu_source(_analysis_pool.cpu_seconds)
+    return _analysis_pool
+
+def scan_document(path):
+    """
+    Извлечение текста и поиск чувствительных данных в одном документе.
+    Текст обрабатывается потоково: детекторы получают все фрагменты, а первые
+    CLASSIFIER_MAX_CHARS символов возвращаются в поле "text" для пакетной
+    классификации. Возвращает None, если текст извлечь не удалось.
+    """
+    sample = []
+    sample_size = 0
+
+    def collect_sample(chunks):
+        nonlocal sample_size
+        for chunk in chunks:
+            if sample_size < CLASSIFIER_MAX_CHARS:
+                part = chunk[:CLASSIFIER_MAX_CHARS - sample_size]
+                sample.append(part)
+                sample_size += len(part)
+            yield chunk
+
+    found = DOCUMENT_SCANNER.scan_chunks(collect_sample(iter_text_chunks(path)))
+    text = "".join(sample)
+    if not text:
+        return None
+
+    return {
+        "match_count": found["keyword_matches"],
+        "card_number": 1 if found["card_numbers"] else 0,
+        "passport_data": 1 if found["passport_numbers"] else 0,
+        "text": text
+    }
+
+def get_analysis_cache():
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache(max_entries=ANALYSIS_CACHE_SIZE, path=ANALYSIS_CACHE_FILE)
+    return _analysis_cache
+
+def get_analysis_cache_stats():
+    """Статистика попаданий в кэш анализа (для подбора ANALYSIS_CACHE_SIZE)."""
+    return get_analysis_cache().stats()
+
+def get_index():
+    global _index
+    if _index is None:
+        _index = FileIndex()
+    return _index
+
+def get_watcher():
+    """
+    Возвращает активный наблюдатель событий или None, если нужен опрос каталогов.
+    Наблюдатель создаётся один раз; после исчерпания лимита inotify не пересоздаётся.
+    """
+    global _watcher, _watcher_started
+    if not _watcher_started and FILE_MONITOR_MODE in ("auto", "events"):
+        _watcher_started = True
+        _watcher = start_watcher(WATCH_DIRS + SYSTEM_DIRS)
+    if _watcher is not None and not _watcher.active:
+        _watcher = None
+    return _watcher
+
+def get_changed_files(events, index):
+    """
+    Событийный аналог get_recent_files: заполняет счётчики по буферу событий
+    и обновляет индекс только для изменившихся путей.
+    """
+    # Файлы удалённых или вынесенных из дерева каталогов; каталог, созданный
+    # заново под тем же именем, ниже добавится в индекс как новый
+    removed = sum(index.remove_tree(folder) for folder in events.deleted_dirs)
 
-def get_recent_files(directories, last_seconds=30):
-    now = time.time()
     files = []
-    current_file_map = {}
-    current_perm_map = {}
+    updates = {}
+    for file_path in sorted(events.created | events.modified | events.attrib_changed):
+        try:
+            stat = os.stat(file_path)
+            if not S_ISREG(stat.st_mode):
+                continue
+            record = make_record(file_path, stat)
+        except OSError:
+            continue
+        old = index.get(file_path)
+        if old is not None:
+            report_permission_change(file_path, old, record)
+        updates[file_path] = record
+
+        if file_path in events.created or file_path in events.modified:
+            files.append(file_path)
+            count_touched_file(file_path, created=file_path in events.created)
+
+    index.update(updates)
+    index.remove(events.deleted)
+    _state["file_delete_count"] = len(events.deleted) + removed
+
+    return files
+
+def report_permission_change(file_path, old, new):
+    if old.writable != new.writable:
+        print(f"🔒 Изменена доступность записи: {os.path.abspath(file_path)}")
+        _state["file_permission_changed_count"] += 1
+
+def count_touched_file(file_path, created):
+    if created:
+        _state["file_create_count"] += 1
+    else:
+        _state["file_update_count"] += 1
+
+    if any(file_path.lower().endswith(ext) for ext in ARCHIVE_EXTENSIONS):
+        _state["archive_created_count"] += 1
+
+    abs_path = os.path.abspath(file_path)
+    if any(abs_path.lower().startswith(os.path.abspath(sd).lower()) for sd in SYSTEM_DIRS):
+        _state["file_system_update_count"] += 1
+
+def get_recent_files(directories, last_seconds=30, now=None):
+    if now is None:
+        now = time.time()
+    files = []
+    current_records = {}
 
     for folder in directories:
         if not os.path.exists(folder):
@@ -103,68 +481,21 @@ def get_recent_files(directories, last_seconds=30):
                     continue
 
                 file_path = str(path)
-                abs_path = os.path.abspath(file_path)
                 stat = path.stat()
-                current_file_map[file_path] = stat.st_size
-                current_perm_map[file_path] = os.access(abs_path, os.W_OK)
+                current_records[file_path] = make_record(file_path, stat)
 
-                stat = path.stat()
                 modified_recently = now - stat.st_mtime <= last_seconds
                 created_recently = now - stat.st_ctime <= last_seconds
 
                 if modified_recently:
                     files.append(file_path)
-                    if created_recently:
-                        _state["file_create_count"] += 1
-                    else:
-                        _state["file_update_count"] += 1
-
-                    if any(path.suffix.lower() == ext for ext in ARCHIVE_EXTENSIONS):
-                        _state["archive_created_count"] += 1
-
-                    if any(abs_path.lower().startswith(os.path.abspath(sd).lower()) for sd in SYSTEM_DIRS):
-                        _state["file_system_update_count"] += 1
+                    count_touched_file(file_path, created=created_recently)
 
             except Exception:
                 continue
 
-    return files, current_file_map, current_perm_map
+    return files, current_records
 
 def reset_state():
     for key in _state:
         _state[key] = 0 if isinstance(_state[key], int) else 0.0
-
-def load_permission_cache():
-    path = CACHE_FILE.replace("filecache", "permcache")
-    if not os.path.exists(path):
-        return {}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def save_permission_cache(perm_map):
-    path = CACHE_FILE.replace("filecache", "permcache")
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(perm_map, f)
-    except Exception:
-        pass
-
-
-def load_file_cache():
-    if not os.path.exists(CACHE_FILE):
-        return {}
-    try:
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def save_file_cache(file_map):
-    try:
-        with open(CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(file_map, f)
-    except Exception:
-        pass
@@ -1,17 +1,49 @@
 # ml/file_classifier.py
 
-import joblib
 import os
+import threading
+from config import CLASSIFIER_BATCH_SIZE, FILE_MODEL_PATH, PREFER_COMPACT_MODELS
+from utils.compact_model import load_model, resolve_model_path
 
-# Путь до модели (можно настроить через config.py)
-MODEL_PATH = "C:/Projects/dlp-agent/features/file_work/ml/file_content_model.pkl"
+# Путь до модели (настраивается через config.py)
+MODEL_PATH = FILE_MODEL_PATH
 
-# Загрузка модели при импорте
-try:
-    model = joblib.load(MODEL_PATH)
-except FileNotFoundError:
-    model = None
-    print("⚠️ Модель классификации файлов не найдена:", MODEL_PATH)
+# Модель загружается при первом использовании (компактная .dlpm или pickle scikit-learn)
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+def get_model():
+    """Возвращает модель, загружая её при первом вызове; None — модель недоступна."""
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                try:
+                    _model = load_model(MODEL_PATH, PREFER_COMPACT_MODELS)
+                except FileNotFoundError:
+                    _model = None
+                    print("⚠️ Модель классификации файлов не найдена:", MODEL_PATH)
+                except Exception as e:
+                    _model = None
+                    print(f"⚠️ Не удалось загрузить модель классификации файлов: {e}")
+                _model_loaded = True
+    return _model
+
+def warm_up():
+    """Заранее загружает модель (вызывается в фоне после первого тика)."""
+    get_model()
+
+def get_model_version() -> str:
+    """
+    Версия модели (по размеру и времени изменения файла); саму модель не загружает.
+    Входит в ключ кэша анализа: переобученная модель сбрасывает кэш.
+    """
+    try:
+        stat = os.stat(resolve_model_path(MODEL_PATH, PREFER_COMPACT_MODELS))
+        return f"{stat.st_size}-{int(stat.st_mtime)}"
+    except OSError:
+        return "none"
 
 def classify_document(text: str) -> dict:
     """
@@ -21,22 +53,36 @@ def classify_document(text: str) -> dict:
     - file_confidentiality_score: float (максимальная вероятность)
     - file_class_label: int (предсказанный класс)
     """
-    if model is None or not text.strip():
-        return {
-            "file_confidentiality_score": 0.0,
-            "file_class_label": 0
-        }
+    return classify_documents([text])[0]
 
-    try:
-        prediction = model.predict([text])[0]
-        probabilities = model.predict_proba([text])[0]
-        return {
-            "file_confidentiality_score": round(float(max(probabilities)), 3),
-            "file_class_label": int(prediction)
-        }
-    except Exception as e:
-        print(f"⚠️ Ошибка при классификации документа: {e}")
-        return {
-            "file_confidentiality_score": 0.0,
-            "file_class_label": 0
-        }
+def classify_documents(texts: list[str], batch_size: int = CLASSIFIER_BATCH_SIZE) -> list[dict]:
+    """
+    Пакетная классификация: тексты векторизуются в одну разреженную матрицу,
+    и на пакет выполняется один вызов predict_proba; класс выводится из
+    вероятностей (argmax), без отдельного predict.
+
+    Возвращает по словарю на каждый текст (в том же порядке), как classify_document.
+    Тексты обрабатываются пакетами не более batch_size штук.
+    """
+    results = [{"file_confidentiality_score": 0.0, "file_class_label": 0} for _ in texts]
+    positions = [i for i, text in enumerate(texts) if text and text.strip()]
+    if not positions:
+        return results
+    model = get_model()
+    if model is None:
+        return results
+
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        try:
+            probabilities = model.predict_proba([texts[i] for i in batch])
+        except Exception as e:
+            print(f"⚠️ Ошибка при классификации документов: {e}")
+            continue
+        for i, row in zip(batch, probabilities):
+            best = int(row.argmax())
+            results[i] = {
+                "file_confidentiality_score": round(float(row[best]), 3),
+                "file_class_label": int(model.classes_[best])
+            }
+    return results
@@ -0,0 +1,204 @@
+# features/file_work/file_index.py
+
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+
+INDEX_FILE = os.path.expanduser("~/.dlp_fileindex.db")
+
+# Размер блока при подсчёте дайджеста содержимого
+DIGEST_BLOCK_SIZE = 1024 * 1024
+# Файлы до этого размера хешируются целиком; у больших (образы ISO, ВМ) — размер,
+# время изменения и первые и последние DIGEST_MAX_BYTES / 2 байт
+DIGEST_MAX_BYTES = 8 * 1024 * 1024
+
+# Запись индекса: размер, время изменения, inode, доступность на запись, дайджест
+FileRecord = namedtuple("FileRecord", ["size", "mtime", "inode", "writable", "digest"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    inode INTEGER NOT NULL,
+    writable INTEGER NOT NULL,
+    digest TEXT
+) WITHOUT ROWID
+"""
+
+
+class IndexDiff:
+    """Результат сравнения обхода каталогов с индексом."""
+
+    def __init__(self):
+        self.added = []        # новые пути
+        self.changed = []      # (path, old_record, new_record)
+        self.deleted = []      # пропавшие пути
+
+
+class FileIndex:
+    """
+    Постоянный индекс файлов на SQLite (WAL), ключ — путь.
+
+    Все изменения пишутся в транзакциях, поэтому аварийное завершение агента
+    не портит индекс. Записываются только изменившиеся строки.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        # Зеркало индекса в памяти; загружается только для режима опроса
+        self._mirror = None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        if self._mirror is not None:
+            return len(self._mirror)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def get(self, path):
+        if self._mirror is not None:
+            return self._mirror.get(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, inode, writable, digest FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        return _to_record(row) if row else None
+
+    def update(self, records):
+        """Вставляет или обновляет записи {path: FileRecord}."""
+        if not records:
+            return
+        rows = [(p, r.size, r.mtime, r.inode, int(r.writable), r.digest) for p, r in records.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime, inode, writable, digest) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        if self._mirror is not None:
+            self._mirror.update(records)
+
+    def remove(self, paths):
+        """Удаляет записи; возвращает число действительно удалённых путей."""
+        paths = list(paths)
+        if not paths:
+            return 0
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in paths])
+            removed = self._conn.total_changes - before
+        if self._mirror is not None:
+            for p in paths:
+                self._mirror.pop(p, None)
+        return removed
+
+    def remove_tree(self, folder):
+        """Удаляет записи всех файлов каталога и подкаталогов; возвращает их число."""
+        prefix = folder.rstrip(os.sep) + os.sep
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.execute("DELETE FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+            removed = self._conn.total_changes - before
+        if self._mirror is not None:
+            for p in [p for p in self._mirror if p.startswith(prefix)]:
+                del self._mirror[p]
+        return removed
+
+    def set_digest(self, path, digest):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE files SET digest = ? WHERE path = ?", (digest, path))
+        if self._mirror is not None and path in self._mirror:
+            self._mirror[path] = self._mirror[path]._replace(digest=digest)
+
+    def apply_scan(self, current) -> IndexDiff:
+        """
+        Сравнивает результат полного обхода {path: FileRecord} с индексом
+        и записывает на диск только изменившиеся строки.
+        """
+        mirror = self._load_mirror()
+        diff = IndexDiff()
+        updates = {}
+
+        for path, record in current.items():
+            old = mirror.get(path)
+            if old is None:
+                diff.added.append(path)
+                updates[path] = record
+            elif old[:4] != record[:4]:
+                if record.digest is None and (old.size, old.mtime, old.inode) == (record.size, record.mtime, record.inode):
+                    # Содержимое не менялось — дайджест остаётся действительным
+                    record = record._replace(digest=old.digest)
+                diff.changed.append((path, old, record))
+                updates[path] = record
+
+        diff.deleted = [path for path in mirror if path not in current]
+
+        self.update(updates)
+        self.remove(diff.deleted)
+        return diff
+
+    def _load_mirror(self):
+        if self._mirror is None:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT path, size, mtime, inode, writable, digest FROM files"
+                ).fetchall()
+            self._mirror = {row[0]: _to_record(row[1:]) for row in rows}
+        return self._mirror
+
+
+def _to_record(row):
+    size, mtime, inode, writable, digest = row
+    return FileRecord(size, mtime, inode, bool(writable), digest)
+
+
+def make_record(path, stat=None):
+    """Строит запись индекса по пути (stat можно передать, чтобы не вызывать повторно)."""
+    if stat is None:
+        stat = os.stat(path)
+    return FileRecord(stat.st_size, stat.st_mtime, stat.st_ino, os.access(path, os.W_OK), None)
+
+
+def file_digest(path, max_bytes=DIGEST_MAX_BYTES) -> str:
+    """
+    Быстрый дайджест содержимого файла (BLAKE2b, 128 бит). Файл больше
+    max_bytes читается не целиком (см. digest_read_size): в дайджест входят
+    размер, время изменения (нс) и первые и последние max_bytes / 2 байт,
+    поэтому перезапись большого файла всегда меняет дайджест.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size <= max_bytes:
+            for block in iter(lambda: f.read(DIGEST_BLOCK_SIZE), b""):
+                h.update(block)
+            return h.hexdigest()
+        h.update(f"{stat.st_size}:{stat.st_mtime_ns}:".encode())
+        edge = max_bytes // 2
+        for offset in (0, stat.st_size - edge):
+            f.seek(offset)
+            left = edge
+            while left > 0:
+                block = f.read(min(DIGEST_BLOCK_SIZE, left))
+                if not block:
+                    break
+                h.update(block)
+                left -= len(block)
+    return h.hexdigest()
+
+
+def digest_read_size(size, max_bytes=DIGEST_MAX_BYTES) -> int:
+    """Сколько байт file_digest читает из файла размера size."""
+    return size if size <= max_bytes else max_bytes // 2 * 2
@@ -0,0 +1,254 @@
+# features/file_work/file_watcher.py
+
+import os
+import sys
+import errno
+import struct
+import select
+import threading
+import ctypes
+import ctypes.util
+
+# Маски событий inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+WATCH_MASK = (
+    IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_DELETE | IN_ATTRIB |
+    IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class WatchLimitReached(Exception):
+    """Исчерпан лимит inotify (fs.inotify.max_user_watches) — нужен опрос."""
+
+
+class FileEvents:
+    """
+    События файловой системы, накопленные между двумя тиками.
+    Каждый путь учитывается в наборе не более одного раза.
+    """
+
+    def __init__(self):
+        self.created = set()
+        self.modified = set()
+        self.deleted = set()
+        self.attrib_changed = set()
+        # Каталоги, удалённые или перемещённые за пределы наблюдения, вместе с содержимым
+        self.deleted_dirs = set()
+        self.overflowed = False
+
+    def __bool__(self):
+        return bool(self.created or self.modified or self.deleted or self.attrib_changed or self.deleted_dirs)
+
+
+class FileEventWatcher:
+    """
+    Подписка на события inotify для набора каталогов (рекурсивно).
+
+    События читаются фоновым потоком и буферизуются до вызова drain().
+    Если при добавлении наблюдения исчерпан лимит ядра, выставляется
+    limit_reached, и вызывающий код должен вернуться к опросу каталогов.
+    Каталог, удалённый или перемещённый из дерева, снимается с наблюдения
+    вместе с подкаталогами и попадает в deleted_dirs: его файлы наблюдатель
+    не перечисляет, они удаляются из индекса по префиксу пути.
+    """
+
+    def __init__(self, directories):
+        self.directories = [os.path.abspath(d) for d in directories if os.path.isdir(d)]
+        self.limit_reached = False
+        self._libc = _load_libc()
+        self._fd = -1
+        self._wd_to_dir = {}
+        self._lock = threading.Lock()
+        self._events = FileEvents()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        try:
+            for folder in self.directories:
+                self._watch_tree(folder)
+        except WatchLimitReached:
+            self.limit_reached = True
+            self.stop()
+            raise
+
+        self._thread = threading.Thread(target=self._run, name="dlp-file-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._fd >= 0:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = -1
+
+    @property
+    def active(self):
+        return self._fd >= 0 and not self.limit_reached
+
+    def drain(self) -> FileEvents:
+        """Возвращает накопленные события и начинает новый интервал."""
+        with self._lock:
+            events, self._events = self._events, FileEvents()
+        return events
+
+    # --- внутреннее ---
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise WatchLimitReached(path)
+            return None
+        self._wd_to_dir[wd] = path
+        return wd
+
+    def _drop_tree(self, root, remove_watches):
+        """
+        Снимает наблюдение с каталога и его подкаталогов (устаревшие wd иначе
+        относили бы события к прежним путям) и учитывает его как удалённый.
+        """
+        prefix = root + os.sep
+        for wd, folder in list(self._wd_to_dir.items()):
+            if folder == root or folder.startswith(prefix):
+                del self._wd_to_dir[wd]
+                if remove_watches:
+                    self._libc.inotify_rm_watch(self._fd, wd)
+        events = self._events
+        for paths in (events.created, events.modified, events.attrib_changed, events.deleted):
+            paths.difference_update([path for path in paths if path.startswith(prefix)])
+        events.deleted_dirs.add(root)
+
+    def _watch_tree(self, root, report_files=False):
+        """Ставит наблюдение на каталог и все его подкаталоги (обходятся только каталоги)."""
+        for dirpath, dirnames, filenames in os.walk(root):
+            self._add_watch(dirpath)
+            if report_files:
+                # Файлы, появившиеся до установки наблюдения за новым каталогом
+                for name in filenames:
+                    self._events.created.add(os.path.join(dirpath, name))
+
+    def _run(self):
+        while not self._stop.is_set():
+            fd = self._fd
+            if fd < 0:
+                return
+            try:
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if not ready:
+                    continue
+                data = os.read(fd, 64 * 1024)
+            except (OSError, ValueError):
+                if self._stop.is_set():
+                    return
+                continue
+            try:
+                with self._lock:
+                    self._handle(data)
+            except WatchLimitReached:
+                print("⚠️ Достигнут лимит inotify — файловая активность переключена на опрос")
+                self.limit_reached = True
+                self.stop()
+                return
+
+    def _handle(self, data):
+        offset = 0
+        events = self._events
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self._wd_to_dir.pop(wd, None)
+                continue
+
+            folder = self._wd_to_dir.get(wd)
+            if folder is None:
+                continue
+            if not name:
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF) and folder in self.directories:
+                    # Удалён или перемещён сам наблюдаемый корневой каталог
+                    self._drop_tree(folder, remove_watches=bool(mask & IN_MOVE_SELF))
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(path, report_files=True)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    # Перемещённый каталог остаётся под наблюдением ядра — снимается явно;
+                    # при переносе внутри дерева IN_MOVED_TO поставит его заново
+                    self._drop_tree(path, remove_watches=bool(mask & IN_MOVED_FROM))
+                continue
+
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                events.created.add(path)
+                events.deleted.discard(path)
+            elif mask & (IN_MODIFY | IN_CLOSE_WRITE):
+                if path not in events.created:
+                    events.modified.add(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                events.modified.discard(path)
+                events.attrib_changed.discard(path)
+                if path in events.created:
+                    # Временный файл: создан и удалён в пределах одного интервала
+                    events.created.discard(path)
+                else:
+                    events.deleted.add(path)
+            elif mask & IN_ATTRIB:
+                events.attrib_changed.add(path)
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        raise OSError("inotify доступен только в Linux")
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def start_watcher(directories):
+    """
+    Запускает наблюдение за каталогами.
+    Возвращает None, если inotify недоступен или лимит наблюдений исчерпан.
+    """
+    try:
+        watcher = FileEventWatcher(directories)
+        watcher.start()
+        return watcher
+    except WatchLimitReached:
+        print("⚠️ Достигнут лимит inotify — файловая активность собирается опросом")
+        return None
+    except (OSError, AttributeError):
+        return None
@@ -0,0 +1,140 @@
+# features/file_work/scan_queue.py
+
+import os
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+# Вес расширения документа в приоритете анализа (прочие поддерживаемые — 1)
+EXTENSION_PRIORITY = {".docx": 2, ".pdf": 2, ".txt": 1}
+# Надбавки: документ в наблюдаемых каталогах пользователя, чувствительное слово в имени,
+# небольшой размер (разбирается быстро), недавняя активность USB или крупная выгрузка в сеть
+WATCH_DIR_BONUS = 2
+SENSITIVE_NAME_BONUS = 2
+SMALL_FILE_BONUS = 2
+SMALL_FILE_BYTES = 1024 * 1024
+ACTIVITY_BONUS = 3
+
+# Документ в очереди: путь, приоритет, размер, начало интервала отправки, в котором
+# файл изменился, и время постановки в очередь
+QueuedDocument = namedtuple("QueuedDocument", ["path", "priority", "size", "changed", "queued"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scan_queue (
+    path TEXT PRIMARY KEY,
+    priority REAL NOT NULL,
+    size INTEGER NOT NULL,
+    changed REAL NOT NULL,
+    queued REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+_INDEX = "CREATE INDEX IF NOT EXISTS scan_queue_order ON scan_queue (priority DESC, queued)"
+
+
+def document_priority(path, size, watch_dirs=(), keywords=(), recent_activity=False) -> float:
+    """Эвристика риска документа: чем выше, тем раньше он анализируется."""
+    priority = EXTENSION_PRIORITY.get(Path(path).suffix.lower(), 1)
+    abs_path = os.path.abspath(path).lower()
+    if any(abs_path.startswith(os.path.abspath(d).lower() + os.sep) for d in watch_dirs):
+        priority += WATCH_DIR_BONUS
+    name = os.path.basename(abs_path)
+    if any(word.lower() in name for word in keywords):
+        priority += SENSITIVE_NAME_BONUS
+    if size <= SMALL_FILE_BYTES:
+        priority += SMALL_FILE_BONUS
+    if recent_activity:
+        priority += ACTIVITY_BONUS
+    return priority
+
+
+class ScanQueue:
+    """
+    Постоянная очередь документов на анализ (SQLite, WAL), ключ — путь.
+
+    Повторное изменение документа в очереди обновляет его размер и интервал
+    изменения, приоритет остаётся наибольшим из поставленных, время постановки
+    не меняется (документ не теряет очередь). Документ удаляется из очереди
+    только после анализа (remove), поэтому перезапуск агента его не теряет.
+    Сверх max_entries отбрасываются документы с наименьшим приоритетом.
+    """
+
+    def __init__(self, path, max_entries=50000):
+        self.path = path
+        self.max_entries = max_entries
+        self.dropped = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(_INDEX)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scan_queue").fetchone()[0]
+
+    def push(self, documents, now=None):
+        """Ставит в очередь документы [(путь, приоритет, размер, начало интервала изменения)]."""
+        if not documents:
+            return
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO scan_queue (path, priority, size, changed, queued) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET priority = MAX(priority, excluded.priority), "
+                "size = excluded.size, changed = MAX(changed, excluded.changed)",
+                [(path, priority, size, changed, now) for path, priority, size, changed in documents]
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM scan_queue").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM scan_queue WHERE path IN (SELECT path FROM scan_queue "
+                    "ORDER BY priority, queued DESC LIMIT ?)", (excess,)
+                )
+                self.dropped += excess
+
+    def peek(self, limit, min_priority=None, max_size=None, queued_before=None):
+        """
+        До limit документов по убыванию приоритета (при равном — раньше поставленные).
+        Если заданы min_priority и max_size, выбираются документы не ниже min_priority
+        и не больше max_size байт, а также поставленные раньше queued_before (любые).
+        """
+        sql = "SELECT path, priority, size, changed, queued FROM scan_queue"
+        args = []
+        if min_priority is not None or max_size is not None:
+            sql += " WHERE (priority >= ? AND size <= ?)"
+            args += [min_priority if min_priority is not None else float("-inf"),
+                     max_size if max_size is not None else float("inf")]
+            if queued_before is not None:
+                sql += " OR queued <= ?"
+                args.append(queued_before)
+        sql += " ORDER BY priority DESC, queued LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, args + [limit]).fetchall()
+        return [QueuedDocument(*row) for row in rows]
+
+    def remove(self, paths):
+        """Удаляет проанализированные документы из очереди."""
+        paths = list(paths)
+        if not paths:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM scan_queue WHERE path = ?", [(p,) for p in paths])
+
+    def stats(self, now=None) -> dict:
+        now = time.time() if now is None else now
+        with self._lock:
+            count, oldest = self._conn.execute("SELECT COUNT(*), MIN(queued) FROM scan_queue").fetchone()
+        return {
+            "documents": count,
+            "oldest_wait_sec": round(now - oldest, 1) if oldest is not None else 0.0,
+            "dropped": self.dropped,
+        }
@@ -1,4 +1,5 @@
 # train_file_classifier.py
+# Запуск из корня репозитория: python -m features.file_work.train_file_classifier
 
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -8,12 +9,14 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 import joblib
 import os
+from utils.compact_model import export_pipeline, compact_path
 
 # Путь для сохранения модели
-MODEL_OUTPUT_PATH = os.path.join("ml", "file_content_model.pkl")
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL_OUTPUT_PATH = os.path.join(HERE, "ml", "file_content_model.pkl")
 
 # Путь к CSV-файлу с размеченными данными
-DATASET_PATH = "datasets/file_dataset.csv"  # ожидается CSV: text, label
+DATASET_PATH = os.path.join(HERE, "datasets", "file_dataset.csv")  # ожидается CSV: text, label
 
 
 def train_model():
@@ -45,6 +48,10 @@ def train_model():
     joblib.dump(pipeline, MODEL_OUTPUT_PATH)
     print(f"\n✅ Модель сохранена в: {MODEL_OUTPUT_PATH}")
 
+    # Компактная копия для агента (проверяется на тестовой выборке)
+    export_pipeline(pipeline, compact_path(MODEL_OUTPUT_PATH), check_texts=X_test)
+    print(f"✅ Компактная модель сохранена в: {compact_path(MODEL_OUTPUT_PATH)}")
+
 
 if __name__ == "__main__":
     train_model()
@@ -0,0 +1,191 @@
+# features/network_activity/connection_sampler.py
+#
+# Частый опрос сетевых соединений чтением /proc/net/{tcp,tcp6,udp,udp6} (Linux).
+# Соединения, открытые и закрытые между тиками сборщика, попадают в выборку,
+# если прожили дольше периода опроса.
+
+import socket
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+PROC_NET_TABLES = (
+    ("/proc/net/tcp", socket.AF_INET, socket.SOCK_STREAM),
+    ("/proc/net/tcp6", socket.AF_INET6, socket.SOCK_STREAM),
+    ("/proc/net/udp", socket.AF_INET, socket.SOCK_DGRAM),
+    ("/proc/net/udp6", socket.AF_INET6, socket.SOCK_DGRAM),
+)
+
+# Состояния TCP из include/net/tcp_states.h
+TCP_STATES = {
+    "01": "ESTABLISHED", "02": "SYN_SENT", "03": "SYN_RECV", "04": "FIN_WAIT1",
+    "05": "FIN_WAIT2", "06": "TIME_WAIT", "07": "CLOSE", "08": "CLOSE_WAIT",
+    "09": "LAST_ACK", "0A": "LISTEN", "0B": "CLOSING",
+}
+_LISTEN = "0A"
+
+# Поля совпадают с psutil.net_connections(), поэтому сборщик принимает оба вида
+Address = namedtuple("Address", ["ip", "port"])
+SampledConnection = namedtuple("SampledConnection", ["fd", "family", "type", "laddr", "raddr", "status", "pid", "inode"])
+
+
+def parse_address(text: str, family) -> Address:
+    """'0100007F:1F90' -> Address('127.0.0.1', 8080); адрес хранится словами в порядке хоста."""
+    host, port = text.split(":")
+    raw = bytes.fromhex(host)
+    # Каждое 32-битное слово записано в little-endian
+    raw = b"".join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+    return Address(socket.inet_ntop(family, raw), int(port, 16))
+
+
+def read_table(path, family, kind, known=None):
+    """
+    Читает одну таблицу /proc/net: [(ключ, SampledConnection)] для соединений
+    с удалённым адресом (слушающие сокеты и UDP без адреса пропускаются).
+    Ключ — (локальный, удалённый адрес, inode) в виде строк файла; для ключей
+    из known соединение не разбирается повторно (возвращается None).
+    Строки, которые не удаётся разобрать, пропускаются.
+    """
+    result = []
+    with open(path, "r") as f:
+        next(f, None)
+        for line in f:
+            fields = line.split()
+            if len(fields) < 10:
+                continue
+            local, remote, state, inode = fields[1], fields[2], fields[3], fields[9]
+            if state == _LISTEN or remote.endswith(":0000"):
+                continue
+            key = (local, remote, inode)
+            if known is not None and key in known:
+                result.append((key, None))
+                continue
+            status = TCP_STATES.get(state, state) if kind == socket.SOCK_STREAM else "NONE"
+            try:
+                conn = SampledConnection(
+                    -1, family, kind, parse_address(local, family), parse_address(remote, family),
+                    status, None, int(inode)
+                )
+            except (ValueError, OSError):
+                # Испорченная или обрезанная строка таблицы пропускается
+                continue
+            result.append((key, conn))
+    return result
+
+
+class ConnectionSampler:
+    """
+    Фоновый опрос соединений с периодом interval секунд.
+
+    Соединения различаются по (локальный адрес, удалённый адрес, inode) и
+    хранятся в кольцевом буфере не более чем capacity записей (при переполнении
+    вытесняются самые давние, счётчик dropped). drain() отдаёт все соединения,
+    замеченные с прошлого вызова, включая уже закрытые. Разбор строки таблицы
+    выполняется один раз за время жизни соединения; затраты процессорного
+    времени потока опроса видны в stats().
+    """
+
+    def __init__(self, interval=0.25, capacity=8192, tables=PROC_NET_TABLES):
+        self.interval = interval
+        self.capacity = capacity
+        self.tables = tables
+        self.samples = 0
+        self.dropped = 0
+        self.errors = 0
+        self.cpu_time = 0.0
+        self._seen = OrderedDict()   # ключ -> SampledConnection, замеченные с прошлого drain
+        self._pairs = set()          # (локальный, удалённый адрес) записей _seen
+        self._reported = set()       # то же для соединений, отданных прошлым drain
+        self._alive = {}             # ключ -> SampledConnection, присутствовавшие в последнем опросе
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    @staticmethod
+    def available(tables=PROC_NET_TABLES) -> bool:
+        try:
+            open(tables[0][0]).close()
+            return True
+        except OSError:
+            return False
+
+    def start(self):
+        if self._thread is None:
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._loop, name="dlp-conn-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def sample(self):
+        """Один опрос всех таблиц."""
+        started = time.thread_time()
+        alive = {}
+        for path, family, kind in self.tables:
+            try:
+                rows = read_table(path, family, kind, self._alive)
+            except OSError:
+                continue
+            for key, conn in rows:
+                alive[key] = conn if conn is not None else self._alive[key]
+        with self._lock:
+            for key, conn in alive.items():
+                if key in self._seen:
+                    continue
+                # Сокет без inode (ещё не принятый accept() или уже закрытый, TIME_WAIT) —
+                # то же соединение, что и запись с inode для той же пары адресов
+                if key[2] == "0":
+                    if key[:2] in self._pairs or key[:2] in self._reported:
+                        continue
+                else:
+                    self._seen.pop(key[:2] + ("0",), None)
+                self._seen[key] = conn
+                self._pairs.add(key[:2])
+                if len(self._seen) > self.capacity:
+                    evicted, _ = self._seen.popitem(last=False)
+                    self._pairs.discard(evicted[:2])
+                    self.dropped += 1
+        self._alive = alive
+        self.samples += 1
+        self.cpu_time += time.thread_time() - started
+
+    def drain(self) -> list:
+        """Соединения, замеченные с прошлого вызова (открытые сейчас остаются в следующем интервале)."""
+        with self._lock:
+            seen = self._seen
+            self._reported = self._pairs
+            self._seen = OrderedDict((key, conn) for key, conn in self._alive.items() if key[2] != "0")
+            self._pairs = {key[:2] for key in self._seen}
+        return list(seen.values())
+
+    def stats(self) -> dict:
+        wall = time.monotonic() - self._started if self._started else 0.0
+        return {
+            "samples": self.samples,
+            "interval": self.interval,
+            "tracked": len(self._seen),
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "cpu_sec": round(self.cpu_time, 3),
+            "cpu_per_sample_ms": round(self.cpu_time / self.samples * 1000, 3) if self.samples else 0.0,
+            "cpu_share": round(self.cpu_time / wall, 4) if wall else 0.0,
+        }
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.sample()
+            except Exception as e:
+                # Опрос продолжается; при повторяющейся ошибке сообщение выводится один раз
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"⚠️ Ошибка опроса соединений: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,109 @@
+# features/network_activity/dns_resolver.py
+
+import time
+import socket
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from utils import telemetry
+
+
+class ReverseResolver:
+    """
+    Обратное разрешение IP-адресов в имена без блокировки сбора признаков.
+
+    Адреса тика разрешаются параллельно пулом потоков; на весь тик отводится
+    budget секунд. Адрес, не разрешённый за бюджет, возвращается как None
+    (вызывающий использует сам IP), а запрос продолжается в фоне и его
+    результат попадает в кэш к следующему тику. Каждый адрес запрашивается
+    не более одного раза одновременно; ожидание бюджета относится только
+    к новым запросам.
+
+    Кэш ограничен max_entries записями (LRU); имя хранится ttl секунд,
+    отсутствие PTR-записи или ошибка — negative_ttl секунд.
+    lookup — функция ip -> (имя, ...) (по умолчанию socket.gethostbyaddr).
+    """
+
+    def __init__(self, workers=16, budget=0.5, max_entries=4096, ttl=3600, negative_ttl=300, lookup=None):
+        self.budget = budget
+        self.lookup = lookup or socket.gethostbyaddr
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._workers = workers
+        self._executor = None
+        self._entries = OrderedDict()   # ip -> (имя или None, время истечения)
+        self._in_flight = {}            # ip -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve_many(self, ips) -> dict:
+        """
+        Разрешает адреса; возвращает {ip: имя или None}.
+        None — имени нет или оно ещё не получено.
+        """
+        result = {}
+        waiting = []
+        now = time.monotonic()
+        with self._lock:
+            for ip in set(ips):
+                entry = self._entries.get(ip)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(ip)
+                    self.hits += 1
+                    result[ip] = entry[0]
+                    continue
+                self.misses += 1
+                if ip in self._in_flight:
+                    # Запрос из прошлых тиков ещё идёт — не ждём его повторно
+                    result[ip] = None
+                    continue
+                future = self._submit(ip)
+                self._in_flight[ip] = future
+                waiting.append((ip, future))
+
+        if waiting:
+            wait([f for _, f in waiting], timeout=self.budget)
+        for ip, future in waiting:
+            # Непредвиденная ошибка запроса — как отсутствие имени (без записи в кэш)
+            result[ip] = future.result() if future.done() and future.exception() is None else None
+        return result
+
+    def resolve(self, ip):
+        return self.resolve_many([ip])[ip]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def _submit(self, ip):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="dlp-dns")
+        return self._executor.submit(self._lookup, ip)
+
+    def _lookup(self, ip):
+        started = time.perf_counter()
+        try:
+            try:
+                host = self.lookup(ip)[0]
+            except (OSError, UnicodeError):
+                host = None
+            telemetry.observe("dns_lookup_seconds", time.perf_counter() - started)
+            with self._lock:
+                expires = time.monotonic() + (self.ttl if host else self.negative_ttl)
+                self._entries[ip] = (host, expires)
+                self._entries.move_to_end(ip)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return host
+        finally:
+            # Иначе после непредвиденной ошибки адрес больше никогда не запрашивался бы
+            with self._lock:
+                self._in_flight.pop(ip, None)
@@ -1,11 +1,18 @@
 # features/network_activity/network_monitor.py
 
-import psutil
-import socket
 import datetime
 import re
+import struct
 from urllib.parse import urlparse
+from config import DNS_RESOLVE_WORKERS, DNS_RESOLVE_BUDGET, DNS_CACHE_SIZE, DNS_POSITIVE_TTL, DNS_NEGATIVE_TTL
+from config import UPLOAD_ACCOUNTING, UPLOAD_ALLOWLIST, UPLOAD_TRACKED_PROCESSES
+from config import CONN_SAMPLE_INTERVAL, CONN_SAMPLE_CAPACITY
 from features.network_activity.site_semantic_evaluator import evaluate_multiple_sites
+from features.network_activity.dns_resolver import ReverseResolver
+from features.network_activity.upload_accounting import UploadAccounting
+from features.network_activity.connection_sampler import ConnectionSampler
+from utils.snapshot import SystemSnapshot
+from utils import activity
 
 # Списки для детекции
 WEBMAIL_DOMAINS = [
@@ -19,6 +26,12 @@ FILE_SHARING_DOMAINS = [
 SUSPICIOUS_KEYWORDS = ["взлом", "пароль", "bypass", "adminpanel"]
 RISKY_CATEGORIES = ["webmail", "fileshare", "vpn", "proxy", "darknet"]
 VPN_PROCESSES = ["openvpn.exe", "nordvpn.exe", "expressvpn.exe", "openvpn"]
+VPN_SET = frozenset(VPN_PROCESSES)
+BROWSER_PROCESSES = [
+    "chrome", "chromium", "firefox", "opera", "yandex_browser", "msedge",
+    "chrome.exe", "firefox.exe", "msedge.exe", "opera.exe", "browser.exe"
+]
+BROWSER_SET = frozenset(BROWSER_PROCESSES)
 PROXY_PORTS = [8080, 3128, 1080, 8000, 8888]
 FTP_SMTP_PORTS = [21, 25, 587]
 
@@ -48,37 +61,85 @@ _state = {
 _seen_domains = set()
 _categories = set()
 _last_sent_bytes = 0
+# Счётчики внешних интерфейсов (без loopback) для сверки учёта по сокетам
+_last_external = None
+
+# Кэш обратного разрешения адресов сохраняется между тиками
+_resolver = ReverseResolver(
+    workers=DNS_RESOLVE_WORKERS, budget=DNS_RESOLVE_BUDGET, max_entries=DNS_CACHE_SIZE,
+    ttl=DNS_POSITIVE_TTL, negative_ttl=DNS_NEGATIVE_TTL
+)
+
+# Учёт отправленных байт по процессам (Linux); None — только общий счётчик системы
+_uploads = UploadAccounting(allowlist=UPLOAD_ALLOWLIST, max_processes=UPLOAD_TRACKED_PROCESSES) if UPLOAD_ACCOUNTING else None
+_last_upload_table = None
+
+# Частый опрос /proc/net между тиками (Linux); запускается при первом сборе
+_sampler = ConnectionSampler(interval=CONN_SAMPLE_INTERVAL, capacity=CONN_SAMPLE_CAPACITY) \
+    if CONN_SAMPLE_INTERVAL and ConnectionSampler.available() else None
 
 
-def collect_network_features():
+def collect_network_features(snapshot=None):
     reset_state()
+    snapshot = snapshot or SystemSnapshot()
 
-    global _last_sent_bytes
-    counters = psutil.net_io_counters()
+    global _last_sent_bytes, _last_external, _last_upload_table, _uploads
+    counters = snapshot.net_io_counters()
     sent = counters.bytes_sent
     recv = counters.bytes_recv
 
     upload_diff = sent - _last_sent_bytes if _last_sent_bytes else 0
     _last_sent_bytes = sent
 
+    # По процессам: без трафика разрешённых процессов (обновления, резервное копирование)
+    table = None
+    if _uploads is not None:
+        # Короткие соединения между замерами и UDP находятся сверкой со счётчиками интерфейсов
+        external = _external_counters(snapshot)
+        sent_delta = recv_delta = None
+        if _last_external is not None:
+            sent_delta = max(0, external[0] - _last_external[0])
+            recv_delta = max(0, external[1] - _last_external[1])
+        _last_external = external
+        try:
+            table = _uploads.sample({proc.pid: proc.name for proc in snapshot.processes()}, sent_delta, recv_delta)
+        except OSError as e:
+            print(f"⚠️ Учёт трафика по процессам недоступен, используется общий счётчик: {e}")
+            _uploads = None
+        except (struct.error, ValueError) as e:
+            # Усечённое или необычное сообщение sock_diag: в этом тике — общий счётчик
+            print(f"⚠️ Ошибка разбора таблицы сокетов, в этом интервале используется общий счётчик: {e}")
+    _last_upload_table = table
+    if table is not None:
+        upload_diff = table.total
+
     _state["upload_volume_MB"] = round(upload_diff / 1024 / 1024, 2)
     if _state["upload_volume_MB"] > 10:
         _state["upload_spike_detected"] = 1
 
-    connections = psutil.net_connections(kind="inet")
+    # Все соединения интервала по данным опроса; до его запуска — текущие из снимка
+    if _sampler is not None and _sampler.running:
+        connections = _sampler.drain()
+    else:
+        connections = snapshot.connections()
+        if _sampler is not None:
+            _sampler.start()
     external_ips = set()
     risky_count = 0
     domains_for_semantic = set()
 
+    # Адреса разрешаются один раз за тик, параллельно и в пределах бюджета
+    hosts = _resolver.resolve_many(conn.raddr.ip for conn in connections if conn.raddr)
+
     for conn in connections:
         if conn.raddr:
             ip = conn.raddr.ip
             port = conn.raddr.port
-            try:
-                host = socket.gethostbyaddr(ip)[0]
+            host = hosts.get(ip)
+            if host:
                 parts = host.lower().split('.')
                 domain = ".".join(parts[-2:]) if len(parts) >= 2 else host
-            except:
+            else:
                 domain = ip
 
             if domain not in _seen_domains:
@@ -124,17 +185,21 @@ def collect_network_features():
     _state["suspicious_dns_queries"] = 1 if risky_count > 0 else 0
 
     # VPN процессы
-    for proc in psutil.process_iter(["name"]):
-        try:
-            if proc.info["name"] and proc.info["name"].lower() in VPN_PROCESSES:
-                _state["vpn_activated"] = 1
-        except:
-            continue
+    if any(proc.name.lower() in VPN_SET for proc in snapshot.processes()):
+        _state["vpn_activated"] = 1
 
     # Вывод без браузера
-    if _state["upload_volume_MB"] > 2 and _state["http_requests_count"] < 3:
+    if table is not None:
+        non_browser = sum(size for name, size in table.by_process.items() if name.lower() not in BROWSER_SET)
+        if non_browser / 1024 / 1024 > 2:
+            _state["external_upload_without_web_activity"] = 1
+    elif _state["upload_volume_MB"] > 2 and _state["http_requests_count"] < 3:
         _state["external_upload_without_web_activity"] = 1
 
+    # Крупная выгрузка повышает приоритет анализа документов, изменённых в это же время
+    if _state["upload_spike_detected"] or _state["external_upload_without_web_activity"]:
+        activity.mark(activity.UPLOAD, snapshot.time)
+
     # Семантический анализ сайтов
     if domains_for_semantic:
         result = evaluate_multiple_sites(list(domains_for_semantic))
@@ -143,6 +208,42 @@ def collect_network_features():
     return dict(_state)
 
 
+def _external_counters(snapshot) -> tuple:
+    """(отправлено, принято) байт по всем интерфейсам, кроме loopback."""
+    sent = received = 0
+    for nic, counters in snapshot.net_io_counters(pernic=True).items():
+        if nic == "lo" or nic.startswith("lo:"):
+            continue
+        sent += counters.bytes_sent
+        received += counters.bytes_recv
+    return sent, received
+
+
+def get_resolver_stats() -> dict:
+    return _resolver.stats()
+
+
+def get_sampler_stats() -> dict:
+    """Затраты и состояние опроса соединений (пусто, если опрос отключён)."""
+    return _sampler.stats() if _sampler is not None else {}
+
+
+def get_top_uploaders(n=10) -> dict:
+    """
+    Основные источники исходящего трафика за последний тик: по процессам
+    и по адресам назначения (пусто, если учёт по процессам недоступен
+    или выгрузки не было). Трафик, не найденный по сокетам, — процесс "?".
+    """
+    table = _last_upload_table
+    if table is None or not table.total:
+        return {}
+    return {
+        "processes": [{"process": name, "bytes": size} for name, size in table.by_process.most_common(n)],
+        "endpoints": [{"process": name, "endpoint": endpoint, "bytes": size}
+                      for (name, endpoint), size in table.by_endpoint.most_common(n)],
+    }
+
+
 def reset_state():
     for key in _state:
         _state[key] = 0 if isinstance(_state[key], (int, float)) else 0
@@ -0,0 +1,96 @@
+# features/network_activity/site_score_cache.py
+
+import os
+import json
+import time
+import threading
+
+
+class SiteScoreCache:
+    """
+    Кэш семантических оценок сайтов по домену с временем жизни.
+
+    Успешная оценка хранится ttl секунд, неудачная (сайт не ответил,
+    текст не извлечён) — failure_ttl секунд, чтобы недоступные домены
+    не запрашивались каждый тик. Если задан path, кэш сохраняется в JSON
+    и переживает перезапуск агента. Хранится не более max_entries доменов.
+    """
+
+    def __init__(self, ttl=3600, failure_ttl=300, max_entries=10000, path=None):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = {}      # домен -> (оценка, время истечения по часам системы, успех)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._load()
+
+    def get(self, domain):
+        """Возвращает (оценка, успех) или None, если записи нет или она устарела."""
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry is None or entry[1] <= time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0], entry[2]
+
+    def put(self, domain, score, ok=True):
+        with self._lock:
+            expires = time.time() + (self.ttl if ok else self.failure_ttl)
+            self._entries[domain] = (score, expires, ok)
+            self._dirty = True
+            if len(self._entries) > self.max_entries:
+                self._prune()
+
+    def save(self):
+        """Записывает кэш на диск (если задан path и были изменения)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            self._prune()
+            data = {d: list(entry) for d, entry in self._entries.items()}
+            self._dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить кэш оценок сайтов: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def _prune(self):
+        now = time.time()
+        self._entries = {d: e for d, e in self._entries.items() if e[1] > now}
+        if len(self._entries) > self.max_entries:
+            keep = sorted(self._entries.items(), key=lambda item: item[1][1], reverse=True)[:self.max_entries]
+            self._entries = dict(keep)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            self._entries = {
+                d: (float(score), float(expires), bool(ok))
+                for d, (score, expires, ok) in data.items() if float(expires) > now
+            }
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️ Кэш оценок сайтов не загружен: {e}")
@@ -1,54 +1,275 @@
 # features/network_activity/site_semantic_evaluator.py
 
-import requests
-from bs4 import BeautifulSoup
-import joblib
-import numpy as np
-import os
+import time
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import (
+    SITE_MODEL_PATH, PREFER_COMPACT_MODELS,
+    SITE_FETCH_WORKERS, SITE_FETCH_TIMEOUT, SITE_FETCH_BUDGET, SITE_MAX_BYTES,
+    SITE_SCORE_TTL, SITE_FAILURE_TTL, SITE_SCORE_CACHE_FILE
+)
+from utils.compact_model import load_model
+from features.network_activity.site_score_cache import SiteScoreCache
+from utils import telemetry
+from utils.governor import GOVERNOR
 
-MODEL_PATH = "features/network_activity/models/site_risk_model.pkl"
+MODEL_PATH = SITE_MODEL_PATH
 
-try:
-    model = joblib.load(MODEL_PATH)
-except:
-    model = None
-    print("⚠️ Не удалось загрузить модель семантической оценки сайтов.")
+# Размер блока при потоковом чтении страницы
+READ_CHUNK_SIZE = 16 * 1024
 
+# Сколько сайтов, отложенных из-за бюджета ресурсов, хранится до следующих тиков
+MAX_PENDING_SITES = 1000
 
-def extract_text_from_site(url: str) -> str:
+# Модель и requests загружаются при первом использовании
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+# Пул потоков загрузки и общая сессия (переиспользование соединений)
+_executor = None
+_session = None
+_fetch_lock = threading.Lock()
+_score_cache = None
+
+# Сайты, загрузка которых отложена из-за бюджета ресурсов (адрес -> None, по порядку):
+# загружаются первыми в следующих тиках, даже если домен больше не встречается
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def get_model():
+    """Возвращает модель, загружая её при первом вызове; None — модель недоступна."""
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                try:
+                    _model = load_model(MODEL_PATH, PREFER_COMPACT_MODELS)
+                except:
+                    _model = None
+                    print("⚠️ Не удалось загрузить модель семантической оценки сайтов.")
+                _model_loaded = True
+    return _model
+
+
+def warm_up():
+    """Заранее загружает модель и библиотеку загрузки страниц."""
+    get_model()
+    import requests
+
+
+def get_score_cache() -> SiteScoreCache:
+    global _score_cache
+    if _score_cache is None:
+        _score_cache = SiteScoreCache(SITE_SCORE_TTL, SITE_FAILURE_TTL, path=SITE_SCORE_CACHE_FILE)
+    return _score_cache
+
+
+def _get_fetcher():
+    """Пул потоков и сессия requests с пулом соединений по числу потоков."""
+    global _executor, _session
+    with _fetch_lock:
+        if _executor is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=SITE_FETCH_WORKERS, pool_maxsize=SITE_FETCH_WORKERS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _executor = ThreadPoolExecutor(max_workers=SITE_FETCH_WORKERS, thread_name_prefix="dlp-site-fetch")
+    return _executor, _session
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Извлекает из HTML заголовок страницы, заголовки h1–h3 и абзацы —
+    тот же текст, что и разбор BeautifulSoup, но без построения дерева.
+    """
+
+    _BLOCKS = ("title", "h1", "h2", "h3", "p")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.headings = []
+        self.paragraphs = []
+        self._open = []          # [тег, части текста] открытых блоков
+        self._skip = 0           # вложенность script/style
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in self._BLOCKS:
+            if tag == "p" and self._open and self._open[-1][0] == "p":
+                # <p> без закрывающего тега закрывается следующим <p>
+                self._close("p")
+            self._open.append([tag, []])
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(0, self._skip - 1)
+        elif tag in self._BLOCKS:
+            self._close(tag)
+
+    def handle_data(self, data):
+        if self._skip or not self._open:
+            return
+        text = data.strip()
+        if text:
+            for block in self._open:
+                block[1].append(text)
+
+    def close(self):
+        super().close()
+        while self._open:
+            self._close(self._open[-1][0])
+
+    def text(self) -> str:
+        return f"{self.title} {' '.join(self.headings)} {' '.join(self.paragraphs)}".strip()
+
+    def _close(self, tag):
+        for i in range(len(self._open) - 1, -1, -1):
+            if self._open[i][0] == tag:
+                _, parts = self._open.pop(i)
+                text = "".join(parts)
+                if tag == "title":
+                    self.title = self.title or text
+                elif tag == "p":
+                    self.paragraphs.append(text)
+                else:
+                    self.headings.append(text)
+                return
+
+
+def html_to_text(html: str) -> str:
+    parser = _TextExtractor()
     try:
-        response = requests.get(url, timeout=5)
-        soup = BeautifulSoup(response.text, "html.parser")
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    return parser.text()
 
-        title = soup.title.string.strip() if soup.title else ""
-        headings = " ".join([h.get_text(strip=True) for h in soup.find_all(["h1", "h2", "h3"])])
-        paragraphs = " ".join([p.get_text(strip=True) for p in soup.find_all("p")])
 
-        text = f"{title} {headings} {paragraphs}"
-        return text.strip()
+def extract_text_from_site(url: str) -> str:
+    """
+    Загружает страницу (потоково, не более SITE_MAX_BYTES) и извлекает текст.
+    Пустая строка — страница недоступна, не HTML или не загрузилась за
+    SITE_FETCH_TIMEOUT: таймаут requests ограничивает только ожидание очередного
+    блока, поэтому общий срок загрузки проверяется между блоками.
+    """
+    started = time.perf_counter()
+    deadline = time.monotonic() + SITE_FETCH_TIMEOUT
+    try:
+        _, session = _get_fetcher()
+        with session.get(url, timeout=SITE_FETCH_TIMEOUT, stream=True) as response:
+            content_type = response.headers.get("Content-Type", "text/html")
+            if response.status_code >= 400 or ("html" not in content_type and "text" not in content_type):
+                return ""
+            data = bytearray()
+            for block in response.iter_content(READ_CHUNK_SIZE):
+                if time.monotonic() > deadline:
+                    # Сервер отдаёт страницу по нескольку байт: поток загрузки освобождается
+                    telemetry.inc("site_fetch_timeouts_total")
+                    return ""
+                data += block
+                if len(data) >= SITE_MAX_BYTES:
+                    del data[SITE_MAX_BYTES:]
+                    break
+            html = bytes(data).decode(response.encoding or "utf-8", errors="replace")
+        telemetry.observe("site_fetch_seconds", time.perf_counter() - started)
+        telemetry.inc("site_fetch_bytes_total", len(data))
+        return html_to_text(html)
     except Exception:
+        telemetry.inc("site_fetch_errors_total")
         return ""
 
 
-def evaluate_site_risk_semantic(url: str) -> float:
-    if not model:
-        return 0.0
-    text = extract_text_from_site(url)
-    if not text:
-        return 0.0
+def _domain(url: str) -> str:
+    return urlparse(url).netloc.lower() or url
+
+
+def _score_texts(texts) -> list:
+    model = get_model()
+    if not model or not texts:
+        return [0.0] * len(texts)
     try:
-        prob = model.predict_proba([text])[0][1]
-        return round(prob, 3)
+        return [round(float(row[1]), 3) for row in model.predict_proba(texts)]
     except:
+        return [0.0] * len(texts)
+
+
+def _fetch_and_score(url: str) -> float:
+    """Загрузка и оценка одного сайта; результат записывается в кэш по домену."""
+    text = extract_text_from_site(url)
+    score = _score_texts([text])[0] if text else 0.0
+    get_score_cache().put(_domain(url), score, ok=bool(text))
+    return score
+
+
+def evaluate_site_risk_semantic(url: str) -> float:
+    if not get_model():
         return 0.0
+    cached = get_score_cache().get(_domain(url))
+    if cached is not None:
+        return cached[0]
+    return _fetch_and_score(url)
 
 
+@telemetry.timed("stage_seconds", stage="site_evaluation")
 def evaluate_multiple_sites(urls: list[str]) -> dict:
+    """
+    Оценивает сайты параллельно: оценки берутся из кэша по домену,
+    остальные страницы загружаются пулом потоков в пределах SITE_FETCH_BUDGET.
+    Сайты, не успевшие загрузиться, в среднюю оценку тика не входят —
+    их загрузка продолжается в фоне, и оценка попадёт в кэш. Если бюджет
+    ресурсов агента израсходован, загрузки откладываются: отложенные сайты
+    загружаются первыми в следующих тиках (оценка попадает в кэш).
+    """
     result = {}
-    for url in urls:
-        score = evaluate_site_risk_semantic(url)
-        result[url] = score
-    avg_score = round(np.mean(list(result.values())), 3) if result else 0.0
+    cache = get_score_cache()
+    if get_model():
+        global _pending
+        with _pending_lock:
+            pending, _pending = _pending, {}
+        current = dict.fromkeys(urls)
+        missing = []
+        for url in dict.fromkeys(list(pending) + list(current)):
+            cached = cache.get(_domain(url))
+            if cached is None:
+                missing.append(url)
+            elif url in current:
+                result[url] = cached[0]
+
+        admitted, deferred = [], []
+        for url in missing:
+            (admitted if GOVERNOR.admit("site_fetch") else deferred).append(url)
+        GOVERNOR.defer("site_fetch", len(deferred))
+        if deferred:
+            with _pending_lock:
+                _pending = dict.fromkeys(deferred + list(_pending))
+                while len(_pending) > MAX_PENDING_SITES:
+                    _pending.popitem()
+                    telemetry.inc("deferred_dropped_total", kind="site_fetch")
+
+        if admitted:
+            executor, _ = _get_fetcher()
+            futures = {executor.submit(_fetch_and_score, url): url for url in admitted}
+            done, _ = wait(futures, timeout=SITE_FETCH_BUDGET)
+            for future in done:
+                if futures[future] not in current:
+                    continue
+                try:
+                    result[futures[future]] = future.result()
+                except Exception:
+                    result[futures[future]] = 0.0
+        cache.save()
+
+    avg_score = round(sum(result.values()) / len(result), 3) if result else 0.0
     return {
         "site_semantic_risk_score": avg_score,
         "individual_scores": result
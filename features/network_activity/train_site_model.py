@@ -1,5 +1,6 @@
 
 # features/network_activity/train_site_model.py
+# Запуск из корня репозитория: python -m features.network_activity.train_site_model
 
 import pandas as pd
 import numpy as np
@@ -9,9 +10,11 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
+from utils.compact_model import export_pipeline, compact_path
 
-MODEL_PATH = "models/site_risk_model.pkl"
-DATASET_PATH = "models/semantic_site_dataset_realistic.csv"
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(HERE, "models", "site_risk_model.pkl")
+DATASET_PATH = os.path.join(HERE, "models", "semantic_site_dataset_realistic.csv")
 
 def train_semantic_model(path=MODEL_PATH):
     df = pd.read_csv(DATASET_PATH)
@@ -37,5 +40,8 @@ def train_semantic_model(path=MODEL_PATH):
     joblib.dump(pipeline, path)
     print(f"✅ Модель сохранена в {path}")
 
+    export_pipeline(pipeline, compact_path(path), check_texts=X_test)
+    print(f"✅ Компактная модель сохранена в {compact_path(path)}")
+
 if __name__ == "__main__":
     train_semantic_model()
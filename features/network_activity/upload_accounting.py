@@ -0,0 +1,232 @@
+# features/network_activity/upload_accounting.py
+#
+# Учёт исходящего трафика по процессам (Linux).
+#
+# Счётчики отправленных байт берутся по каждому TCP-сокету из ядра через
+# netlink sock_diag (tcp_info.tcpi_bytes_acked — байты, подтверждённые
+# получателем, ядро 4.1+). Владелец сокета находится по номеру inode
+# в /proc/<pid>/fd. За тик учитывается прирост счётчика каждого сокета.
+#
+# Сокет, открытый и закрытый между двумя замерами (scp, curl, короткий POST),
+# и UDP (в том числе QUIC) по сокетам не видны: такой трафик находится сверкой
+# с общим счётчиком отправленных байт интерфейсов и учитывается как "?".
+# Без прав root видны владельцы только собственных процессов агента (чужие
+# сокеты тоже учитываются как "?").
+
+import os
+import socket
+import struct
+import ipaddress
+from collections import Counter
+
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+INET_DIAG_INFO = 2
+TCP_LISTEN = 10
+# Все состояния TCP, кроме LISTEN (бит = номер состояния)
+_TCP_STATES = 0xFFF & ~(1 << TCP_LISTEN)
+
+_NLMSG = struct.Struct("=IHHII")
+# inet_diag_req_v2: семейство, протокол, расширения, выравнивание, состояния, inet_diag_sockid
+_REQUEST = struct.Struct("=BBBBI48s")
+# inet_diag_msg: семейство, состояние, таймер, повторы, порты (big-endian), адреса,
+# интерфейс, cookie, expires, rqueue, wqueue, uid, inode
+_MESSAGE = struct.Struct("=BBBB2s2s16s16sI8sIIIII")
+_ATTR = struct.Struct("=HH")
+_U64 = struct.Struct("=Q")
+# Смещение tcpi_bytes_acked в struct tcp_info
+_BYTES_ACKED_OFFSET = 120
+
+UNKNOWN_OWNER = "?"
+
+# Доля счётчика интерфейсов, которой нет в bytes_acked: заголовки TCP/IP
+# и повторные передачи отправленного, подтверждения (ACK) принятого.
+# Вычитается из остатка при сверке, чтобы загрузка не считалась выгрузкой
+OVERHEAD_SENT = 0.05
+OVERHEAD_RECEIVED = 0.02
+
+
+def tcp_sockets():
+    """
+    TCP-сокеты системы (кроме слушающих): (inode, удалённый IP, удалённый порт, bytes_acked).
+    OSError — netlink sock_diag недоступен.
+    """
+    if not hasattr(socket, "AF_NETLINK"):
+        raise OSError("netlink sock_diag есть только в Linux")
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_SOCK_DIAG) as sock:
+        for seq, family in enumerate((socket.AF_INET, socket.AF_INET6), 1):
+            request = _REQUEST.pack(family, socket.IPPROTO_TCP, 1 << (INET_DIAG_INFO - 1), 0, _TCP_STATES, bytes(48))
+            sock.sendall(_NLMSG.pack(_NLMSG.size + len(request), SOCK_DIAG_BY_FAMILY,
+                                     NLM_F_REQUEST | NLM_F_DUMP, seq, 0) + request)
+            yield from _read_dump(sock)
+
+
+def _read_dump(sock):
+    while True:
+        data = sock.recv(1 << 16)
+        position = 0
+        while position + _NLMSG.size <= len(data):
+            length, kind, _, _, _ = _NLMSG.unpack_from(data, position)
+            if length < _NLMSG.size:
+                return
+            if kind == NLMSG_DONE:
+                return
+            if kind == NLMSG_ERROR:
+                (error,) = struct.unpack_from("=i", data, position + _NLMSG.size)
+                raise OSError(-error, os.strerror(-error))
+            item = _parse_message(data, position + _NLMSG.size, position + length)
+            if item is not None:
+                yield item
+            position += (length + 3) & ~3
+
+
+def _parse_message(data, start, end):
+    family, _, _, _, _, dport, _, dst, _, _, _, _, _, _, inode = _MESSAGE.unpack_from(data, start)
+    if not inode:
+        return None
+    bytes_acked = None
+    position = start + _MESSAGE.size
+    while position + _ATTR.size <= end:
+        length, kind = _ATTR.unpack_from(data, position)
+        if length < _ATTR.size:
+            break
+        if kind == INET_DIAG_INFO and length - _ATTR.size >= _BYTES_ACKED_OFFSET + _U64.size:
+            (bytes_acked,) = _U64.unpack_from(data, position + _ATTR.size + _BYTES_ACKED_OFFSET)
+        position += (length + 3) & ~3
+    if bytes_acked is None:
+        return None
+    address = dst[:4] if family == socket.AF_INET else dst
+    ip = str(ipaddress.ip_address(address))
+    return inode, ip, struct.unpack(">H", dport)[0], bytes_acked
+
+
+def socket_owners(inodes) -> dict:
+    """Находит процессы-владельцы сокетов по /proc/<pid>/fd: {inode: pid}."""
+    wanted = set(inodes)
+    owners = {}
+    try:
+        pids = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return owners
+    for pid in pids:
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                link = os.readlink(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            if link.startswith("socket:["):
+                inode = int(link[8:-1])
+                if inode in wanted and inode not in owners:
+                    owners[inode] = int(pid)
+        if len(owners) == len(wanted):
+            break
+    return owners
+
+
+class UploadTable:
+    """Исходящий трафик за тик: по процессам и по (процесс, адрес:порт)."""
+
+    def __init__(self):
+        self.by_process = Counter()
+        self.by_endpoint = Counter()
+        self.total = 0       # байт без исключённых процессов
+        self.excluded = 0    # байт процессов из списка разрешённых
+        self.seen = 0        # байт всех сокетов (и исключённых, и агента) — для сверки
+        self.unattributed = 0  # байт по счётчику интерфейсов, не найденных по сокетам
+
+    def add_unattributed(self, sent, received):
+        """
+        Сверка с приростом счётчиков интерфейсов (без loopback) за тот же
+        интервал: отправленное сверх найденного по сокетам (за вычетом оценки
+        заголовков и подтверждений) учитывается как UNKNOWN_OWNER.
+        """
+        remainder = int(sent - self.seen - OVERHEAD_SENT * sent - OVERHEAD_RECEIVED * received)
+        if remainder <= 0:
+            return
+        self.unattributed = remainder
+        self.total += remainder
+        self.by_process[UNKNOWN_OWNER] += remainder
+        self.by_endpoint[(UNKNOWN_OWNER, UNKNOWN_OWNER)] += remainder
+
+
+class UploadAccounting:
+    """
+    Прирост отправленных байт по сокетам между замерами с привязкой к процессам.
+
+    Первый замер запоминает счётчики существующих сокетов (их прошлый трафик
+    не считается). Сокет, появившийся позже, учитывается целиком. Состояние —
+    только сокеты последнего замера, их владельцы и накопленные итоги не
+    более чем max_processes процессов, поэтому память ограничена.
+    """
+
+    def __init__(self, allowlist=(), max_processes=256, max_endpoints=256):
+        self.allowlist = frozenset(name.lower() for name in allowlist)
+        self.max_processes = max_processes
+        self.max_endpoints = max_endpoints
+        self.totals = Counter()   # процесс -> байт с запуска агента
+        self._last = {}           # inode -> bytes_acked
+        self._owners = {}         # inode -> pid
+        self._primed = False
+        self._own_pid = os.getpid()
+
+    def sample(self, names: dict, sent=None, received=None) -> UploadTable:
+        """
+        names — {pid: имя процесса} (из снимка); sent, received — прирост
+        счётчиков интерфейсов с прошлого замера для сверки (None — без сверки).
+        OSError — учёт недоступен.
+        """
+        current = {}
+        deltas = []
+        for inode, ip, port, acked in tcp_sockets():
+            current[inode] = acked
+            previous = self._last.get(inode)
+            if previous is None:
+                delta = acked if self._primed else 0
+            else:
+                delta = acked - previous if acked >= previous else acked
+            if delta > 0 and not ipaddress.ip_address(ip).is_loopback:
+                deltas.append((inode, f"{ip}:{port}", delta))
+        self._last = current
+        self._primed = True
+
+        unknown = [inode for inode, _, _ in deltas if inode not in self._owners]
+        if unknown:
+            self._owners.update(socket_owners(unknown))
+        self._owners = {inode: pid for inode, pid in self._owners.items() if inode in current}
+
+        table = UploadTable()
+        for inode, endpoint, delta in deltas:
+            table.seen += delta
+            pid = self._owners.get(inode)
+            if pid == self._own_pid:
+                continue
+            name = names.get(pid, UNKNOWN_OWNER) if pid is not None else UNKNOWN_OWNER
+            if name.lower() in self.allowlist:
+                table.excluded += delta
+                continue
+            table.total += delta
+            table.by_process[name] += delta
+            table.by_endpoint[(name, endpoint)] += delta
+
+        if sent is not None:
+            table.add_unattributed(sent, received or 0)
+
+        if len(table.by_endpoint) > self.max_endpoints:
+            table.by_endpoint = Counter(dict(table.by_endpoint.most_common(self.max_endpoints)))
+        self.totals.update(table.by_process)
+        if len(self.totals) > self.max_processes:
+            self.totals = Counter(dict(self.totals.most_common(self.max_processes)))
+        return table
+
+    def top_uploaders(self, n=10) -> list:
+        """Процессы с наибольшим исходящим трафиком с запуска агента: [(имя, байт)]."""
+        return self.totals.most_common(n)
@@ -0,0 +1,66 @@
+# features/process_activity/process_tracker.py
+
+from collections import Counter
+
+
+class ProcessDiff:
+    """События жизненного цикла процессов между двумя снимками."""
+
+    def __init__(self):
+        self.started = []      # (pid, create_time, name)
+        self.exited = []       # (pid, create_time, name)
+
+
+class ProcessTracker:
+    """
+    Компактная таблица живых процессов, ключ — (pid, create_time):
+    переиспользованный pid не путается с завершившимся процессом.
+
+    Каждый снимок сравнивается с таблицей: для известных процессов это одна
+    проверка по словарю, имя сохраняется только у новых, поэтому сравнение
+    дёшево и при тысячах процессов. Первый снимок задаёт исходное состояние:
+    уже запущенные процессы событиями запуска не считаются.
+    """
+
+    def __init__(self):
+        self._table = {}               # (pid, create_time) -> имя в нижнем регистре
+        self.running_names = Counter() # имя -> число живых процессов
+        self.last_update = None
+        self._initialized = False
+
+    def __len__(self):
+        return len(self._table)
+
+    def update(self, processes, now) -> ProcessDiff:
+        """
+        Сравнивает снимок (итерируемое ProcessInfo из utils.snapshot) с таблицей.
+        now — время снимка (time.time()).
+        """
+        diff = ProcessDiff()
+        seen = set()
+        for proc in processes:
+            key = (proc.pid, proc.create_time)
+            if key not in self._table:
+                name = proc.name.lower()
+                self._table[key] = name
+                self.running_names[name] += 1
+                if self._initialized:
+                    diff.started.append((key[0], key[1], name))
+            seen.add(key)
+
+        for key in [k for k in self._table if k not in seen]:
+            name = self._table.pop(key)
+            self.running_names[name] -= 1
+            if not self.running_names[name]:
+                del self.running_names[name]
+            diff.exited.append((key[0], key[1], name))
+
+        self._initialized = True
+        self.last_update = now
+        return diff
+
+    def running(self, names):
+        """Живые процессы с именем из множества names: (pid, create_time, name)."""
+        if not names.intersection(self.running_names):
+            return []
+        return [(pid, created, name) for (pid, created), name in self._table.items() if name in names]
@@ -1,8 +1,9 @@
 # features/process_activity.py
 
-import psutil
-import time
 import re
+from config import SEND_INTERVAL
+from features.process_activity.process_tracker import ProcessTracker
+from utils.snapshot import SystemSnapshot
 
 # Программы, запуск которых считаем "неразрешёнными"
 UNKNOWN_PROCESSES = ["tor.exe", "python.exe", "hacker_tool.exe"]
@@ -19,6 +20,13 @@ SCREEN_CAPTURE_TOOLS = ["snippingtool.exe", "obs64.exe", "screenrecorder.exe"]
 # Командные оболочки (для учёта времени)
 TERMINALS = ["cmd.exe", "powershell.exe", "wt.exe", "terminal.exe"]
 
+# Множества для проверки имён за O(1)
+UNKNOWN_SET = frozenset(UNKNOWN_PROCESSES)
+ADMIN_SET = frozenset(ADMIN_TOOLS)
+AUTOMATION_SET = frozenset(AUTOMATION_TOOLS)
+SCREEN_CAPTURE_SET = frozenset(SCREEN_CAPTURE_TOOLS)
+TERMINAL_SET = frozenset(TERMINALS)
+
 _state = {
     "process_count": 0,
     "unknown_processes_started": 0,
@@ -28,41 +36,44 @@ _state = {
     "screen_capture_tools_used": 0
 }
 
-TERMINAL_ACTIVITY_CACHE = {}
+# Таблица живых процессов сохраняется между тиками
+_tracker = ProcessTracker()
 
 
-def collect_process_features():
+def collect_process_features(snapshot=None):
     reset_state()
-    current_time = time.time()
-
-    for proc in psutil.process_iter(["name", "create_time"]):
-        try:
-            name = proc.info["name"].lower()
-            create_time = proc.info["create_time"]
-            _state["process_count"] += 1
-
-            if name in UNKNOWN_PROCESSES:
-                _state["unknown_processes_started"] += 1
-            if name in ADMIN_TOOLS:
-                _state["admin_tools_used"] = 1
-            if name in AUTOMATION_TOOLS:
-                _state["automation_tool_detected"] = 1
-            if name in SCREEN_CAPTURE_TOOLS:
-                _state["screen_capture_tools_used"] = 1
-
-            if name in TERMINALS:
-                runtime = current_time - create_time
-                if runtime <= 30:
-                    TERMINAL_ACTIVITY_CACHE[name] = runtime
-
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
-
-    _state["time_in_terminal_sec"] = int(sum(TERMINAL_ACTIVITY_CACHE.values()))
+    snapshot = snapshot or SystemSnapshot()
+    current_time = snapshot.time
+    interval_start = _tracker.last_update or current_time - SEND_INTERVAL
+
+    diff = _tracker.update(snapshot.processes(), current_time)
+    names = _tracker.running_names
+
+    _state["process_count"] = len(_tracker)
+    _state["unknown_processes_started"] = sum(1 for _, _, name in diff.started if name in UNKNOWN_SET)
+    _state["admin_tools_used"] = int(not ADMIN_SET.isdisjoint(names))
+    _state["automation_tool_detected"] = int(not AUTOMATION_SET.isdisjoint(names))
+    _state["screen_capture_tools_used"] = int(not SCREEN_CAPTURE_SET.isdisjoint(names))
+    _state["time_in_terminal_sec"] = int(terminal_time(diff, interval_start, current_time))
     return dict(_state)
 
 
+def terminal_time(diff, interval_start, now) -> float:
+    """
+    Суммарное время работы терминалов за интервал [interval_start, now].
+    Момент завершения процесса неизвестен точнее интервала опроса и
+    принимается за середину интервала.
+    """
+    total = 0.0
+    for _, create_time, _ in _tracker.running(TERMINAL_SET):
+        total += now - max(create_time, interval_start)
+    exit_time = (interval_start + now) / 2
+    for _, create_time, name in diff.exited:
+        if name in TERMINAL_SET:
+            total += max(0.0, exit_time - max(create_time, interval_start))
+    return total
+
+
 def reset_state():
     for key in _state:
         _state[key] = 0 if isinstance(_state[key], int) else 0.0
-    TERMINAL_ACTIVITY_CACHE.clear()
@@ -0,0 +1,331 @@
+# features/usb_activity/usb_index.py
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+EXECUTABLE_EXTENSIONS = (".exe", ".bat", ".cmd", ".msi")
+ENCRYPTED_VOLUME_HINTS = ("bitlocker", "veracrypt")
+
+
+def volume_id(partition) -> str:
+    """
+    Идентификатор тома: UUID файловой системы (Linux, /dev/disk/by-uuid),
+    серийный номер тома (Windows) или, если их не получить, устройство и точка монтирования.
+    """
+    by_uuid = "/dev/disk/by-uuid"
+    if os.path.isdir(by_uuid):
+        device = os.path.realpath(partition.device)
+        try:
+            for name in os.listdir(by_uuid):
+                if os.path.realpath(os.path.join(by_uuid, name)) == device:
+                    return name
+        except OSError:
+            pass
+    if os.name == "nt":
+        serial = _windows_volume_serial(partition.mountpoint)
+        if serial is not None:
+            return f"{serial:08X}"
+    return f"{partition.device}:{partition.mountpoint}"
+
+
+def _windows_volume_serial(root):
+    try:
+        import ctypes
+        serial = ctypes.c_uint32()
+        if ctypes.windll.kernel32.GetVolumeInformationW(
+                ctypes.c_wchar_p(root), None, 0, ctypes.byref(serial), None, None, None, 0):
+            return serial.value
+    except Exception:
+        pass
+    return None
+
+
+# Через сколько записей каталогов проверяется бюджет ресурсов агента
+GOVERNOR_CHECK_EVERY = 256
+
+# Размер недавно добавленного файла перепроверяется при каждом обходе, пока он растёт
+# (копирование ещё идёт) и ещё GROWTH_RESCANS обходов после; отслеживается не более
+# GROWTH_MAX_FILES файлов тома
+GROWTH_RESCANS = 3
+GROWTH_MAX_FILES = 10000
+
+
+class _Throttle:
+    """
+    Ограничение скорости обхода: не более rate записей каталогов в секунду.
+    Если задан governor, при исчерпании бюджета интервала обход
+    приостанавливается до начала следующего.
+    """
+
+    def __init__(self, rate, stop, governor=None):
+        self.rate = rate
+        self.stop = stop
+        self.governor = governor
+        self._count = 0
+        self._checked = 0
+        self._started = time.monotonic()
+
+    def step(self, n=1):
+        self._count += n
+        if self.governor is not None and self._count - self._checked >= GOVERNOR_CHECK_EVERY:
+            self._checked = self._count
+            if self.governor.exhausted():
+                self.governor.defer("usb_scan")
+                self.governor.wait_for_budget(self.stop)
+                self._count = self._checked = 0
+                self._started = time.monotonic()
+        ahead = self._count / self.rate - (time.monotonic() - self._started)
+        if ahead > 0.05:
+            self.stop.wait(ahead)
+
+
+class _Dir:
+    __slots__ = ("mtime", "files", "subdirs")
+
+    def __init__(self, mtime):
+        self.mtime = mtime
+        self.files = {}        # имя -> размер
+        self.subdirs = set()   # имена подкаталогов
+
+
+class VolumeIndex:
+    """
+    Индекс файлов одного тома: каталог -> (mtime, файлы с размерами, подкаталоги).
+
+    Повторный обход читает только каталоги, у которых изменилось время
+    изменения (добавление, удаление, переименование записей); у остальных
+    выполняется один stat. Запись в файл не меняет время изменения каталога,
+    поэтому размер недавно добавленных файлов перепроверяется отдельно
+    (growing): файл, который ещё копируется, учитывается по мере роста.
+    Прочие файлы, перезаписанные на месте, повторный обход не замечает.
+    """
+
+    def __init__(self, mountpoint):
+        self.mountpoint = mountpoint
+        self.dirs = {}
+        self.growing = {}   # путь файла -> обходов подряд без роста
+        self.files = 0
+        self.executables = 0
+        self.encrypted = 0
+        self.ready = False
+
+    def scan(self, throttle, baseline=False):
+        """
+        Обходит том; возвращает (число, объём в байтах) добавленных файлов
+        (объём включает прирост ещё копируемых файлов).
+        baseline=True — файлы запоминаются, но добавленными не считаются.
+        """
+        added_files = added_bytes = 0
+        listed, grown = set(), set()
+        stack = [""]
+        while stack and not throttle.stop.is_set():
+            rel = stack.pop()
+            full = os.path.join(self.mountpoint, rel) if rel else self.mountpoint
+            try:
+                mtime = os.stat(full).st_mtime_ns
+            except OSError:
+                self._drop_tree(rel)
+                continue
+            throttle.step()
+
+            entry = self.dirs.get(rel)
+            if entry is None or entry.mtime != mtime:
+                listing = self._list(full, throttle)
+                if listing is None:
+                    self._drop_tree(rel)
+                    continue
+                files, subdirs = listing
+                if entry is None:
+                    entry = self.dirs[rel] = _Dir(mtime)
+                entry.mtime = mtime
+                listed.add(rel)
+                for name in entry.files.keys() - files.keys():
+                    self._forget(name)
+                for name, size in files.items():
+                    path = os.path.join(rel, name) if rel else name
+                    old = entry.files.get(name)
+                    if old is None:
+                        self._remember(name)
+                        added_files += 1
+                        added_bytes += size
+                        if not baseline and len(self.growing) < GROWTH_MAX_FILES:
+                            self.growing[path] = 0
+                            grown.add(path)
+                    elif path in self.growing and size != old:
+                        added_bytes += max(0, size - old)
+                        grown.add(path)
+                entry.files = files
+                for name in entry.subdirs - subdirs:
+                    self._drop_tree(os.path.join(rel, name) if rel else name)
+                entry.subdirs = subdirs
+
+            stack.extend(os.path.join(rel, name) if rel else name for name in entry.subdirs)
+
+        if not throttle.stop.is_set():
+            added_bytes += self._check_growing(throttle, listed, grown)
+        self.ready = True
+        if baseline:
+            return 0, 0
+        return added_files, added_bytes
+
+    def _check_growing(self, throttle, listed, grown):
+        """Перепроверяет размер недавно добавленных файлов; возвращает прирост в байтах."""
+        growth = 0
+        for path, idle in list(self.growing.items()):
+            rel, name = os.path.split(path)
+            entry = self.dirs.get(rel)
+            if entry is None or name not in entry.files:
+                del self.growing[path]
+                continue
+            if rel not in listed:
+                # Каталог не перечитывался: размер — отдельным stat
+                try:
+                    size = os.stat(os.path.join(self.mountpoint, path)).st_size
+                except OSError:
+                    del self.growing[path]
+                    continue
+                throttle.step()
+                if size != entry.files[name]:
+                    growth += max(0, size - entry.files[name])
+                    entry.files[name] = size
+                    grown.add(path)
+            if path in grown:
+                self.growing[path] = 0
+            elif idle + 1 >= GROWTH_RESCANS:
+                del self.growing[path]
+            else:
+                self.growing[path] = idle + 1
+        return growth
+
+    def _list(self, full, throttle):
+        files, subdirs = {}, set()
+        try:
+            with os.scandir(full) as it:
+                for item in it:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            subdirs.add(item.name)
+                        elif item.is_file(follow_symlinks=False):
+                            files[item.name] = item.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+                    throttle.step()
+        except OSError:
+            return None
+        return files, subdirs
+
+    def _drop_tree(self, rel):
+        entry = self.dirs.pop(rel, None)
+        if entry is None:
+            return
+        for name in entry.files:
+            self._forget(name)
+        for name in entry.subdirs:
+            self._drop_tree(os.path.join(rel, name) if rel else name)
+
+    def _remember(self, name):
+        self.files += 1
+        lowered = name.lower()
+        if lowered.endswith(EXECUTABLE_EXTENSIONS):
+            self.executables += 1
+        if any(hint in lowered for hint in ENCRYPTED_VOLUME_HINTS):
+            self.encrypted += 1
+
+    def _forget(self, name):
+        self.files -= 1
+        lowered = name.lower()
+        if lowered.endswith(EXECUTABLE_EXTENSIONS):
+            self.executables -= 1
+        if any(hint in lowered for hint in ENCRYPTED_VOLUME_HINTS):
+            self.encrypted -= 1
+
+
+class UsbIndexer:
+    """
+    Фоновое индексирование съёмных томов.
+
+    Сборщик сообщает список подключённых томов (set_volumes) и забирает
+    накопленные изменения (drain) — тик никогда не ждёт обхода. Новый или
+    переподключённый том сначала индексируется как исходное состояние
+    (его файлы не считаются скопированными), затем раз в rescan_interval
+    секунд перепроверяется обходом с отсечением по mtime каталогов.
+    Индексы хранятся по идентификатору тома, поэтому повторное подключение
+    того же носителя не требует полного чтения всех каталогов; индексов
+    отключённых томов хранится не более max_volumes (вытесняются давно
+    не подключавшиеся).
+    Скорость обхода ограничена scan_rate записями в секунду; если задан
+    governor, обход приостанавливается до следующего интервала, когда
+    бюджет ресурсов агента израсходован.
+    """
+
+    def __init__(self, rescan_interval=5, scan_rate=2000, governor=None, max_volumes=16):
+        self.rescan_interval = rescan_interval
+        self.scan_rate = scan_rate
+        self.governor = governor
+        self.max_volumes = max_volumes
+        self._indexes = OrderedDict()   # id тома -> VolumeIndex, последний подключённый — в конце
+        self._volumes = {}       # подключённые тома: id -> точка монтирования
+        self._baseline = set()   # тома, для которых нужен обход без подсчёта
+        self._pending = {}       # id тома -> [файлы, байты] с прошлого drain
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def set_volumes(self, volumes: dict):
+        with self._lock:
+            for vid, mountpoint in volumes.items():
+                if vid not in self._volumes:
+                    self._baseline.add(vid)
+                    self._wake.set()
+            self._volumes = dict(volumes)
+        if self._thread is None and volumes:
+            self._thread = threading.Thread(target=self._loop, name="dlp-usb-index", daemon=True)
+            self._thread.start()
+
+    def drain(self) -> dict:
+        """Файлы и байты, добавленные на каждый том с прошлого вызова: {id: (файлы, байты)}."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return {vid: tuple(counts) for vid, counts in pending.items()}
+
+    def flags(self, vid):
+        """(есть исполняемые файлы, есть признаки шифрования) по текущему индексу тома."""
+        index = self._indexes.get(vid)
+        if index is None:
+            return False, False
+        return index.executables > 0, index.encrypted > 0
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                volumes = dict(self._volumes)
+                baseline, self._baseline = self._baseline & volumes.keys(), set()
+            for vid, mountpoint in volumes.items():
+                index = self._indexes.get(vid)
+                if index is None or index.mountpoint != mountpoint:
+                    index = self._indexes[vid] = VolumeIndex(mountpoint)
+                    baseline.add(vid)
+                self._indexes.move_to_end(vid)
+                self._evict(volumes)
+                throttle = _Throttle(self.scan_rate, self._stop, self.governor)
+                files, size = index.scan(throttle, baseline=vid in baseline)
+                if files or size:
+                    with self._lock:
+                        counts = self._pending.setdefault(vid, [0, 0])
+                        counts[0] += files
+                        counts[1] += size
+            self._wake.wait(self.rescan_interval)
+            self._wake.clear()
+
+    def _evict(self, connected):
+        """Удаляет индексы давно отключённых томов сверх max_volumes."""
+        disconnected = [vid for vid in self._indexes if vid not in connected]
+        for vid in disconnected[:max(0, len(disconnected) - self.max_volumes)]:
+            del self._indexes[vid]
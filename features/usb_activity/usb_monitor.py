@@ -1,15 +1,19 @@
 # features/usb_activity/usb_monitor.py
 
 import os
-import datetime
-import psutil
-from pathlib import Path
+from utils.snapshot import SystemSnapshot
+from features.usb_activity.usb_index import UsbIndexer, volume_id
+from utils.governor import GOVERNOR
+from utils import activity
+from config import USB_RESCAN_INTERVAL, USB_SCAN_RATE, USB_INDEXED_VOLUMES
 
 # Конфигурация
 USB_BLACKLIST = ["Kingston_Hack", "EvilCorp_USB"]
 WORK_HOURS = (8, 18)
-EXECUTABLE_EXTENSIONS = [".exe", ".bat", ".cmd", ".msi"]
-ENCRYPTED_VOLUME_HINTS = ["BitLocker", "VeraCrypt"]
+
+# Индексы томов строятся и обновляются в фоне; тик только забирает накопленные изменения
+_indexer = UsbIndexer(rescan_interval=USB_RESCAN_INTERVAL, scan_rate=USB_SCAN_RATE, governor=GOVERNOR,
+                      max_volumes=USB_INDEXED_VOLUMES)
 
 _state = {
     "usb_devices_connected": 0,
@@ -21,14 +25,16 @@ _state = {
     "usb_access_outside_hours": 0
 }
 
-def collect_usb_features():
+def collect_usb_features(snapshot=None):
     reset_state()
-    now = datetime.datetime.now()
-    hour = now.hour
+    snapshot = snapshot or SystemSnapshot()
+    hour = snapshot.now.hour
 
-    usb_partitions = [p for p in psutil.disk_partitions(all=False) if 'removable' in p.opts.lower() or 'usb' in p.device.lower()]
+    usb_partitions = [p for p in snapshot.partitions() if 'removable' in p.opts.lower() or 'usb' in p.device.lower()]
     _state["usb_devices_connected"] = len(usb_partitions)
 
+    volumes = {}
+
     for part in usb_partitions:
         vendor = os.path.basename(part.device).strip()
 
@@ -38,25 +44,26 @@ def collect_usb_features():
         if hour < WORK_HOURS[0] or hour >= WORK_HOURS[1]:
             _state["usb_access_outside_hours"] = 1
 
-        try:
-            root = Path(part.mountpoint)
-            file_count = 0
-            total_size = 0
-            for file in root.rglob("*"):
-                if not file.is_file():
-                    continue
-                file_count += 1
-                total_size += file.stat().st_size
-                if file.suffix.lower() in EXECUTABLE_EXTENSIONS:
-                    _state["usb_executable_found"] = 1
-                if any(enc in file.name.lower() for enc in ENCRYPTED_VOLUME_HINTS):
-                    _state["usb_encrypted_volume_found"] = 1
+        vid = volume_id(part)
+        volumes[vid] = part.mountpoint
+        executable, encrypted = _indexer.flags(vid)
+        if executable:
+            _state["usb_executable_found"] = 1
+        if encrypted:
+            _state["usb_encrypted_volume_found"] = 1
 
+    _indexer.set_volumes(volumes)
+    # Файлы, добавленные на тома с прошлого тика (содержимое носителя при подключении не считается)
+    total_size = 0
+    for vid, (file_count, size) in _indexer.drain().items():
+        if vid in volumes:
             _state["usb_file_copy_count"] += file_count
-            _state["usb_copy_volume_MB"] += round(total_size / 1024 / 1024, 2)
+            total_size += size
+    _state["usb_copy_volume_MB"] = round(total_size / 1024 / 1024, 2)
 
-        except Exception:
-            continue
+    # Подключённый носитель или копирование на него повышают приоритет анализа изменённых документов
+    if usb_partitions or _state["usb_file_copy_count"]:
+        activity.mark(activity.USB, snapshot.time)
 
     return dict(_state)
 
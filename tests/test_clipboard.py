@@ -0,0 +1,43 @@
+# tests/test_clipboard.py
+#
+# Буфер обмена (features/behavioral_context): признак сбора сообщает и число
+# совпадений, и число копирований с чувствительными данными; повторное
+# копирование того же текста — одно событие.
+# Запуск из корня репозитория: python -m pytest tests
+
+import pytest
+
+from features.behavioral_context import behavioral_signs
+from features.behavioral_context.clipboard_watcher import ClipboardWatcher
+
+
+@pytest.fixture
+def clipboard(monkeypatch):
+    contents = [""]
+    watcher = ClipboardWatcher(lambda: contents[0], behavioral_signs.CLIPBOARD_SCANNER,
+                               behavioral_signs.count_clipboard_matches, dedupe_window=60)
+    watcher.sequence = None
+    # Без фонового потока: буфер проверяется вызовами poll из теста
+    monkeypatch.setattr(watcher, "start", lambda: watcher)
+    monkeypatch.setattr(behavioral_signs, "_watcher", watcher)
+
+    def copy(text, now):
+        contents[0] = text
+        watcher.poll(now)
+    return copy
+
+
+def test_collect_reports_distinct_sensitive_copies(clipboard):
+    clipboard("почта ivanov@example.com и petrov@example.com", now=1)
+    clipboard("обычный текст", now=2)
+    clipboard("почта ivanov@example.com и petrov@example.com", now=3)
+    clipboard("пароль: qwerty", now=4)
+
+    features = behavioral_signs.collect_behavioral_context()
+    assert features["clipboard_sensitive_events"] == 2
+    assert features["clipboard_sensitive_matches"] >= 3
+
+    # Итоги отдаются один раз
+    features = behavioral_signs.collect_behavioral_context()
+    assert features["clipboard_sensitive_events"] == 0
+    assert features["clipboard_sensitive_matches"] == 0
@@ -0,0 +1,83 @@
+# tests/test_compact_model.py
+#
+# Компактный формат моделей (utils/compact_model.py): вероятности моделей
+# .dlpm из репозитория совпадают с исходными пайплайнами .pkl, экспорт
+# поддерживает случайный лес и логистическую регрессию, а повреждённый файл
+# .dlpm не мешает загрузке исходной модели.
+# Запуск из корня репозитория: python -m pytest tests
+
+import csv
+
+import pytest
+
+np = pytest.importorskip("numpy")
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("sklearn")
+
+from config import FILE_MODEL_PATH, SITE_MODEL_PATH
+from utils.compact_model import CompactModel, compact_path, export_pipeline, load_model
+
+EXTRA_TEXTS = [
+    "",
+    "Паспорт 4510 123456, ИНН 7707083893 — СЛУЖЕБНАЯ ИНФОРМАЦИЯ",
+    "weather forecast and football news",
+    "договор договор договор зарплата клиенты отчёт",
+]
+
+
+def dataset_texts(path, limit=200):
+    with open(path, encoding="utf-8") as f:
+        return [row["text"] for row in csv.DictReader(f)][:limit]
+
+
+@pytest.mark.parametrize("model_path, dataset", [
+    (FILE_MODEL_PATH, "features/file_work/datasets/file_dataset.csv"),
+    (SITE_MODEL_PATH, "features/network_activity/models/semantic_site_dataset.csv"),
+])
+def test_shipped_compact_models_match_pickled_pipelines(model_path, dataset):
+    texts = dataset_texts(dataset) + EXTRA_TEXTS
+    pipeline = joblib.load(model_path)
+    compact = load_model(model_path)
+    assert isinstance(compact, CompactModel)
+    assert list(compact.classes_) == list(pipeline.classes_)
+    assert np.abs(compact.predict_proba(texts) - pipeline.predict_proba(texts)).max() <= 1e-9
+
+
+@pytest.fixture
+def training():
+    texts = dataset_texts("features/file_work/datasets/file_dataset.csv", limit=400)
+    with open("features/file_work/datasets/file_dataset.csv", encoding="utf-8") as f:
+        labels = [int(row["label"]) for row in csv.DictReader(f)][:400]
+    return texts, labels
+
+
+@pytest.mark.parametrize("kind", ["forest", "linear"])
+def test_exported_pipeline_matches_source(tmp_path, training, kind):
+    from sklearn.pipeline import Pipeline
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    texts, labels = training
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)),
+        ("clf", RandomForestClassifier(n_estimators=15, random_state=0) if kind == "forest"
+                else LogisticRegression(max_iter=500)),
+    ]).fit(texts, labels)
+    path = export_pipeline(pipeline, str(tmp_path / "model.dlpm"), check_texts=texts[:50])
+
+    probe = texts[-50:] + EXTRA_TEXTS
+    assert np.abs(CompactModel(path).predict_proba(probe) - pipeline.predict_proba(probe)).max() <= 1e-9
+
+
+@pytest.mark.parametrize("content", [b"", b"DLPM", b"not a model file at all"])
+def test_damaged_compact_model_falls_back_to_pickle(tmp_path, content):
+    source = tmp_path / "model.pkl"
+    pipeline = joblib.load(SITE_MODEL_PATH)
+    joblib.dump(pipeline, source)
+    with open(compact_path(str(source)), "wb") as f:
+        f.write(content)
+
+    model = load_model(str(source))
+    assert not isinstance(model, CompactModel)
+    assert list(model.classes_) == list(pipeline.classes_)
@@ -0,0 +1,86 @@
+# tests/test_dns_resolver.py
+#
+# Обратное разрешение адресов (features/network_activity/dns_resolver.py):
+# кэш имён и отсутствующих записей, бюджет ожидания тика, один запрос на
+# адрес одновременно и повтор запроса после непредвиденной ошибки.
+# Запуск из корня репозитория: python -m pytest tests
+
+import time
+import socket
+import threading
+
+from features.network_activity.dns_resolver import ReverseResolver
+
+
+class _Lookup:
+    def __init__(self, names, delay=0.0):
+        self.names = names
+        self.delay = delay
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, ip):
+        self.calls.append(ip)
+        self.release.wait(5)
+        time.sleep(self.delay)
+        name = self.names.get(ip)
+        if isinstance(name, Exception):
+            raise name
+        if name is None:
+            raise socket.herror(1, "Unknown host")
+        return name, [], [ip]
+
+
+def test_names_and_missing_records_are_cached():
+    lookup = _Lookup({"10.0.0.1": "mail.example.com"})
+    resolver = ReverseResolver(workers=2, budget=1.0, lookup=lookup)
+    assert resolver.resolve_many(["10.0.0.1", "10.0.0.2", "10.0.0.1"]) == {"10.0.0.1": "mail.example.com", "10.0.0.2": None}
+    assert resolver.resolve_many(["10.0.0.1", "10.0.0.2"]) == {"10.0.0.1": "mail.example.com", "10.0.0.2": None}
+    assert sorted(lookup.calls) == ["10.0.0.1", "10.0.0.2"]
+    assert resolver.stats()["hits"] == 2
+
+
+def test_negative_entries_expire_sooner():
+    lookup = _Lookup({})
+    resolver = ReverseResolver(budget=1.0, ttl=3600, negative_ttl=0, lookup=lookup)
+    resolver.resolve("10.0.0.2")
+    resolver.resolve("10.0.0.2")
+    assert lookup.calls == ["10.0.0.2", "10.0.0.2"]
+
+
+def test_slow_lookup_finishes_in_background_within_the_budget():
+    lookup = _Lookup({"10.0.0.1": "slow.example.com"})
+    lookup.release.clear()
+    resolver = ReverseResolver(budget=0.05, lookup=lookup)
+
+    started = time.monotonic()
+    assert resolver.resolve("10.0.0.1") is None
+    assert time.monotonic() - started < 1.0
+    # Запрос ещё идёт: повторно адрес не запрашивается и тик его не ждёт
+    assert resolver.resolve("10.0.0.1") is None
+    assert lookup.calls == ["10.0.0.1"]
+
+    lookup.release.set()
+    deadline = time.monotonic() + 5
+    while resolver.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert resolver.resolve("10.0.0.1") == "slow.example.com"
+
+
+def test_unexpected_lookup_error_does_not_block_the_address():
+    lookup = _Lookup({"10.0.0.3": RuntimeError("resolver crashed")})
+    resolver = ReverseResolver(budget=1.0, lookup=lookup)
+    assert resolver.resolve("10.0.0.3") is None
+    assert resolver.stats()["in_flight"] == 0
+
+    lookup.names["10.0.0.3"] = "host.example.com"
+    assert resolver.resolve("10.0.0.3") == "host.example.com"
+    assert lookup.calls == ["10.0.0.3", "10.0.0.3"]
+
+
+def test_cache_is_bounded():
+    lookup = _Lookup({f"10.0.0.{n}": f"h{n}.example.com" for n in range(10)})
+    resolver = ReverseResolver(budget=1.0, max_entries=4, lookup=lookup)
+    resolver.resolve_many([f"10.0.0.{n}" for n in range(10)])
+    assert resolver.stats()["entries"] == 4
@@ -0,0 +1,87 @@
+# tests/test_file_index.py
+#
+# Индекс файлов (features/file_work/file_index.py): сравнение обхода
+# каталогов с индексом (новые, изменённые и пропавшие пути), сохранение
+# между запусками и дайджест содержимого с ограниченным чтением больших файлов.
+# Запуск из корня репозитория: python -m pytest tests
+
+import os
+import hashlib
+
+from features.file_work.file_index import FileIndex, FileRecord, file_digest, digest_read_size
+
+
+def record(size=100, mtime=1000.0, inode=1, writable=True, digest=None):
+    return FileRecord(size, mtime, inode, writable, digest)
+
+
+def test_scan_diff_reports_added_changed_and_deleted(tmp_path):
+    index = FileIndex(str(tmp_path / "index.db"))
+    diff = index.apply_scan({"/d/a.txt": record(inode=1), "/d/b.txt": record(inode=2), "/d/c.txt": record(inode=3)})
+    assert sorted(diff.added) == ["/d/a.txt", "/d/b.txt", "/d/c.txt"]
+    assert diff.changed == [] and diff.deleted == []
+
+    diff = index.apply_scan({
+        "/d/a.txt": record(inode=1),                     # без изменений
+        "/d/b.txt": record(inode=2, size=200),           # изменено содержимое
+        "/d/d.txt": record(inode=4),                     # новый
+    })
+    assert diff.added == ["/d/d.txt"]
+    assert [(path, old.size, new.size) for path, old, new in diff.changed] == [("/d/b.txt", 100, 200)]
+    assert diff.deleted == ["/d/c.txt"]
+    assert index.get("/d/c.txt") is None and index.get("/d/b.txt").size == 200
+    index.close()
+
+
+def test_permission_change_keeps_digest_and_survives_restart(tmp_path):
+    path = str(tmp_path / "index.db")
+    index = FileIndex(path)
+    index.apply_scan({"/d/a.txt": record()})
+    index.set_digest("/d/a.txt", "abc")
+
+    # Сменились только права: содержимое то же, дайджест остаётся действительным
+    diff = index.apply_scan({"/d/a.txt": record(writable=False)})
+    (changed_path, old, new), = diff.changed
+    assert (changed_path, old.writable, new.writable, new.digest) == ("/d/a.txt", True, False, "abc")
+    index.close()
+
+    # Индекс на диске: после перезапуска изменений нет
+    index = FileIndex(path)
+    assert len(index) == 1
+    assert index.get("/d/a.txt") == record(writable=False, digest="abc")
+    diff = index.apply_scan({"/d/a.txt": record(writable=False)})
+    assert (diff.added, diff.changed, diff.deleted) == ([], [], [])
+    index.close()
+
+
+def test_small_file_is_hashed_in_full(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"x" * 5000)
+    assert file_digest(path, max_bytes=8192) == hashlib.blake2b(b"x" * 5000, digest_size=16).hexdigest()
+    assert digest_read_size(5000, max_bytes=8192) == 5000
+
+
+def test_large_file_digest_reads_only_its_edges(tmp_path):
+    path = tmp_path / "disk.img"
+    path.write_bytes(bytes(range(256)) * 400)
+    first = file_digest(path, max_bytes=1024)
+    assert digest_read_size(os.path.getsize(path), max_bytes=1024) == 1024
+
+    # Изменение в середине при том же времени изменения не читается...
+    stat = os.stat(path)
+    with open(path, "r+b") as f:
+        f.seek(50000)
+        f.write(b"changed")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert file_digest(path, max_bytes=1024) == first
+
+    # ...но перезапись файла меняет время изменения, а с ним и дайджест
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert file_digest(path, max_bytes=1024) != first
+
+    # Изменение в начале или конце файла видно и без времени изменения
+    with open(path, "r+b") as f:
+        f.seek(-3, os.SEEK_END)
+        f.write(b"end")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert file_digest(path, max_bytes=1024) != first
@@ -0,0 +1,83 @@
+# tests/test_file_watcher.py
+#
+# Наблюдатель inotify (features/file_work/file_watcher.py): каталог,
+# вынесенный из дерева, снимается с наблюдения и учитывается как удалённый,
+# а его файлы удаляются из индекса.
+# Запуск из корня репозитория: python -m pytest tests
+
+import os
+import time
+
+import pytest
+
+from features.file_work.file_index import FileIndex, make_record
+from features.file_work.file_watcher import FileEventWatcher
+
+
+@pytest.fixture
+def watched(tmp_path):
+    root = tmp_path / "docs"
+    (root / "project" / "sub").mkdir(parents=True)
+    (root / "project" / "sub" / "report.txt").write_text("отчёт")
+    try:
+        watcher = FileEventWatcher([str(root)])
+        watcher.start()
+    except OSError:
+        pytest.skip("inotify недоступен")
+    yield root, watcher
+    watcher.stop()
+
+
+def wait_for(watcher, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with watcher._lock:
+            if condition(watcher._events):
+                break
+        time.sleep(0.02)
+    return watcher.drain()
+
+
+def test_directory_moved_out_of_tree_is_reported_and_unwatched(watched, tmp_path):
+    root, watcher = watched
+    project = str(root / "project")
+    (root / "project" / "sub" / "draft.txt").write_text("черновик")
+    os.rename(project, tmp_path / "outside")
+
+    events = wait_for(watcher, lambda e: e.deleted_dirs)
+    assert events.deleted_dirs == {project}
+    # Файл, созданный до переноса, не считается созданным в дереве
+    assert not any(path.startswith(project) for path in events.created | events.modified)
+    assert not any(folder.startswith(project) for folder in watcher._wd_to_dir.values())
+
+    # События в вынесенном каталоге больше не приписываются прежним путям
+    (tmp_path / "outside" / "sub" / "later.txt").write_text("позже")
+    (root / "new.txt").write_text("новый")
+    events = wait_for(watcher, lambda e: e.created)
+    assert events.created == {str(root / "new.txt")}
+
+
+def test_directory_moved_within_tree_is_watched_at_new_path(watched):
+    root, watcher = watched
+    os.rename(root / "project", root / "renamed")
+
+    events = wait_for(watcher, lambda e: e.created and e.deleted_dirs)
+    assert events.deleted_dirs == {str(root / "project")}
+    assert events.created == {str(root / "renamed" / "sub" / "report.txt")}
+
+    (root / "renamed" / "sub" / "next.txt").write_text("дальше")
+    events = wait_for(watcher, lambda e: e.created)
+    assert events.created == {str(root / "renamed" / "sub" / "next.txt")}
+
+
+def test_index_remove_tree_drops_only_that_directory(tmp_path):
+    index = FileIndex(str(tmp_path / "index.db"))
+    paths = ["/d/project/a.txt", "/d/project/sub/b.txt", "/d/project2/c.txt", "/d/project"]
+    stat = os.stat(tmp_path)
+    index.update({path: make_record(path, stat) for path in paths})
+
+    assert index.remove_tree("/d/project") == 2
+    assert index.get("/d/project/a.txt") is None
+    assert index.get("/d/project2/c.txt") is not None
+    assert index.get("/d/project") is not None
+    index.close()
@@ -0,0 +1,66 @@
+# tests/test_governor.py
+#
+# Бюджет ресурсов агента (utils/governor.py): чтение сверх бюджета периода
+# откладывается, первая задача каждого вида допускается всегда, с новым
+# периодом бюджет восстанавливается, а итоги прошлого периода сохраняются.
+# Запуск из корня репозитория: python -m pytest tests
+
+import threading
+
+from utils.governor import Governor
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_read_budget_defers_work_until_the_next_period():
+    clock = _Clock()
+    governor = Governor(60, read_budget=1000, clock=clock)
+    assert governor.admit("documents", 800)
+    assert governor.admit("documents", 300)        # резерв не превышал бюджет до этой задачи
+    assert governor.exhausted()
+    assert not governor.admit("documents", 10)
+    governor.defer("documents", 3)
+    # Первая задача другого вида допускается и при израсходованном бюджете
+    assert governor.admit("usb_scan")
+    assert not governor.admit("usb_scan")
+    assert governor.stats()["deferred_documents"] == 3
+
+    clock.now += 60
+    assert not governor.exhausted()
+    assert governor.admit("documents", 500)
+    last = governor.last_period()
+    assert (last["read_mb"], last["deferred"]) == (0.0, 3)
+
+
+def test_charged_reads_count_against_the_budget():
+    governor = Governor(60, read_budget=1000, clock=_Clock())
+    governor.charge_read(999)
+    assert not governor.exhausted()
+    governor.charge_read(1)
+    assert governor.exhausted()
+
+
+def test_cpu_of_added_sources_counts_against_the_budget():
+    governor = Governor(60, cpu_budget=5.0, clock=_Clock())
+    workers = [0.0]
+    governor.add_cpu_source(lambda: workers[0])
+    governor.add_cpu_source(lambda: 1 / 0)          # ошибка источника не ломает учёт
+    assert not governor.exhausted()
+    workers[0] = 10.0
+    governor._cpu_cached = (float("-inf"), 0.0)
+    assert governor.exhausted()
+
+
+def test_wait_for_budget_returns_when_stopped():
+    governor = Governor(3600, read_budget=1, clock=_Clock())
+    governor.charge_read(1)
+    stop = threading.Event()
+    stop.set()
+    assert governor.wait_for_budget(stop) is False
+    assert Governor(60, clock=_Clock()).wait_for_budget(stop) is True
@@ -0,0 +1,43 @@
+# tests/test_process_tracker.py
+#
+# Таблица процессов (features/process_activity/process_tracker.py): первый
+# снимок — исходное состояние, переиспользованный pid — новый процесс;
+# признаки process_activity считают запуски и время в терминалах за интервал.
+# Запуск из корня репозитория: python -m pytest tests
+
+from features.process_activity import processes_work
+from features.process_activity.process_tracker import ProcessTracker
+from utils.snapshot import SystemSnapshot, ProcessInfo
+
+
+def test_first_snapshot_is_baseline_and_pid_reuse_is_a_new_process():
+    tracker = ProcessTracker()
+    diff = tracker.update([ProcessInfo(1, "init", 10.0), ProcessInfo(100, "Tor.exe", 50.0)], now=100)
+    assert diff.started == [] and diff.exited == []
+    assert len(tracker) == 2 and tracker.running_names["tor.exe"] == 1
+
+    # pid 100 занят другим процессом (другое время создания)
+    diff = tracker.update([ProcessInfo(1, "init", 10.0), ProcessInfo(100, "bash", 120.0)], now=160)
+    assert diff.started == [(100, 120.0, "bash")]
+    assert diff.exited == [(100, 50.0, "tor.exe")]
+    assert "tor.exe" not in tracker.running_names
+    assert tracker.running(frozenset({"bash", "cmd.exe"})) == [(100, 120.0, "bash")]
+    assert tracker.running(frozenset({"cmd.exe"})) == []
+    assert tracker.last_update == 160
+
+
+def test_process_features_over_an_interval(monkeypatch):
+    monkeypatch.setattr(processes_work, "_tracker", ProcessTracker())
+    base = [ProcessInfo(1, "init", 0.0), ProcessInfo(2, "cmd.exe", 900.0), ProcessInfo(3, "powershell.exe", 100.0)]
+    processes_work.collect_process_features(SystemSnapshot(now=1000.0, processes=base))
+
+    current = [ProcessInfo(1, "init", 0.0), ProcessInfo(2, "cmd.exe", 900.0),
+               ProcessInfo(4, "TOR.EXE", 1010.0), ProcessInfo(5, "regedit.exe", 1020.0)]
+    features = processes_work.collect_process_features(SystemSnapshot(now=1060.0, processes=current))
+
+    assert features["process_count"] == 4
+    assert features["unknown_processes_started"] == 1
+    assert features["admin_tools_used"] == 1
+    assert features["automation_tool_detected"] == 0
+    # cmd.exe работал весь интервал (60 с), powershell.exe завершился — половина интервала
+    assert features["time_in_terminal_sec"] == 60 + 30
@@ -0,0 +1,153 @@
+# tests/test_relay.py
+#
+# Ретранслятор образцов (utils/relay.py) между агентами и локальным стендом
+# сервера: проверка образцов при приёме (400 для ошибочных), пересылка
+# в JSON, даже если сервер предлагает двоичный формат, и закрытие
+# простаивающих соединений агентов.
+# Запуск из корня репозитория: python -m pytest tests
+
+import gzip
+import json
+import time
+import socket
+import threading
+import http.client
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from utils.relay import Relay, serve
+from utils import wire_format
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    """Стенд сервера: принимает JSON и предлагает двоичный формат в каждом ответе."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        content_type = self.headers.get("Content-Type")
+        with server.lock:
+            server.content_types.append(content_type)
+        if content_type != "application/json":
+            return self._reply(409, {"error": "unknown base sample"})
+        body = json.loads(gzip.decompress(data) if self.headers.get("Content-Encoding") == "gzip" else data)
+        samples = body["samples"] if self.path == "/predict_batch" else [body]
+        with server.lock:
+            server.received += [sample["user_id"] for sample in samples]
+        results = [{"risk_level": "low"} for _ in samples]
+        self._reply(200, {"results": results} if self.path == "/predict_batch" else results[0])
+
+    def _reply(self, status, answer):
+        out = json.dumps(answer).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header(wire_format.NEGOTIATION_HEADER, str(wire_format.FORMAT_VERSION))
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start(httpd):
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+@pytest.fixture
+def upstream():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    httpd.lock = threading.Lock()
+    httpd.content_types = []
+    httpd.received = []
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    _start(httpd)
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def relay_url(upstream):
+    relay = Relay(f"{upstream.url}/predict", f"{upstream.url}/predict_batch", connections=1,
+                  batch_delay=0.01, response_timeout=5).start()
+    httpd = _start(serve(relay, "127.0.0.1", 0))
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    relay.stop()
+
+
+def sample(user_id="u1", **fields):
+    payload = {"user_id": user_id, "timestamp": "2026-01-01T00:00:00", "features": {"usb_activity": {"x": 1}}}
+    payload.update(fields)
+    return payload
+
+
+@pytest.mark.parametrize("bad", [
+    {"timestamp": "01.01.2026"},
+    {"timestamp": 1767225600},
+    {"features": [1, 2]},
+    {"features": {"usb_activity": [1]}},
+])
+def test_malformed_samples_are_rejected_with_400(relay_url, upstream, bad):
+    response = requests.post(f"{relay_url}/predict_batch", json={"samples": [sample(), sample(**bad)]}, timeout=5)
+    assert response.status_code == 400
+    assert upstream.received == []
+
+
+def test_non_finite_numbers_are_rejected_with_400(relay_url, upstream):
+    for value in ("NaN", "Infinity", "1e400"):
+        data = '{"user_id": "u1", "timestamp": "2026-01-01T00:00:00", "features": {"usb_activity": {"x": %s}}}' % value
+        response = requests.post(f"{relay_url}/predict", data=data, timeout=5,
+                                 headers={"Content-Type": "application/json"})
+        assert response.status_code == 400
+    assert upstream.received == []
+
+
+def test_samples_are_relayed_as_json_even_if_server_offers_binary(relay_url, upstream):
+    for n in range(5):
+        answer = requests.post(f"{relay_url}/predict_batch", timeout=5,
+                               json={"samples": [sample(f"u{n}"), sample(f"v{n}")]}).json()
+        assert [result["risk_level"] for result in answer["results"]] == ["low", "low"]
+
+    assert sorted(upstream.received) == sorted([f"u{n}" for n in range(5)] + [f"v{n}" for n in range(5)])
+    assert set(upstream.content_types) == {"application/json"}
+
+
+def test_idle_agent_connections_are_closed(upstream):
+    relay = Relay(f"{upstream.url}/predict", connections=1, response_timeout=5).start()
+    httpd = _start(serve(relay, "127.0.0.1", 0, idle_timeout=0.3))
+    try:
+        conn = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+        conn.request("POST", "/predict", body=json.dumps(sample()), headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        assert response.status == 200 and json.loads(response.read())["risk_level"] == "low"
+        threads = threading.active_count()
+        # Соединение keep-alive без новых запросов закрывается сервером
+        started = time.monotonic()
+        assert conn.sock.recv(65536) == b""
+        assert time.monotonic() - started < 3
+        conn.close()
+        deadline = time.monotonic() + 3
+        while threading.active_count() >= threads and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert threading.active_count() < threads
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        relay.stop()
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-1"])
+def test_invalid_content_length_is_rejected_with_400(relay_url, length):
+    host, port = relay_url.rsplit("/", 1)[1].split(":")
+    with socket.create_connection((host, int(port)), timeout=5) as conn:
+        conn.sendall(b"POST /predict HTTP/1.1\r\nHost: relay\r\nContent-Length: " + length + b"\r\n\r\n{}")
+        assert conn.recv(65536).startswith(b"HTTP/1.1 400")
@@ -0,0 +1,120 @@
+# tests/test_scan_queue.py
+#
+# Очередь анализа документов (features/file_work/scan_queue.py): порядок
+# по приоритету, отбор при занятой системе, ограничение размера и
+# сохранение между запусками; результаты анализа документов, изменённых
+# в уже отправленных интервалах, попадают в сводки file_activity_late.
+# Запуск из корня репозитория: python -m pytest tests
+
+import os
+from datetime import datetime
+
+import pytest
+
+from features.file_work import file_activity
+from features.file_work.scan_queue import ScanQueue, document_priority
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = ScanQueue(str(tmp_path / "queue.db"), max_entries=100)
+    yield queue
+    queue.close()
+
+
+def paths(documents):
+    return [document.path for document in documents]
+
+
+def test_documents_are_taken_by_priority_then_queue_time(queue):
+    queue.push([("/d/low.txt", 1, 10, 0), ("/d/high.pdf", 5, 10, 0)], now=100)
+    queue.push([("/d/high2.docx", 5, 10, 0), ("/d/mid.txt", 3, 10, 0)], now=200)
+    assert paths(queue.peek(10)) == ["/d/high.pdf", "/d/high2.docx", "/d/mid.txt", "/d/low.txt"]
+
+    # Повторное изменение: приоритет — наибольший, место в очереди сохраняется
+    queue.push([("/d/low.txt", 0, 20, 60), ("/d/mid.txt", 9, 30, 60)], now=300)
+    low, = [d for d in queue.peek(10) if d.path == "/d/low.txt"]
+    assert (low.priority, low.size, low.changed, low.queued) == (1, 20, 60, 100)
+    assert paths(queue.peek(2)) == ["/d/mid.txt", "/d/high.pdf"]
+
+    queue.remove(["/d/mid.txt", "/d/high.pdf"])
+    assert paths(queue.peek(10)) == ["/d/high2.docx", "/d/low.txt"]
+
+
+def test_busy_system_takes_small_urgent_or_long_waiting_documents(queue):
+    queue.push([("/d/old-big.pdf", 1, 10 ** 9, 0)], now=100)
+    queue.push([("/d/urgent.txt", 7, 1000, 0), ("/d/urgent-big.pdf", 7, 10 ** 9, 0),
+                ("/d/ordinary.txt", 2, 1000, 0)], now=1000)
+    selected = queue.peek(10, min_priority=5, max_size=10 ** 6, queued_before=500)
+    assert paths(selected) == ["/d/urgent.txt", "/d/old-big.pdf"]
+
+
+def test_overflow_drops_lowest_priority_and_queue_survives_restart(tmp_path):
+    path = str(tmp_path / "queue.db")
+    queue = ScanQueue(path, max_entries=3)
+    queue.push([(f"/d/{n}.txt", n, 10, 0) for n in range(5)], now=100)
+    assert paths(queue.peek(10)) == ["/d/4.txt", "/d/3.txt", "/d/2.txt"]
+    assert queue.dropped == 2
+    queue.close()
+
+    queue = ScanQueue(path, max_entries=3)
+    assert len(queue) == 3
+    assert queue.stats(now=160)["oldest_wait_sec"] == 60
+    queue.close()
+
+
+def test_document_priority_heuristics(tmp_path):
+    watched = str(tmp_path / "Documents")
+    base = document_priority("/tmp/notes.txt", 10 * 1024 * 1024)
+    assert document_priority("/tmp/notes.pdf", 10 * 1024 * 1024) > base
+    assert document_priority(os.path.join(watched, "notes.txt"), 10 * 1024 * 1024, watch_dirs=[watched]) > base
+    assert document_priority("/tmp/Договор.txt", 10 * 1024 * 1024, keywords=["договор"]) > base
+    assert document_priority("/tmp/notes.txt", 1000) > base
+    assert document_priority("/tmp/notes.txt", 10 * 1024 * 1024, recent_activity=True) > base
+
+
+class _Snapshot:
+    def __init__(self, time):
+        self.time = time
+
+    def cpu_percent(self):
+        return 0.0
+
+
+def test_late_results_are_attributed_to_the_interval_of_change(queue, monkeypatch):
+    interval = file_activity.SEND_INTERVAL
+    now = 100 * interval + 1
+    current = file_activity.reporting_interval(now)
+    earlier = current - 2 * interval
+
+    scores = {"/d/now.txt": 0.5, "/d/late1.txt": 0.2, "/d/late2.txt": 0.4, "/d/failed.txt": None}
+    queue.push([("/d/now.txt", 3, 10, current), ("/d/late1.txt", 2, 10, earlier),
+                ("/d/late2.txt", 2, 10, earlier), ("/d/failed.txt", 1, 10, earlier)], now=now)
+
+    def analyze(batch, index):
+        return {path: None if scores[path] is None else {
+            "match_count": 1, "card_number": 0, "passport_data": int(path == "/d/late2.txt"),
+            "file_confidentiality_score": scores[path],
+        } for path in batch}
+
+    monkeypatch.setattr(file_activity, "_scan_queue", queue)
+    monkeypatch.setattr(file_activity, "_last_tick", now - interval)
+    monkeypatch.setattr(file_activity, "analyze_documents", analyze)
+    file_activity.take_late_results()
+    file_activity.reset_state()
+
+    file_activity.scan_queued(index=None, snapshot=_Snapshot(now))
+
+    # Документ текущего интервала — в признаках тика
+    assert file_activity._state["file_access_sensitive_docs"] == 1
+    assert file_activity._state["file_confidentiality_score"] == 0.5
+    # Остальные — одной сводкой за интервал изменения, один раз
+    late, = file_activity.take_late_results()
+    assert late["interval_start"] == datetime.fromtimestamp(earlier).strftime("%Y-%m-%dT%H:%M:%S")
+    assert late["documents"] == 2
+    assert late["file_access_sensitive_docs"] == 2
+    assert late["file_contains_passport_data"] == 1
+    assert late["file_confidentiality_score"] == 0.3
+    assert file_activity.take_late_results() == []
+    # Разобранные документы (и неудачный) удалены из очереди
+    assert len(queue) == 0
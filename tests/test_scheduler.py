@@ -0,0 +1,128 @@
+# tests/test_scheduler.py
+#
+# Планировщик сборщиков (utils/scheduler.py): образцы выровнены по часам,
+# сборщик, не успевший за свой срок, не задерживает образец (группа
+# отмечается устаревшей), частые запуски объединяются за интервал, а
+# интервал медленного сборщика увеличивается и возвращается обратно.
+# Запуск из корня репозитория: python -m pytest tests
+
+import time
+import threading
+
+import pytest
+
+from utils.scheduler import CollectorScheduler, combine_features, _align
+
+
+def run(scheduler, samples, count, timeout=10):
+    """Запускает планировщик в потоке до count образцов."""
+    thread = threading.Thread(target=scheduler.run_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while len(samples) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    scheduler.stop()
+    thread.join(5)
+    assert len(samples) >= count
+
+
+def test_align_returns_next_multiple_of_interval():
+    assert _align(1001.3, 10) == 1010
+    assert _align(1010, 10) == 1020
+    assert _align(59.99, 0.5) == 60
+
+
+def test_samples_are_aligned_to_the_clock():
+    samples = []
+    scheduler = CollectorScheduler(0.2, lambda features, stale: samples.append((time.time(), features)))
+    scheduler.add("fast", lambda snapshot: {"value": 1})
+    run(scheduler, samples, 3)
+
+    for emitted, features in samples[:3]:
+        assert emitted % 0.2 < 0.05 or emitted % 0.2 > 0.19
+        assert features == {"fast": {"value": 1}}
+
+
+def test_slow_collector_does_not_delay_the_sample_past_its_deadline():
+    samples = []
+    release = threading.Event()
+    calls = []
+
+    def slow(snapshot):
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return {"value": len(calls)}
+
+    scheduler = CollectorScheduler(0.2, lambda features, stale: samples.append((time.monotonic(), features, stale)))
+    scheduler.add("fast", lambda snapshot: {"value": 1})
+    scheduler.add("slow", slow, interval=0.2, deadline=0.05)
+    try:
+        run(scheduler, samples, 3)
+    finally:
+        release.set()
+
+    # Первый запуск успел; дальше группа отправляется с прошлым значением и отмечается устаревшей
+    assert samples[0][1]["slow"] == {"value": 1} and samples[0][2] == []
+    for _, features, stale in samples[1:3]:
+        assert features["slow"] == {"value": 1}
+        assert stale == ["slow"]
+        assert features["fast"] == {"value": 1}
+    # Образцы идут с периодом отправки, а не ждут зависший сборщик
+    assert samples[2][0] - samples[1][0] < 0.35
+
+
+def test_frequent_runs_are_combined_within_the_send_interval():
+    samples = []
+    scheduler = CollectorScheduler(0.3, lambda features, stale: samples.append(features))
+    scheduler.add("events", lambda snapshot: {"count": 1, "flag": 0, "last": time.monotonic()},
+                  interval=0.05, combine=combine_features(sum_keys=("count",), max_keys=("flag",)))
+    run(scheduler, samples, 3)
+
+    # Полный интервал: около 0.3 / 0.05 запусков, их счётчики сложены
+    assert 3 <= samples[2]["events"]["count"] <= 8
+    assert samples[2]["events"]["flag"] == 0
+
+
+def test_combine_features_sums_maxes_and_keeps_last():
+    combine = combine_features(sum_keys=("n",), max_keys=("flag",))
+    assert combine({"n": 2, "flag": 1, "x": "a"}, {"n": 3, "flag": 0, "x": "b"}) == {"n": 5, "flag": 1, "x": "b"}
+
+
+@pytest.fixture
+def job():
+    scheduler = CollectorScheduler(10, lambda features, stale: None, max_backoff=4, calm_runs=2)
+    scheduler.add("slow", lambda snapshot: {}, interval=10)
+    return scheduler, scheduler._jobs[0]
+
+
+def test_interval_backs_off_up_to_the_limit_and_recovers(job):
+    scheduler, job = job
+    for expected in (20, 40, 40):
+        scheduler._adapt(job, job.interval + 1)
+        assert job.interval == expected
+
+    # Быстрые запуски подряд (быстрее половины исходного интервала) уменьшают интервал вдвое
+    scheduler._adapt(job, 1)
+    assert job.interval == 40
+    scheduler._adapt(job, 1)
+    assert job.interval == 20
+    # Медленный (но уложившийся) запуск сбрасывает серию
+    scheduler._adapt(job, 1)
+    scheduler._adapt(job, 7)
+    scheduler._adapt(job, 1)
+    assert job.interval == 20
+    scheduler._adapt(job, 1)
+    assert job.interval == 10
+    scheduler._adapt(job, 1)
+    scheduler._adapt(job, 1)
+    assert job.interval == 10
+    assert scheduler.intervals() == {"slow": 10}
+
+
+def test_overrun_skips_the_run_and_backs_off(job):
+    scheduler, job = job
+    job.running = True
+    scheduler._start_due(now=100.0)
+    assert job.overruns == 1
+    assert job.interval == 20
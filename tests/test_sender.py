@@ -0,0 +1,292 @@
+# tests/test_sender.py
+#
+# Доставка образцов Outbox/Sender (utils/sender.py) на локальный стенд сервера
+# /predict: повторы с экспоненциальной задержкой, разбор накопленной очереди
+# пачками, временное отключение и повторная проверка сжатия и пачек, переход
+# на двоичный формат и повтор с полного кадра после 409, образцы, которые не
+# удаётся закодировать, и ошибки в потоке отправки.
+# Запуск из корня репозитория: python -m pytest tests
+
+import gzip
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from utils.outbox import Outbox
+from utils.sender import Sender
+from utils import wire_format
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    """Стенд сервера; поведение задаётся атрибутами self.server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        compressed = self.headers.get("Content-Encoding") == "gzip"
+        with server.lock:
+            server.log.append((time.monotonic(), self.path, compressed))
+            if server.fail_next:
+                server.fail_next -= 1
+                return self._reply(server.fail_status, {"error": "unavailable"})
+        if self.path == "/predict_batch" and not server.batches:
+            return self._reply(404, {"error": "not found"})
+        if compressed:
+            if server.gzip_status:
+                return self._reply(server.gzip_status, {"error": "gzip is not supported"})
+            data = gzip.decompress(data)
+        if self.headers.get("Content-Type") == wire_format.CONTENT_TYPE:
+            try:
+                samples = server.decoder.decode_batch(data)
+            except wire_format.WireError as e:
+                return self._reply(409, {"error": str(e)})
+        else:
+            body = json.loads(data)
+            samples = body["samples"] if self.path == "/predict_batch" else [body]
+        if any(sample.get("bad") for sample in samples):
+            return self._reply(400, {"error": "malformed sample"})
+        with server.lock:
+            server.received += [sample["n"] for sample in samples]
+        results = [{"risk_level": "low"} for _ in samples]
+        self._reply(200, {"results": results} if self.path == "/predict_batch" else results[0])
+
+    def _reply(self, status, answer):
+        out = json.dumps(answer).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if self.server.wire:
+            self.send_header(wire_format.NEGOTIATION_HEADER, str(wire_format.FORMAT_VERSION))
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def upstream():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.log = []
+    httpd.received = []
+    httpd.fail_next = 0
+    httpd.fail_status = 503
+    httpd.batches = True
+    httpd.gzip_status = None
+    httpd.decoder = wire_format.WireDecoder()
+    httpd.wire = False
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+def make_sender(upstream, clock, batches=True, use_binary=False, **kwargs):
+    return Sender(
+        f"{upstream.url}/predict", Outbox(), batch_url=f"{upstream.url}/predict_batch" if batches else None,
+        use_binary=use_binary, verbose=False, clock=clock, **kwargs
+    )
+
+
+def fill(sender, count, bad=()):
+    for n in range(count):
+        sample = {"user_id": "u1", "timestamp": "2026-01-01T00:00:00", "features": {}, "n": n}
+        if n in bad:
+            sample["bad"] = True
+        sender.outbox.append(sample)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_backlog_is_drained_in_batches(upstream, clock):
+    sender = make_sender(upstream, clock, batch_size=50)
+    fill(sender, 120)
+
+    assert sender.flush()
+    assert upstream.received == list(range(120))
+    assert [path for _, path, _ in upstream.log] == ["/predict_batch", "/predict_batch", "/predict_batch"]
+    assert len(sender.outbox) == 0 and sender.sent == 120
+
+
+def test_retries_back_off_exponentially(upstream, clock):
+    upstream.fail_next = 4
+    sender = make_sender(upstream, clock, batches=False, backoff_min=0.05, backoff_max=0.15).start()
+    try:
+        sender.submit({"user_id": "u1", "timestamp": "2026-01-01T00:00:00", "features": {}, "n": 0})
+        assert wait_for(lambda: upstream.received == [0])
+    finally:
+        sender.stop()
+
+    times = [t for t, _, _ in upstream.log]
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert sender.failures == 4 and len(gaps) == 4
+    # 0.05, 0.1, 0.15 (предел), 0.15 — с разбросом ±20%
+    assert 0.035 <= gaps[0] <= 0.09
+    assert gaps[1] > gaps[0] * 1.3
+    assert all(gap <= 0.15 * 1.2 + 0.05 for gap in gaps)
+
+
+def test_server_error_keeps_samples_queued(upstream, clock):
+    upstream.fail_next = 1
+    sender = make_sender(upstream, clock)
+    fill(sender, 3)
+
+    assert not sender.flush()
+    assert len(sender.outbox) == 3
+    assert sender.flush()
+    assert upstream.received == [0, 1, 2]
+
+
+@pytest.mark.parametrize("status", [401, 403, 404, 405, 408])
+def test_auth_and_routing_errors_keep_samples_queued(upstream, clock, status):
+    upstream.fail_next, upstream.fail_status = 2, status
+    sender = make_sender(upstream, clock, batches=False)
+    fill(sender, 2)
+
+    assert not sender.flush()
+    assert not sender.flush()
+    assert len(sender.outbox) == 2 and sender.sent == 0 and sender.rejected == 0
+    assert sender.flush()
+    assert upstream.received == [0, 1] and sender.sent == 2
+
+
+def test_malformed_sample_does_not_disable_gzip_or_batches(upstream, clock):
+    sender = make_sender(upstream, clock, batch_size=10)
+    fill(sender, 10, bad={3})
+
+    assert sender.flush()
+    # Пачка отвергнута целиком: образцы отправлены по одному, отброшен только ошибочный
+    assert upstream.received == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert sender.sent == 9 and sender.rejected == 1
+    assert sender.use_gzip and sender.batch_url
+
+    fill(sender, 5)
+    assert sender.flush()
+    assert upstream.log[-1][1:] == ("/predict_batch", True)
+
+
+def test_gzip_rejected_with_415_is_retried_later(upstream, clock):
+    upstream.gzip_status = 415
+    sender = make_sender(upstream, clock, mode_retry_interval=600)
+    fill(sender, 2)
+
+    assert sender.flush()
+    assert upstream.received == [0, 1] and not sender.use_gzip
+
+    # Сервер обновили: через mode_retry_interval сжатие пробуется снова
+    upstream.gzip_status = None
+    clock.now += 601
+    fill(sender, 2)
+    assert sender.flush()
+    assert sender.use_gzip and upstream.log[-1][2]
+
+
+def test_gzip_rejected_with_400_is_disabled_only_if_plain_request_passes(upstream, clock):
+    upstream.gzip_status = 400
+    sender = make_sender(upstream, clock)
+    fill(sender, 2)
+
+    assert sender.flush()
+    assert upstream.received == [0, 1]
+    assert not sender.use_gzip
+
+
+def test_batches_rejected_with_404_are_retried_later(upstream, clock):
+    upstream.batches = False
+    sender = make_sender(upstream, clock, mode_retry_interval=600)
+    fill(sender, 3)
+
+    assert sender.flush()
+    assert upstream.received == [0, 1, 2] and sender.batch_url is None
+
+    upstream.batches = True
+    clock.now += 601
+    fill(sender, 3)
+    assert sender.flush()
+    assert upstream.log[-1][1] == "/predict_batch"
+    assert upstream.received == [0, 1, 2, 0, 1, 2]
+
+
+def test_binary_format_is_negotiated_and_restarts_from_full_frame_after_409(upstream, clock):
+    upstream.wire = True
+    sender = make_sender(upstream, clock, batch_size=3, use_binary=True)
+    fill(sender, 1)
+    assert sender.flush()
+    assert sender.wire is not None
+    fill(sender, 3)
+    assert sender.flush()
+
+    # Сервер перезапущен: разностный кадр отвергается с 409, пачка повторяется с полного кадра
+    upstream.decoder = wire_format.WireDecoder()
+    fill(sender, 3)
+    assert sender.flush()
+    assert upstream.received == [0, 0, 1, 2, 0, 1, 2]
+    assert sender.wire is not None and sender.failures == 0 and sender.rejected == 0
+    assert [path for _, path, _ in upstream.log][-2:] == ["/predict_batch", "/predict_batch"]
+
+
+def test_sample_that_does_not_fit_a_binary_frame_is_sent_as_json(upstream, clock):
+    sender = make_sender(upstream, clock, batch_size=10)
+    sender.wire = wire_format.WireEncoder()
+    fill(sender, 2)
+    # Дополнение кадра длиннее 65535 байт
+    sender.outbox.append({"user_id": "u1", "timestamp": "2026-01-01T00:00:00", "features": {},
+                          "file_activity_late": {"intervals": ["x" * 70000]}, "n": 2})
+    fill(sender, 4)
+
+    assert sender.flush()
+    assert upstream.received == [0, 1, 2, 0, 1, 2, 3]
+    assert sender.invalid == 0 and len(sender.outbox) == 0
+    assert [path for _, path, _ in upstream.log].count("/predict") == 1
+    # Двоичный формат продолжает работать для следующих образцов
+    assert sender.wire is not None and upstream.log[-1][1] == "/predict_batch"
+
+
+def test_sender_thread_survives_unexpected_errors(upstream, clock, monkeypatch):
+    sender = make_sender(upstream, clock, backoff_min=0.01, backoff_max=0.02)
+    peek = sender.outbox.peek
+    calls = []
+
+    def failing_peek(limit):
+        calls.append(limit)
+        if len(calls) == 1:
+            raise RuntimeError("disk I/O error")
+        return peek(limit)
+
+    monkeypatch.setattr(sender.outbox, "peek", failing_peek)
+    sender.start()
+    try:
+        sender.submit({"user_id": "u1", "timestamp": "2026-01-01T00:00:00", "features": {}, "n": 0})
+        assert wait_for(lambda: upstream.received == [0])
+    finally:
+        sender.stop()
+    assert sender.failures == 1
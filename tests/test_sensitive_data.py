@@ -0,0 +1,79 @@
+# tests/test_sensitive_data.py
+#
+# Поиск чувствительных данных (utils/sensitive_data.py): карты проверяются
+# по Луну, ИНН — по контрольным разрядам, паспорта — по записи серии и
+# номера; признак паспортных данных документа — только по паспортам.
+# Запуск из корня репозитория: python -m pytest tests
+
+import pytest
+
+from utils.sensitive_data import SensitiveDataScanner, luhn_valid, card_valid, inn_valid
+from features.file_work.file_activity import scan_document
+
+
+def test_inn_is_not_reported_as_passport_data(tmp_path):
+    path = tmp_path / "реквизиты.txt"
+    path.write_text("ИНН организации 7707083893", encoding="utf-8")
+    assert scan_document(str(path))["passport_data"] == 0
+
+    path.write_text("паспорт 4510 123456", encoding="utf-8")
+    assert scan_document(str(path))["passport_data"] == 1
+
+
+def test_flag_scan_does_not_stop_at_inn_before_passport():
+    # Первая карта и ИНН не прекращают поиск: паспорт после них тоже находится
+    text = "карта 4111 1111 1111 1111, ИНН 7707083893, паспорт 4510 123456"
+    found = SensitiveDataScanner(count_numbers=False).scan(text)
+    assert found["card_numbers"] == 1
+    assert found["passport_numbers"] == 1
+
+
+@pytest.mark.parametrize("digits, valid", [
+    ("4111111111111111", True), ("4111111111111112", False), ("79927398713", True), ("79927398710", False),
+])
+def test_luhn_checksum(digits, valid):
+    assert luhn_valid(digits) is valid
+
+
+def test_card_number_must_pass_luhn_and_not_start_with_zero():
+    assert card_valid("4111111111111111")
+    assert not card_valid("0111111111111111")
+    assert not card_valid("4111111111111112")
+
+
+@pytest.mark.parametrize("digits, valid", [
+    ("7707083893", True), ("7707083894", False),        # организация: один контрольный разряд
+    ("500100732259", True), ("500100732258", False),    # физлицо: два контрольных разряда
+    ("500100732269", False), ("77070838930", False),
+])
+def test_inn_check_digits(digits, valid):
+    assert inn_valid(digits) is valid
+
+
+@pytest.mark.parametrize("text, passports", [
+    ("4510123456", 1),
+    ("4510 123456", 1),
+    ("4510-123456", 1),
+    ("4510 123456 01", 1),     # строка таблицы: паспорт — первые две группы
+    ("45 10 123456", 0),       # паспорт из других групп не составляется
+    ("0010 123456", 0),        # код региона 00
+    ("1111111111", 0),         # одна и та же цифра
+    ("id4510123456", 0),       # часть слова
+])
+def test_passport_shapes(text, passports):
+    assert SensitiveDataScanner().scan(text)["passport_numbers"] == passports
+
+
+def test_numbers_are_classified_by_type():
+    found = SensitiveDataScanner().scan(
+        "карта 4111-1111-1111-1111, ИНН 7707083893 и 500100732259, паспорт 4510 123456"
+    )
+    assert (found["card_numbers"], found["inn_numbers"], found["passport_numbers"]) == (1, 2, 1)
+
+
+def test_chunked_scan_matches_whole_text():
+    scanner = SensitiveDataScanner(["пароль", "ИНН"], emails=True)
+    chunks = ["карта 4111 1111 ", "1111 1111 и a@b.ru\n", "инн, длинный ИНН; пароль"]
+    assert scanner.scan_chunks(chunks) == scanner.scan("".join(chunks))
+    # Аббревиатура — только отдельным словом, не внутри "длинный"
+    assert scanner.scan("".join(chunks))["keywords"] == {"ИНН": 2, "пароль": 1}
@@ -0,0 +1,239 @@
+# tests/test_site_fetch.py
+#
+# Загрузка и оценка сайтов (features/network_activity/site_semantic_evaluator.py)
+# на локальном HTTP-сервере: ограничение размера и времени загрузки, потоковое
+# чтение, время жизни оценок (в том числе неудачных) и сохранение кэша между
+# перезапусками.
+# Запуск из корня репозитория: python -m pytest tests
+
+import time
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from features.network_activity import site_semantic_evaluator as evaluator
+from features.network_activity import site_score_cache
+from features.network_activity.site_score_cache import SiteScoreCache
+from utils.governor import Governor
+
+PAGE = "<html><head><title>Обменник</title></head><body><h1>Файлы</h1>{paragraphs}</body></html>"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = Counter()
+    sent = Counter()
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        self.requests[path] += 1
+        if path == "/missing":
+            return self._reply(404, "text/html", b"")
+        if path == "/json":
+            return self._reply(200, "application/json", b'{"a": 1}')
+        if path == "/big":
+            paragraphs = "".join(f"<p>абзац {n}</p>" for n in range(20000))
+            return self._reply(200, "text/html; charset=utf-8", PAGE.format(paragraphs=paragraphs).encode("utf-8"))
+        if path == "/endless":
+            # Тело без конца (chunked): клиент должен остановиться сам
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            block = ("<p>" + "ж" * 1000 + "</p>").encode("utf-8")
+            try:
+                while True:
+                    self.wfile.write(f"{len(block):x}\r\n".encode() + block + b"\r\n")
+                    self.sent[path] += len(block)
+                    if self.sent[path] > 64 * 1024 * 1024:
+                        return
+            except OSError:
+                return
+        if path == "/trickle":
+            # По нескольку байт раз в 0.2 с: каждое чтение укладывается в таймаут сокета
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for _ in range(200):
+                    self.wfile.write(b"4\r\n<p>a\r\n")
+                    self.wfile.flush()
+                    time.sleep(0.2)
+            except OSError:
+                pass
+            return
+        self._reply(200, "text/html; charset=utf-8", PAGE.format(paragraphs="<p>обмен файлами</p>").encode("utf-8"))
+
+    def _reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _FakeModel:
+    """Оценка по длине текста: модель сайтов в тестах не нужна."""
+
+    def predict_proba(self, texts):
+        return [[0.0, min(1.0, len(text) / 100)] for text in texts]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def server():
+    _Handler.requests.clear()
+    _Handler.sent.clear()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(site_score_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def evaluation(monkeypatch, tmp_path):
+    """Оценка сайтов без модели, бюджета ресурсов и кэша в домашнем каталоге."""
+    monkeypatch.setattr(evaluator, "_model", _FakeModel())
+    monkeypatch.setattr(evaluator, "_model_loaded", True)
+    monkeypatch.setattr(evaluator, "GOVERNOR", Governor(30))
+    cache = SiteScoreCache(ttl=3600, failure_ttl=300, path=str(tmp_path / "scores.json"))
+    monkeypatch.setattr(evaluator, "_score_cache", cache)
+    return cache
+
+
+def test_page_is_truncated_at_size_limit(server, monkeypatch):
+    full = evaluator.extract_text_from_site(f"http://127.0.0.1:{server}/big")
+    monkeypatch.setattr(evaluator, "SITE_MAX_BYTES", 4096)
+    truncated = evaluator.extract_text_from_site(f"http://127.0.0.1:{server}/big")
+
+    assert "абзац 19999" in full
+    assert truncated.startswith("Обменник Файлы абзац 0")
+    assert len(truncated.encode("utf-8")) < 4096
+
+
+def test_endless_body_is_read_in_blocks_up_to_limit(server, monkeypatch):
+    monkeypatch.setattr(evaluator, "SITE_MAX_BYTES", 256 * 1024)
+    started = time.monotonic()
+    text = evaluator.extract_text_from_site(f"http://127.0.0.1:{server}/endless")
+
+    assert time.monotonic() - started < 5
+    assert text.startswith("ж")
+    assert len(text) <= 256 * 1024
+
+
+def test_slow_body_is_abandoned_after_fetch_timeout(server, monkeypatch):
+    monkeypatch.setattr(evaluator, "SITE_FETCH_TIMEOUT", 1)
+    started = time.monotonic()
+    assert evaluator.extract_text_from_site(f"http://127.0.0.1:{server}/trickle") == ""
+    assert time.monotonic() - started < 2
+
+
+def test_non_html_and_errors_give_empty_text(server):
+    assert evaluator.extract_text_from_site(f"http://127.0.0.1:{server}/json") == ""
+    assert evaluator.extract_text_from_site(f"http://127.0.0.1:{server}/missing") == ""
+    assert evaluator.extract_text_from_site("http://127.0.0.1:9/") == ""
+
+
+def test_scores_are_cached_by_domain_until_ttl(server, evaluation, clock):
+    urls = [f"http://127.0.0.1:{server}/page"]
+    first = evaluator.evaluate_multiple_sites(urls)
+    second = evaluator.evaluate_multiple_sites(urls + [f"http://127.0.0.1:{server}/other"])
+
+    assert first["site_semantic_risk_score"] > 0
+    assert second["individual_scores"][urls[0]] == first["individual_scores"][urls[0]]
+    # Одна загрузка на домен: второй адрес того же домена берётся из кэша
+    assert sum(_Handler.requests.values()) == 1
+
+    clock.now += 3601
+    evaluator.evaluate_multiple_sites(urls)
+    assert _Handler.requests["/page"] == 2
+
+
+def test_failures_are_cached_for_failure_ttl(server, evaluation, clock):
+    url = f"http://localhost:{server}/missing"
+    assert evaluator.evaluate_multiple_sites([url])["individual_scores"][url] == 0.0
+    assert evaluation.get(f"localhost:{server}") == (0.0, False)
+
+    clock.now += 299
+    evaluator.evaluate_multiple_sites([url])
+    assert _Handler.requests["/missing"] == 1
+
+    clock.now += 2
+    evaluator.evaluate_multiple_sites([url])
+    assert _Handler.requests["/missing"] == 2
+
+
+def test_cache_survives_restart(tmp_path, clock):
+    path = str(tmp_path / "scores.json")
+    cache = SiteScoreCache(ttl=3600, failure_ttl=300, path=path)
+    cache.put("example.com", 0.7)
+    cache.put("down.example", 0.0, ok=False)
+    cache.save()
+
+    restored = SiteScoreCache(ttl=3600, failure_ttl=300, path=path)
+    assert restored.get("example.com") == (0.7, True)
+    assert restored.get("down.example") == (0.0, False)
+
+    # Устаревшие записи при загрузке отбрасываются
+    clock.now += 301
+    restored = SiteScoreCache(ttl=3600, failure_ttl=300, path=path)
+    assert restored.get("down.example") is None
+    assert restored.get("example.com") == (0.7, True)
+
+
+def test_corrupt_cache_file_is_ignored(tmp_path):
+    path = tmp_path / "scores.json"
+    path.write_text("{not json", encoding="utf-8")
+    cache = SiteScoreCache(path=str(path))
+    assert cache.get("example.com") is None
+
+
+def test_sites_deferred_by_budget_are_fetched_first_next_time(server, evaluation, monkeypatch):
+    class _Budget:
+        left = 1
+
+        def admit(self, kind, nbytes=0):
+            self.left -= 1
+            return self.left >= 0
+
+        def defer(self, kind, count=1):
+            pass
+
+    budget = _Budget()
+    monkeypatch.setattr(evaluator, "GOVERNOR", budget)
+    monkeypatch.setattr(evaluator, "_pending", {})
+    first, second = f"http://127.0.0.1:{server}/first", f"http://localhost:{server}/second"
+
+    result = evaluator.evaluate_multiple_sites([first, second])
+    assert list(result["individual_scores"]) == [first]
+    assert _Handler.requests["/second"] == 0
+
+    # Следующий тик: отложенный сайт загружается, хотя в выборке его уже нет
+    budget.left = 1
+    result = evaluator.evaluate_multiple_sites([first])
+    assert list(result["individual_scores"]) == [first]
+    assert _Handler.requests["/second"] == 1
+    assert evaluation.get(f"localhost:{server}") is not None
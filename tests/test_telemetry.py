@@ -0,0 +1,105 @@
+# tests/test_telemetry.py
+#
+# Метрики агента (utils/telemetry.py): счётчики, гистограммы и значения
+# источников в текстовом формате Prometheus, отдача по HTTP и профилирование
+# интервала по файлу-триггеру.
+# Запуск из корня репозитория: python -m pytest tests
+
+import os
+import time
+import threading
+import urllib.request
+import urllib.error
+
+import pytest
+
+from utils import telemetry
+
+
+def test_render_counters_histograms_and_sources():
+    registry = telemetry.Registry()
+    registry.describe("files_walked_total", "Просмотрено файлов")
+    registry.inc("files_walked_total", 3)
+    registry.inc("files_walked_total", 2)
+    registry.inc("deferred_total", kind='doc"s')
+    registry.observe("stage_seconds", 0.003, buckets=(0.001, 0.01), stage="extract")
+    registry.observe("stage_seconds", 5, buckets=(0.001, 0.01), stage="extract")
+    registry.add_source("cache", lambda: {"hits": 7, "hit_rate": 0.5, "enabled": True, "name": "lru"})
+    registry.add_source("broken", lambda: 1 / 0)
+
+    lines = registry.render().splitlines()
+    assert "# HELP dlp_files_walked_total Просмотрено файлов" in lines
+    assert "dlp_files_walked_total 5" in lines
+    assert 'dlp_deferred_total{kind="doc\\"s"} 1' in lines
+    assert 'dlp_stage_seconds_bucket{stage="extract",le="0.001"} 0' in lines
+    assert 'dlp_stage_seconds_bucket{stage="extract",le="0.01"} 1' in lines
+    assert 'dlp_stage_seconds_bucket{stage="extract",le="+Inf"} 2' in lines
+    assert 'dlp_stage_seconds_count{stage="extract"} 2' in lines
+    # Из источников — только числовые поля; ошибка источника не мешает остальным
+    assert "dlp_cache_hits 7" in lines and "dlp_cache_hit_rate 0.5" in lines
+    assert not any(line.startswith(("dlp_cache_enabled", "dlp_cache_name", "dlp_broken")) for line in lines)
+    assert registry.counter("files_walked_total") == 5
+    assert registry.histogram("stage_seconds", stage="extract") == (2, 5.003)
+
+
+def test_timed_records_nested_and_threaded_blocks():
+    registry = telemetry.Registry()
+    timer = telemetry.timed("test_block_seconds", stage="outer")
+    before = telemetry.REGISTRY.histogram("test_block_seconds", stage="outer")[0]
+
+    @timer
+    def work():
+        time.sleep(0.01)
+
+    with timer:
+        work()
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    count, total = telemetry.REGISTRY.histogram("test_block_seconds", stage="outer")
+    assert count - before == 5
+    assert total >= 0.05
+    assert registry.histogram("test_block_seconds", stage="outer") == (0, 0.0)
+
+
+def test_metrics_are_served_over_http():
+    server = telemetry.start_metrics_server(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        telemetry.inc("test_http_total")
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert "dlp_test_http_total 1" in body.splitlines()
+        assert "dlp_process_threads" in body
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_trigger_file_profiles_one_interval(tmp_path):
+    trigger = tmp_path / "profile-next-tick"
+    output = tmp_path / "profiles"
+    profiler = telemetry.TickProfiler(str(trigger), str(output), interval=0.001)
+    profiler.on_sample()
+    assert not output.exists()
+
+    trigger.touch()
+    profiler.on_sample()
+    assert not trigger.exists()
+    stop = threading.Event()
+    worker = threading.Thread(target=lambda: stop.wait(5), name="busy-worker")
+    worker.start()
+    time.sleep(0.05)
+    profiler.on_sample()
+    stop.set()
+    worker.join()
+
+    profile, = os.listdir(output)
+    stacks = (output / profile).read_text(encoding="utf-8").splitlines()
+    assert any(line.startswith("busy-worker;") for line in stacks)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
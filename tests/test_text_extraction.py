@@ -0,0 +1,58 @@
+# tests/test_text_extraction.py
+#
+# Потоковое извлечение текста (utils/text_extraction.py): текстовые файлы
+# читаются блоками, многобайтовые символы на границах блоков не теряются,
+# объём ограничен max_bytes, а ошибка чтения завершает поток без исключения.
+# Извлечение из .docx и .pdf проверяется, если установлены python-docx и PyMuPDF.
+# Запуск из корня репозитория: python -m pytest tests
+
+import pytest
+
+from utils import text_extraction
+from utils.text_extraction import iter_text_chunks, extract_text_from_file, is_supported
+
+
+def test_text_is_streamed_in_blocks_without_splitting_characters(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_extraction, "CHUNK_SIZE", 7)
+    text = "Паспорт 4510 123456 — служебная информация\n" * 20
+    path = tmp_path / "doc.txt"
+    path.write_text(text, encoding="utf-8")
+
+    chunks = list(iter_text_chunks(str(path)))
+    assert len(chunks) > 100
+    # Блок плюс не более одного символа, начатого в предыдущем блоке
+    assert all(len(chunk.encode("utf-8")) <= 7 + 3 for chunk in chunks)
+    assert "".join(chunks) == text
+    assert extract_text_from_file(str(path)) == text
+
+
+def test_extracted_volume_is_bounded(tmp_path):
+    path = tmp_path / "big.txt"
+    path.write_bytes(b"a" * 10000)
+    assert "".join(iter_text_chunks(str(path), max_bytes=1000)) == "a" * 1000
+
+
+def test_unreadable_file_yields_nothing(tmp_path):
+    assert list(iter_text_chunks(str(tmp_path / "missing.txt"))) == []
+    assert extract_text_from_file(str(tmp_path / "missing.txt")) is None
+    assert extract_text_from_file(str(tmp_path / "image.png")) is None
+
+
+def test_supported_extensions_follow_installed_libraries():
+    assert is_supported("/d/Отчёт.TXT")
+    assert not is_supported("/d/archive.zip")
+    assert is_supported("/d/a.docx") == text_extraction._available("docx")
+    assert is_supported("/d/a.pdf") == text_extraction._available("fitz")
+
+
+def test_docx_paragraphs_are_streamed_and_bounded(tmp_path):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    for n in range(50):
+        document.add_paragraph(f"абзац {n}")
+    path = tmp_path / "doc.docx"
+    document.save(path)
+
+    text = "".join(iter_text_chunks(str(path)))
+    assert text.splitlines()[:2] == ["абзац 0", "абзац 1"]
+    assert "".join(iter_text_chunks(str(path), max_bytes=20)) == text[:20]
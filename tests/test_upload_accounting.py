@@ -0,0 +1,93 @@
+# tests/test_upload_accounting.py
+#
+# Учёт исходящего трафика по процессам (features/network_activity/upload_accounting.py)
+# на подставленной таблице сокетов: прирост по сокетам, список разрешённых
+# процессов и сверка с общим счётчиком интерфейсов (короткие соединения, UDP).
+# Запуск из корня репозитория: python -m pytest tests
+
+import pytest
+
+from features.network_activity import upload_accounting
+from features.network_activity.upload_accounting import UploadAccounting, UNKNOWN_OWNER
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def sockets(monkeypatch):
+    """Таблица сокетов: {inode: (ip, порт, bytes_acked, pid)}."""
+    table = {}
+    monkeypatch.setattr(upload_accounting, "tcp_sockets",
+                        lambda: [(inode, ip, port, acked) for inode, (ip, port, acked, _) in table.items()])
+    monkeypatch.setattr(upload_accounting, "socket_owners",
+                        lambda inodes: {inode: table[inode][3] for inode in inodes if inode in table})
+    return table
+
+
+NAMES = {10: "curl", 20: "backup-agent", 30: "firefox"}
+
+
+def test_socket_deltas_are_attributed_to_processes(sockets):
+    accounting = UploadAccounting(allowlist=["backup-agent"])
+    sockets[1] = ("203.0.113.5", 443, 5 * MB, 30)
+    accounting.sample(NAMES)
+
+    sockets[1] = ("203.0.113.5", 443, 6 * MB, 30)
+    sockets[2] = ("203.0.113.9", 22, 3 * MB, 10)
+    sockets[3] = ("198.51.100.1", 443, 7 * MB, 20)
+    sockets[4] = ("127.0.0.1", 8080, 9 * MB, 10)
+    table = accounting.sample(NAMES)
+
+    assert table.by_process == {"firefox": MB, "curl": 3 * MB}
+    assert table.by_endpoint[("curl", "203.0.113.9:22")] == 3 * MB
+    assert table.total == 4 * MB and table.excluded == 7 * MB
+    assert accounting.top_uploaders(1) == [("curl", 3 * MB)]
+
+
+def test_traffic_missing_from_sockets_is_counted_as_unknown(sockets):
+    accounting = UploadAccounting()
+    sockets[1] = ("203.0.113.5", 443, 0, 30)
+    accounting.sample(NAMES)
+
+    # Короткая выгрузка (scp) открылась и закрылась между замерами: сокета нет,
+    # но счётчик интерфейсов вырос
+    sockets[1] = ("203.0.113.5", 443, MB, 30)
+    table = accounting.sample(NAMES, sent=21 * MB, received=0)
+
+    expected = int(21 * MB - MB - upload_accounting.OVERHEAD_SENT * 21 * MB)
+    assert table.unattributed == expected
+    assert table.by_process[UNKNOWN_OWNER] == expected
+    assert table.total == MB + expected
+
+
+def test_acks_of_a_large_download_are_not_an_upload(sockets):
+    accounting = UploadAccounting()
+    accounting.sample(NAMES)
+
+    table = accounting.sample(NAMES, sent=2 * MB, received=100 * MB)
+    assert table.total == 0 and table.unattributed == 0
+
+
+def test_malformed_sock_diag_message_falls_back_to_system_counter(monkeypatch):
+    from collections import namedtuple
+    from features.network_activity import network_monitor
+    from utils.snapshot import SystemSnapshot
+
+    def truncated(names, sent=None, received=None):
+        upload_accounting._parse_message(b"\x02\x01", 0, 2)
+
+    accounting = UploadAccounting()
+    monkeypatch.setattr(accounting, "sample", truncated)
+    monkeypatch.setattr(network_monitor, "_uploads", accounting)
+    monkeypatch.setattr(network_monitor, "_sampler", None)
+    monkeypatch.setattr(network_monitor, "_last_sent_bytes", 100 * MB)
+    monkeypatch.setattr(network_monitor, "_last_external", None)
+    monkeypatch.setattr(network_monitor, "_last_upload_table", None)
+    NetIO = namedtuple("NetIO", ["bytes_sent", "bytes_recv"])
+    snapshot = SystemSnapshot(processes=[], connections=[], net_io_counters=NetIO(130 * MB, 0),
+                              net_io_counters_pernic={"eth0": NetIO(130 * MB, 0)})
+
+    features = network_monitor.collect_network_features(snapshot)
+    assert features["upload_volume_MB"] == 30.0 and features["upload_spike_detected"] == 1
+    # Учёт по процессам не отключён: следующий тик снова пробует таблицу сокетов
+    assert network_monitor._uploads is accounting
@@ -0,0 +1,76 @@
+# tests/test_usb_index.py
+#
+# Индекс USB-томов (features/usb_activity/usb_index.py): исходный обход не
+# считает файлы скопированными, повторный находит добавленные файлы и рост
+# копируемых, а индексы отключённых томов хранятся в ограниченном числе.
+# Запуск из корня репозитория: python -m pytest tests
+
+import time
+import threading
+
+import pytest
+
+from features.usb_activity.usb_index import UsbIndexer, VolumeIndex, _Throttle
+
+
+def throttle():
+    return _Throttle(rate=10 ** 9, stop=threading.Event())
+
+
+def test_rescan_counts_added_and_growing_files(tmp_path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "old.txt").write_bytes(b"x" * 100)
+    index = VolumeIndex(str(tmp_path))
+    assert index.scan(throttle(), baseline=True) == (0, 0)
+    assert index.files == 1
+
+    (tmp_path / "docs" / "new.exe").write_bytes(b"x" * 50)
+    (tmp_path / "deep" / "er").mkdir(parents=True)
+    (tmp_path / "deep" / "er" / "copy.bin").write_bytes(b"x" * 10)
+    assert index.scan(throttle()) == (2, 60)
+    assert (index.files, index.executables) == (3, 1)
+
+    # Копирование продолжается: прирост размера учитывается, хотя каталог не менялся
+    with open(tmp_path / "deep" / "er" / "copy.bin", "ab") as f:
+        f.write(b"x" * 30)
+    assert index.scan(throttle()) == (0, 30)
+
+    (tmp_path / "docs" / "new.exe").unlink()
+    assert index.scan(throttle()) == (0, 0)
+    assert (index.files, index.executables) == (2, 0)
+
+
+def wait_ready(indexer, vid, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        index = indexer._indexes.get(vid)
+        if index is not None and index.ready:
+            return index
+        time.sleep(0.01)
+    pytest.fail(f"том {vid} не проиндексирован")
+
+
+def test_indexes_of_disconnected_volumes_are_bounded(tmp_path):
+    indexer = UsbIndexer(rescan_interval=0.05, max_volumes=2)
+    volumes = {}
+    for n in range(5):
+        (tmp_path / f"vol{n}").mkdir()
+        volumes[f"vol{n}"] = str(tmp_path / f"vol{n}")
+    try:
+        first = None
+        for n in range(5):
+            indexer.set_volumes({f"vol{n}": volumes[f"vol{n}"]})
+            index = wait_ready(indexer, f"vol{n}")
+            first = first or index
+            # Подключённый том и не более max_volumes отключённых
+            assert len(indexer._indexes) <= 3
+
+        assert list(indexer._indexes) == ["vol2", "vol3", "vol4"]
+        # Недавно подключавшийся том сохраняет индекс, давний индексируется заново
+        kept = indexer._indexes["vol3"]
+        indexer.set_volumes({"vol3": volumes["vol3"]})
+        assert wait_ready(indexer, "vol3") is kept
+        indexer.set_volumes({"vol0": volumes["vol0"]})
+        assert wait_ready(indexer, "vol0") is not first
+    finally:
+        indexer.stop()
@@ -0,0 +1,113 @@
+# tests/test_wire_format.py
+#
+# Двоичный формат образцов (utils/wire_format.py): значения признаков после
+# кодирования и декодирования совпадают с теми, что сервер получил бы в JSON;
+# разностные кадры восстанавливаются по базовому образцу, без него — ошибка.
+# Запуск из корня репозитория: python -m pytest tests
+
+import json
+
+import pytest
+
+from utils import wire_format
+
+
+def sample(**features):
+    return {"user_id": "u1", "timestamp": "2026-01-01T00:00:00", "features": features}
+
+
+def full_sample(step=0):
+    """Образец со всеми признаками схемы (значения зависят от step)."""
+    features = {
+        group: {name: (n + step) * 0.5 if kind == "f" else n + step for n, (name, kind) in enumerate(spec)}
+        for group, spec in wire_format.SCHEMA.items()
+    }
+    return {"user_id": "пользователь-1", "timestamp": f"2026-01-01T00:0{step}:00", "features": features}
+
+
+def as_json(payload):
+    return json.loads(json.dumps(payload, ensure_ascii=False))
+
+
+def test_full_frame_round_trip_matches_json():
+    payload = full_sample()
+    payload["stale_groups"] = ["usb_activity"]
+    payload["agent_health"] = {"tick_seconds": 1.25}
+    payload["features"]["custom_group"] = {"x": "строка"}
+    payload["features"]["file_activity"]["file_update_count"] = 3_000_000_000   # не помещается в i32
+
+    decoded, seq, base_seq = wire_format.decode(wire_format.encode(payload, 7))
+    assert decoded == as_json(payload)
+    assert (seq, base_seq) == (7, 0)
+
+
+def test_delta_frame_carries_only_changed_features():
+    first, second = full_sample(0), full_sample(0)
+    second["timestamp"] = "2026-01-01T00:01:00"
+    second["features"]["network_activity"]["http_requests_count"] += 5
+
+    full = wire_format.encode(second, 2)
+    delta = wire_format.encode(second, 2, base=first, base_seq=1)
+    assert len(delta) < len(full) // 5
+
+    decoded, seq, base_seq = wire_format.decode(delta, base=first)
+    assert decoded == as_json(second)
+    assert (seq, base_seq) == (2, 1)
+    with pytest.raises(wire_format.WireError):
+        wire_format.decode(delta)
+
+
+def test_batch_frames_chain_on_each_other():
+    payloads = [full_sample(step) for step in range(4)]
+    data = wire_format.encode_batch(payloads, 10)
+    frames = wire_format.decode_batch(data)
+    assert [payload for payload, _, _ in frames] == [as_json(p) for p in payloads]
+    assert [(seq, base_seq) for _, seq, base_seq in frames] == [(10, 0), (11, 10), (12, 11), (13, 12)]
+
+
+def test_decoder_rejects_delta_on_unknown_base_until_encoder_resets():
+    encoder, decoder = wire_format.WireEncoder(), wire_format.WireDecoder()
+    assert decoder.decode_batch(encoder.encode_batch([full_sample(0), full_sample(1)])) == \
+        [as_json(full_sample(0)), as_json(full_sample(1))]
+    encoder.ack()
+
+    # Сервер перезапущен и не знает базовый образец (ответ 409)
+    decoder = wire_format.WireDecoder()
+    with pytest.raises(wire_format.WireError):
+        decoder.decode_batch(encoder.encode_batch([full_sample(2)]))
+    encoder.reset()
+    assert decoder.decode_batch(encoder.encode_batch([full_sample(2)])) == [as_json(full_sample(2))]
+
+    # Ответ потерян (нет ack): повтор пачки кодируется от прежней базы и тоже принимается
+    assert decoder.decode_batch(encoder.encode_batch([full_sample(2)])) == [as_json(full_sample(2))]
+
+
+@pytest.mark.parametrize("value", [0.71, 1234.57, 12345.67, 100000.125, 0.12345, 98765432.5, 3])
+def test_float_features_decode_exactly(value):
+    payload = sample(file_activity={"file_confidentiality_score": value}, usb_activity={"usb_copy_volume_MB": value})
+    decoded, _, _ = wire_format.decode(wire_format.encode(payload, 1))
+    assert decoded["features"]["file_activity"]["file_confidentiality_score"] == value
+    assert decoded["features"]["usb_activity"]["usb_copy_volume_MB"] == value
+
+
+def test_oversized_trailer_raises_wire_error():
+    payload = sample(file_activity={})
+    payload["file_activity_late"] = {"intervals": ["x" * 70000]}
+    with pytest.raises(wire_format.WireError):
+        wire_format.encode(payload, 1)
+
+
+def test_frame_of_previous_schema_decodes_with_new_features_zero():
+    payload = sample(behavioral_context={"clipboard_sensitive_matches": 2, "clipboard_sensitive_events": 1})
+    decoded, _, _ = wire_format.decode(wire_format.encode(payload, 1))
+    assert decoded["features"]["behavioral_context"]["clipboard_sensitive_events"] == 1
+
+    # Кадр агента со схемой 1 (без нового признака) сервер по-прежнему принимает
+    old = sample(behavioral_context={"clipboard_sensitive_matches": 2})
+    frame = bytearray(wire_format.encode(old, 1))
+    frame[4:6] = (1).to_bytes(2, "little")   # поле версии схемы в заголовке
+    decoded, _, _ = wire_format.decode(bytes(frame))
+    assert decoded["features"]["behavioral_context"] == {
+        "activity_outside_work_hours": 0, "activity_weekend_hours": 0,
+        "clipboard_sensitive_matches": 2, "clipboard_sensitive_events": 0,
+    }
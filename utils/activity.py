@@ -0,0 +1,27 @@
+# utils/activity.py
+#
+# Отметки последней активности, которую учитывают другие сборщики: подключение
+# USB-носителя и копирование на него, крупная исходящая выгрузка. Так очередь
+# анализа документов поднимает приоритет файлов, изменённых рядом с такими
+# событиями, не импортируя сами сборщики (и их зависимости) в рабочие процессы.
+
+import time
+
+USB = "usb"
+UPLOAD = "upload"
+
+# Вид активности -> время последней отметки (запись одного ключа атомарна)
+_last = {}
+
+
+def mark(kind, when=None):
+    """Отмечает активность вида kind в момент when (по умолчанию — сейчас)."""
+    _last[kind] = time.time() if when is None else when
+
+
+def seconds_since(kind, now=None) -> float:
+    """Сколько секунд прошло с последней отметки вида kind (inf — отметок не было)."""
+    last = _last.get(kind)
+    if last is None:
+        return float("inf")
+    return max(0.0, (time.time() if now is None else now) - last)
@@ -0,0 +1,299 @@
+# utils/compact_model.py
+#
+# Компактный формат моделей классификации (TF-IDF + случайный лес или
+# логистическая регрессия) и оценщик на одном NumPy.
+#
+# Файл .dlpm:
+#   b"DLPM" | uint32 версия формата | uint32 длина заголовка | заголовок JSON |
+#   массивы, каждый выровнен на 64 байта
+# Заголовок описывает векторизатор, классы и для каждого массива — тип, форму
+# и смещение. Массивы не копируются в память процесса, а отображаются из файла
+# (np.memmap): загрузка занимает миллисекунды, а страницы модели общие для всех
+# процессов агента (основного и рабочих процессов анализа).
+#
+# Экспорт: python -m utils.compact_model model.pkl [model.dlpm]
+
+import os
+import re
+import sys
+import json
+import struct
+from collections import Counter
+
+MAGIC = b"DLPM"
+FORMAT_VERSION = 1
+_ALIGN = 64
+_PREAMBLE = struct.Struct("<4sII")
+
+
+def compact_path(path: str) -> str:
+    """Путь компактной модели рядом с файлом .pkl."""
+    return os.path.splitext(path)[0] + ".dlpm"
+
+
+def resolve_model_path(path: str, prefer_compact: bool = True) -> str:
+    """Файл модели, который будет загружен: .dlpm, если он есть и разрешён, иначе исходный."""
+    if prefer_compact and os.path.exists(compact_path(path)):
+        return compact_path(path)
+    return path
+
+
+def load_model(path: str, prefer_compact: bool = True):
+    """
+    Загружает модель: компактную (.dlpm рядом с path), если она есть,
+    иначе pickle-пайплайн scikit-learn через joblib.
+    Исключения загрузки пробрасываются вызывающему.
+    """
+    resolved = resolve_model_path(path, prefer_compact)
+    if resolved != path:
+        try:
+            return CompactModel(resolved)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Компактная модель {resolved} не загружена, используется {path}: {e}")
+    import joblib
+    return joblib.load(path)
+
+
+class CompactModel:
+    """
+    Модель из файла .dlpm с интерфейсом пайплайна scikit-learn:
+    predict_proba(texts) и classes_.
+
+    Векторизация повторяет TfidfVectorizer (нижний регистр, token_pattern,
+    n-граммы, sublinear_tf, idf, L2-нормировка); признаки для деревьев
+    приводятся к float32, как в scikit-learn, поэтому вероятности совпадают
+    с исходным пайплайном.
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        with open(path, "rb") as f:
+            preamble = f.read(_PREAMBLE.size)
+            if len(preamble) < _PREAMBLE.size:
+                raise ValueError("файл модели обрезан")
+            magic, version, header_len = _PREAMBLE.unpack(preamble)
+            if magic != MAGIC:
+                raise ValueError("не файл модели DLPM")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"неподдерживаемая версия формата: {version}")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        self.path = path
+        self.kind = header["kind"]
+        self.classes_ = np.array(header["classes"])
+        vectorizer = header["vectorizer"]
+        self._lowercase = vectorizer["lowercase"]
+        self._token_regex = re.compile(vectorizer["token_pattern"])
+        self._ngram_range = tuple(vectorizer["ngram_range"])
+        self._sublinear_tf = vectorizer["sublinear_tf"]
+        self._norm = vectorizer["norm"]
+        self._max_depth = header.get("max_depth", 0)
+
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        self._arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+            start = spec["offset"]
+            self._arrays[name] = raw[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+
+        # Словарь признаков: термины хранятся в порядке столбцов одной строкой
+        terms = bytes(self._arrays.pop("terms")).decode("utf-8").split("\n")
+        self._vocabulary = {term: i for i, term in enumerate(terms)}
+        self.n_features = len(terms)
+
+    def predict_proba(self, texts):
+        import numpy as np
+
+        X = self._transform(texts)
+        if self.kind == "forest":
+            return self._forest_proba(X)
+        a = self._arrays
+        decision = X @ a["coef"].T + a["intercept"]
+        if decision.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-decision[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        decision -= decision.max(axis=1, keepdims=True)
+        np.exp(decision, out=decision)
+        decision /= decision.sum(axis=1, keepdims=True)
+        return decision
+
+    def _transform(self, texts):
+        import numpy as np
+
+        idf = self._arrays["idf"]
+        X = np.zeros((len(texts), self.n_features), dtype=np.float64)
+        for row, text in enumerate(texts):
+            counts = Counter(c for c in map(self._vocabulary.get, self._analyze(text)) if c is not None)
+            if not counts:
+                continue
+            cols = np.fromiter(sorted(counts), dtype=np.intp, count=len(counts))
+            values = np.array([counts[c] for c in cols], dtype=np.float64)
+            if self._sublinear_tf:
+                values = np.log(values) + 1.0
+            values *= idf[cols]
+            if self._norm == "l2":
+                norm = np.sqrt(np.dot(values, values))
+                if norm > 0:
+                    values /= norm
+            elif self._norm == "l1":
+                norm = np.abs(values).sum()
+                if norm > 0:
+                    values /= norm
+            X[row, cols] = values
+        return X
+
+    def _analyze(self, text):
+        if self._lowercase:
+            text = text.lower()
+        tokens = self._token_regex.findall(text)
+        min_n, max_n = self._ngram_range
+        if max_n == 1:
+            return tokens
+        grams = tokens if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            grams = grams + [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+        return grams
+
+    def _forest_proba(self, X):
+        import numpy as np
+
+        a = self._arrays
+        X = X.astype(np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        # Все деревья проходятся одновременно, уровень за уровнем;
+        # листья ссылаются сами на себя, поэтому лишние шаги их не сдвигают
+        node = np.broadcast_to(a["roots"], (X.shape[0], a["roots"].shape[0])).copy()
+        for _ in range(self._max_depth):
+            go_left = X[rows, a["feature"][node]] <= a["threshold"][node]
+            node = np.where(go_left, a["left"][node], a["right"][node])
+
+        proba = np.zeros((X.shape[0], self.classes_.shape[0]), dtype=np.float64)
+        for tree in range(node.shape[1]):
+            proba += a["value"][node[:, tree]]
+        proba /= node.shape[1]
+        return proba
+
+
+def export_pipeline(pipeline, path: str, check_texts=None) -> str:
+    """
+    Сохраняет обученный пайплайн scikit-learn (TfidfVectorizer +
+    RandomForestClassifier/LogisticRegression) в формате .dlpm.
+    Если переданы check_texts, сравнивает вероятности исходного пайплайна
+    и компактной модели и бросает ValueError при расхождении.
+    Возвращает путь записанного файла.
+    """
+    import numpy as np
+
+    vectorizer, clf = pipeline.steps[0][1], pipeline.steps[-1][1]
+    if vectorizer.analyzer != "word" or vectorizer.tokenizer or vectorizer.preprocessor or vectorizer.strip_accents:
+        raise ValueError("поддерживается только TfidfVectorizer с analyzer='word' без своих функций")
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    if any("\n" in t for t in terms):
+        raise ValueError("термин словаря содержит перевод строки")
+    arrays = {
+        "terms": np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+        "idf": np.asarray(vectorizer.idf_, dtype=np.float64),
+    }
+    header = {
+        "vectorizer": {
+            "lowercase": bool(vectorizer.lowercase),
+            "token_pattern": vectorizer.token_pattern,
+            "ngram_range": list(vectorizer.ngram_range),
+            "sublinear_tf": bool(vectorizer.sublinear_tf),
+            "norm": vectorizer.norm,
+        },
+        "classes": clf.classes_.tolist(),
+    }
+
+    if hasattr(clf, "estimators_"):
+        header["kind"] = "forest"
+        header["max_depth"] = max(int(e.tree_.max_depth) for e in clf.estimators_)
+        arrays.update(_flatten_forest(clf, np))
+    elif hasattr(clf, "coef_"):
+        header["kind"] = "linear"
+        arrays["coef"] = np.ascontiguousarray(clf.coef_, dtype=np.float64)
+        arrays["intercept"] = np.ascontiguousarray(clf.intercept_, dtype=np.float64)
+    else:
+        raise ValueError(f"неподдерживаемый классификатор: {type(clf).__name__}")
+
+    _write(path, header, arrays, np)
+
+    if check_texts is not None and len(check_texts):
+        texts = list(check_texts)
+        diff = float(np.abs(pipeline.predict_proba(texts) - CompactModel(path).predict_proba(texts)).max())
+        if diff > 1e-9:
+            raise ValueError(f"вероятности компактной модели расходятся с исходной: {diff:.3g}")
+    return path
+
+
+def _flatten_forest(forest, np):
+    """Узлы всех деревьев в общих плоских массивах; индексы потомков глобальные."""
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        ids = np.arange(tree.node_count, dtype=np.int32) + offset
+        leaf = tree.children_left == -1
+        left.append(np.where(leaf, ids, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(leaf, ids, tree.children_right + offset).astype(np.int32))
+        feature.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        # Нормировка значений листьев — как в DecisionTreeClassifier.predict_proba
+        proba = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+        normalizer = proba.sum(axis=1)[:, None]
+        normalizer[normalizer == 0.0] = 1.0
+        value.append(proba / normalizer)
+        roots.append(offset)
+        offset += tree.node_count
+    return {
+        "left": np.concatenate(left),
+        "right": np.concatenate(right),
+        "feature": np.concatenate(feature),
+        "threshold": np.concatenate(threshold),
+        "value": np.ascontiguousarray(np.concatenate(value)),
+        "roots": np.array(roots, dtype=np.int32),
+    }
+
+
+def _write(path, header, arrays, np):
+    # Смещения массивов зависят от длины заголовка, а заголовок — от смещений:
+    # заголовок дополняется пробелами до кратной выравниванию длины с запасом
+    specs = {name: {"dtype": a.dtype.str, "shape": list(a.shape), "offset": 0} for name, a in arrays.items()}
+    header["arrays"] = specs
+    header_len = _align(len(json.dumps(header).encode("utf-8")) + 32 * len(arrays) + _PREAMBLE.size) - _PREAMBLE.size
+
+    position = _PREAMBLE.size + header_len
+    for name, a in arrays.items():
+        specs[name]["offset"] = position
+        position = _align(position + a.nbytes)
+    encoded = json.dumps(header).encode("utf-8")
+    if len(encoded) > header_len:
+        raise ValueError("заголовок модели не помещается в отведённое место")
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, header_len))
+        f.write(encoded.ljust(header_len, b" "))
+        for name, a in arrays.items():
+            f.seek(specs[name]["offset"])
+            f.write(np.ascontiguousarray(a).tobytes())
+        f.truncate(position)
+    os.replace(tmp_path, path)
+
+
+def _align(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python -m utils.compact_model model.pkl [model.dlpm]")
+        sys.exit(1)
+    import joblib
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) > 2 else compact_path(source)
+    export_pipeline(joblib.load(source), target)
+    print(f"✅ Компактная модель сохранена в {target}")
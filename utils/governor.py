@@ -0,0 +1,204 @@
+# utils/governor.py
+#
+# Ограничение ресурсов, которые агент расходует за интервал отправки:
+# процессорное время (вместе с рабочими процессами анализа) и объём
+# прочитанных документов. Работа сверх бюджета переносится на следующие
+# интервалы (документы, обход USB-томов, загрузка сайтов); число отложенных
+# задач отдаётся в метриках (dlp_deferred_total) и в группе agent_health.
+
+import os
+import time
+import threading
+from collections import Counter
+from utils import telemetry
+from config import SEND_INTERVAL, GOVERNOR_CPU_SHARE, GOVERNOR_READ_BUDGET_MB
+
+# Как часто (не чаще, в секундах) заново снимается процессорное время агента
+CPU_CHECK_INTERVAL = 0.05
+
+
+def lower_priority(nice=10, io_idle=False) -> list:
+    """
+    Понижает приоритет агента по процессору и вводу-выводу. В Linux приоритет
+    задаётся потоку и наследуется создаваемыми им потоками и процессами, поэтому
+    вызывается в начале работы, до запуска фоновых потоков.
+    io_idle=True — класс IDLE (диск только при простое; под постоянной нагрузкой
+    агент может не получить его вовсе), иначе — низший уровень best-effort.
+    Возвращает список применённых настроек.
+    """
+    applied = []
+    try:
+        import psutil
+        proc = psutil.Process()
+    except Exception as e:
+        print(f"⚠️ Не удалось понизить приоритет агента: {e}")
+        return applied
+    try:
+        if os.name == "nt":
+            proc.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+            applied.append("cpu=below_normal")
+        elif nice:
+            proc.nice(max(proc.nice(), nice))
+            applied.append(f"nice={proc.nice()}")
+    except Exception as e:
+        print(f"⚠️ Не удалось понизить приоритет ЦП: {e}")
+    try:
+        if os.name == "nt":
+            proc.ionice(psutil.IOPRIO_VERYLOW if io_idle else psutil.IOPRIO_LOW)
+            applied.append("io=very_low" if io_idle else "io=low")
+        elif hasattr(psutil, "IOPRIO_CLASS_IDLE"):
+            if io_idle:
+                proc.ionice(psutil.IOPRIO_CLASS_IDLE)
+                applied.append("io=idle")
+            else:
+                proc.ionice(psutil.IOPRIO_CLASS_BE, value=7)
+                applied.append("io=best-effort/7")
+    except Exception as e:
+        print(f"⚠️ Не удалось понизить приоритет ввода-вывода: {e}")
+    return applied
+
+
+class Governor:
+    """
+    Бюджет ресурсов на период (интервал отправки). Периоды выровнены по часам,
+    как и моменты отправки в CollectorScheduler.
+
+    Процессорное время — всего процесса агента (все потоки) и источников,
+    добавленных add_cpu_source (рабочие процессы пула анализа). Прочитанные
+    байты учитываются явно: сборщик резервирует объём перед чтением (admit).
+
+    Работа, не допущенная в этом периоде, откладывается вызывающим кодом;
+    здесь считается только её количество по видам. Первая задача каждого вида
+    за период допускается всегда — отложенная работа не копится бесконечно,
+    даже если бюджет целиком расходуют другие сборщики.
+    """
+
+    def __init__(self, period, cpu_budget=None, read_budget=None, clock=time.time):
+        self.period = period
+        self.cpu_budget = cpu_budget      # секунды ЦП за период (None — без ограничения)
+        self.read_budget = read_budget    # байт за период (None — без ограничения)
+        self.clock = clock
+        self._cpu_sources = []
+        self._lock = threading.Lock()
+        self._window = None
+        self._window_cpu = 0.0            # процессорное время на начало периода
+        self._read = 0
+        self._admitted = set()            # виды работы, уже допущенные в этом периоде
+        self._deferred = Counter()        # отложено в этом периоде, по видам
+        self._cpu_cached = (float("-inf"), 0.0)
+        self._last = {"cpu_sec": 0.0, "read_mb": 0.0, "deferred": 0}
+
+    def add_cpu_source(self, func):
+        """func() -> процессорное время (с) дочерних процессов, которое тоже входит в бюджет."""
+        self._cpu_sources.append(func)
+
+    def cpu_seconds(self) -> float:
+        checked, value = self._cpu_cached
+        now = time.monotonic()
+        if now - checked >= CPU_CHECK_INTERVAL:
+            value = time.process_time()
+            for source in self._cpu_sources:
+                try:
+                    value += source()
+                except Exception:
+                    continue
+            self._cpu_cached = (now, value)
+        return value
+
+    def exhausted(self) -> bool:
+        """Израсходован ли бюджет текущего периода."""
+        with self._lock:
+            self._roll()
+            return self._exhausted()
+
+    def admit(self, kind, nbytes=0) -> bool:
+        """
+        Допускает задачу вида kind с чтением nbytes байт: резервирует объём и
+        возвращает True; False — бюджет израсходован, задачу нужно отложить (defer).
+        """
+        with self._lock:
+            self._roll()
+            if kind in self._admitted and self._exhausted():
+                return False
+            self._admitted.add(kind)
+            self._read += nbytes
+            return True
+
+    def charge_read(self, nbytes):
+        with self._lock:
+            self._roll()
+            self._read += nbytes
+
+    def defer(self, kind, count=1):
+        """Учитывает count задач вида kind, отложенных вызывающим кодом."""
+        if count:
+            with self._lock:
+                self._roll()
+                self._defer(kind, count)
+
+    def wait_for_budget(self, stop) -> bool:
+        """Ждёт начала периода с неизрасходованным бюджетом; False — если выставлен stop."""
+        while True:
+            with self._lock:
+                self._roll()
+                if not self._exhausted():
+                    return True
+                remaining = (self._window + 1) * self.period - self.clock()
+            if stop.wait(max(0.01, remaining)):
+                return False
+
+    def stats(self) -> dict:
+        """Расход текущего периода и отложенные задачи по видам."""
+        with self._lock:
+            self._roll()
+            stats = {
+                "cpu_sec": round(self.cpu_seconds() - self._window_cpu, 3),
+                "read_mb": round(self._read / 1024 / 1024, 2),
+                "cpu_budget_sec": self.cpu_budget or 0,
+                "read_budget_mb": round((self.read_budget or 0) / 1024 / 1024, 2),
+            }
+            for kind, count in self._deferred.items():
+                stats[f"deferred_{kind}"] = count
+            return stats
+
+    def last_period(self) -> dict:
+        """Итоги последнего завершённого периода: cpu_sec, read_mb, deferred (всего задач)."""
+        with self._lock:
+            self._roll()
+            return dict(self._last)
+
+    def _exhausted(self) -> bool:
+        if self.read_budget is not None and self._read >= self.read_budget:
+            return True
+        if self.cpu_budget is not None and self.cpu_seconds() - self._window_cpu >= self.cpu_budget:
+            return True
+        return False
+
+    def _defer(self, kind, count):
+        self._deferred[kind] += count
+        telemetry.inc("deferred_total", count, kind=kind)
+
+    def _roll(self):
+        window = int(self.clock() // self.period)
+        if window == self._window:
+            return
+        cpu = self.cpu_seconds()
+        if self._window is not None:
+            self._last = {
+                "cpu_sec": round(cpu - self._window_cpu, 3),
+                "read_mb": round(self._read / 1024 / 1024, 2),
+                "deferred": sum(self._deferred.values()),
+            }
+        self._window = window
+        self._window_cpu = cpu
+        self._read = 0
+        self._admitted = set()
+        self._deferred = Counter()
+
+
+# Общий бюджет агента: доля ядра и объём чтения документов за интервал отправки
+GOVERNOR = Governor(
+    SEND_INTERVAL,
+    cpu_budget=GOVERNOR_CPU_SHARE * SEND_INTERVAL if GOVERNOR_CPU_SHARE else None,
+    read_budget=GOVERNOR_READ_BUDGET_MB * 1024 * 1024 if GOVERNOR_READ_BUDGET_MB else None,
+)
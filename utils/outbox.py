@@ -0,0 +1,163 @@
+# utils/outbox.py
+
+import json
+import sqlite3
+import itertools
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    payload TEXT NOT NULL
+)
+"""
+
+
+class Outbox:
+    """
+    Очередь образцов на отправку на диске (SQLite, WAL).
+
+    Образцы только добавляются в конец и удаляются после подтверждения
+    сервером, поэтому перезапуск агента или недоступность сервера не теряют
+    данные. Очередь ограничена max_samples образцами и max_bytes байтами:
+    при переполнении удаляются самые старые (счётчик dropped).
+    path=None — очередь только в памяти процесса.
+    """
+
+    def __init__(self, path=None, max_samples=10000, max_bytes=50 * 1024 * 1024):
+        self.max_samples = max_samples
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._lock = threading.Lock()
+        try:
+            self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+            if path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Очередь отправки работает только в памяти: {e}")
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._conn.execute(_SCHEMA)
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(payload AS BLOB))), 0) FROM outbox"
+        ).fetchone()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, payload: dict):
+        data = json.dumps(payload, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO outbox (created, payload) VALUES (?, ?)", (time.time(), data))
+            self._count += 1
+            self._bytes += len(data.encode("utf-8"))
+            if self._count > self.max_samples or self._bytes > self.max_bytes:
+                self._trim()
+
+    def peek(self, limit) -> list:
+        """Самые старые образцы: список (id, payload)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM outbox ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row_id, json.loads(data)) for row_id, data in rows]
+
+    def ack(self, ids):
+        """Удаляет доставленные образцы."""
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock, self._conn:
+            placeholders = ",".join("?" * len(ids))
+            count, size = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(payload AS BLOB))), 0) FROM outbox WHERE id IN ({placeholders})", ids
+            ).fetchone()
+            self._conn.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", ids)
+            self._count -= count
+            self._bytes -= size
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _trim(self):
+        # Удаляем самые старые образцы, пока очередь не уложится в ограничения
+        while self._count > 1 and (self._count > self.max_samples or self._bytes > self.max_bytes):
+            batch = max(1, min(self._count - 1, self._count - self.max_samples, 100))
+            rows = self._conn.execute(
+                "SELECT id, LENGTH(CAST(payload AS BLOB)) FROM outbox ORDER BY id LIMIT ?", (batch,)
+            ).fetchall()
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id, _ in rows])
+            self._count -= len(rows)
+            self._bytes -= sum(size for _, size in rows)
+            self.dropped += len(rows)
+
+
+class SpillOutbox:
+    """
+    Очередь с тем же интерфейсом, что у Outbox: первые max_memory образцов
+    хранятся в памяти, остальные — в Outbox на диске (path). Пока на диске
+    есть образцы, новые тоже пишутся на диск, поэтому порядок отправки
+    сохраняется: сначала память, затем диск.
+    Идентификаторы строк — пары ("m", номер) или ("d", id строки Outbox).
+    """
+
+    def __init__(self, path=None, max_memory=1000, max_samples=10000, max_bytes=50 * 1024 * 1024):
+        self.max_memory = max_memory
+        self.spilled = 0
+        self._memory = {}       # номер -> образец, по порядку поступления
+        self._next = 0
+        self._disk = Outbox(path, max_samples, max_bytes)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._memory) + len(self._disk)
+
+    @property
+    def dropped(self):
+        return self._disk.dropped
+
+    def append(self, payload: dict):
+        """Добавляет образец; возвращает его идентификатор."""
+        with self._lock:
+            if len(self._disk) or len(self._memory) >= self.max_memory:
+                self.spilled += 1
+                self._disk.append(payload)
+                return None
+            self._next += 1
+            self._memory[self._next] = payload
+            return "m", self._next
+
+    def peek(self, limit) -> list:
+        with self._lock:
+            if self._memory:
+                return [(("m", n), payload) for n, payload in itertools.islice(self._memory.items(), limit)]
+        return [(("d", row_id), payload) for row_id, payload in self._disk.peek(limit)]
+
+    def ack(self, ids):
+        disk = []
+        with self._lock:
+            for kind, row_id in ids:
+                if kind == "m":
+                    self._memory.pop(row_id, None)
+                else:
+                    disk.append(row_id)
+        self._disk.ack(disk)
+
+    def spill(self):
+        """
+        Переносит образцы из памяти на диск (перед остановкой). Если на диске
+        уже были образцы, перенесённые встанут после них.
+        """
+        with self._lock:
+            pending = list(self._memory.values())
+            self._memory.clear()
+            for payload in pending:
+                self._disk.append(payload)
+
+    def close(self):
+        self._disk.close()
@@ -0,0 +1,262 @@
+# utils/relay.py
+#
+# Ретранслятор образцов (python agent.py --relay): принимает образцы агентов
+# по тому же протоколу, что и основной модуль (POST /predict и /predict_batch,
+# JSON, gzip), и пересылает их на сервер пачками через несколько постоянных
+# соединений. Агентам достаточно указать адрес ретранслятора в SERVER_URL
+# и SERVER_BATCH_URL.
+#
+# Образцы распределяются по соединениям по user_id (порядок образцов одного
+# агента сохраняется). Очередь соединения — SpillOutbox: в памяти не более
+# заданного числа образцов, остальное — на диске, пока сервер не справляется
+# или недоступен. Агент получает ответ сервера на свой образец, если он пришёл
+# за response_timeout секунд; иначе — последний известный уровень риска этого
+# агента и "queued": true (образец остаётся в очереди ретранслятора и будет
+# доставлен позже).
+#
+# Образцы пересылаются в JSON: двоичный формат (utils/wire_format.py) строит
+# разностные кадры по образцам одного агента, а в соединении ретранслятора
+# идут образцы многих агентов вперемешку.
+
+import json
+import math
+import zlib
+import time
+import datetime
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.outbox import SpillOutbox
+from utils.sender import Sender
+from utils import telemetry
+from utils import wire_format
+
+
+class _Waiter:
+    __slots__ = ("event", "result", "row_id")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.row_id = None
+
+
+class _Channel:
+    """Одно постоянное соединение с сервером: очередь и поток отправки."""
+
+    def __init__(self, relay, number, url, batch_url, spill_path, max_memory, spill_samples, spill_bytes,
+                 batch_size, batch_delay, timeout, use_gzip):
+        self.relay = relay
+        self.waiters = {}     # идентификатор строки очереди -> _Waiter
+        self.lock = threading.Lock()
+        self.outbox = SpillOutbox(spill_path, max_memory, spill_samples, spill_bytes)
+        self.sender = Sender(
+            url, self.outbox, batch_url=batch_url, batch_size=batch_size, timeout=timeout,
+            use_gzip=use_gzip, use_binary=False, backoff_min=0.5, backoff_max=30.0,
+            batch_delay=batch_delay, on_response=self._on_response, name=f"dlp-relay-{number}", verbose=False
+        )
+
+    def submit(self, payload) -> _Waiter:
+        waiter = _Waiter()
+        with self.lock:
+            # Образец, ушедший на диск, ответа не ждёт: сервер уже не успевает
+            waiter.row_id = self.sender.submit(payload)
+            if waiter.row_id is not None:
+                self.waiters[waiter.row_id] = waiter
+        return waiter
+
+    def forget(self, waiter):
+        with self.lock:
+            self.waiters.pop(waiter.row_id, None)
+
+    def _on_response(self, rows, results):
+        for (row_id, payload), result in zip(rows, results):
+            self.relay.remember(payload.get("user_id"), result)
+            with self.lock:
+                waiter = self.waiters.pop(row_id, None)
+            if waiter is not None:
+                waiter.result = result
+                waiter.event.set()
+
+
+class Relay:
+    """
+    Очереди и отправка образцов ретранслятора; HTTP-приём — serve().
+    Память ограничена: max_memory образцов в очередях (остальное — на диске,
+    не более spill_samples образцов и spill_bytes байт на соединение)
+    и max_agents последних ответов по агентам.
+    """
+
+    def __init__(self, url, batch_url=None, connections=4, spill_path=None, max_memory=5000,
+                 spill_samples=1000000, spill_bytes=512 * 1024 * 1024, batch_size=500, batch_delay=0.05,
+                 response_timeout=2.0, timeout=10, use_gzip=True, max_agents=100000):
+        self.response_timeout = response_timeout
+        self.max_agents = max_agents
+        self.received = 0
+        self.answered_late = 0
+        self._latest = OrderedDict()    # user_id -> последний ответ сервера
+        self._latest_lock = threading.Lock()
+        self._channels = [
+            _Channel(self, n, url, batch_url, f"{spill_path}.{n}" if spill_path else None,
+                     max(1, max_memory // connections), spill_samples, spill_bytes,
+                     batch_size, batch_delay, timeout, use_gzip)
+            for n in range(connections)
+        ]
+
+    def start(self):
+        for channel in self._channels:
+            channel.sender.start()
+        return self
+
+    def stop(self):
+        """Останавливает отправку и переносит образцы из памяти на диск."""
+        for channel in self._channels:
+            channel.sender.stop()
+            channel.outbox.spill()
+            channel.outbox.close()
+
+    def forward(self, samples) -> list:
+        """
+        Ставит образцы в очереди и ждёт ответов сервера не дольше response_timeout;
+        возвращает ответ на каждый образец.
+        """
+        pending = []
+        for payload in samples:
+            channel = self._channels[zlib.crc32(str(payload.get("user_id")).encode("utf-8")) % len(self._channels)]
+            pending.append((channel, payload, channel.submit(payload)))
+        with self._latest_lock:
+            self.received += len(samples)
+        telemetry.inc("relay_samples_total", len(samples))
+
+        deadline = time.monotonic() + self.response_timeout
+        results = []
+        for channel, payload, waiter in pending:
+            if waiter.row_id is not None and waiter.event.wait(max(0.0, deadline - time.monotonic())):
+                results.append(waiter.result)
+                continue
+            channel.forget(waiter)
+            with self._latest_lock:
+                self.answered_late += 1
+                latest = self._latest.get(payload.get("user_id")) or {}
+            results.append({"risk_level": latest.get("risk_level"), "queued": True})
+        return results
+
+    def remember(self, user_id, result):
+        with self._latest_lock:
+            self._latest[user_id] = result
+            self._latest.move_to_end(user_id)
+            while len(self._latest) > self.max_agents:
+                self._latest.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "answered_late": self.answered_late,
+            "agents": len(self._latest),
+            "queued": sum(len(c.outbox) for c in self._channels),
+            "spilled": sum(c.outbox.spilled for c in self._channels),
+            "dropped": sum(c.outbox.dropped for c in self._channels),
+            "sent": sum(c.sender.sent for c in self._channels),
+            "failures": sum(c.sender.failures for c in self._channels),
+            "invalid": sum(c.sender.invalid for c in self._channels),
+            "rejected": sum(c.sender.rejected for c in self._channels),
+        }
+
+
+class _RelayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    relay = None
+    max_body = 8 * 1024 * 1024
+    # Тайм-аут сокета: простаивающее соединение агента закрывается, и его поток завершается
+    timeout = 90
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path not in ("/predict", "/predict_batch"):
+            return self._reply(404, {"error": "unknown path"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            # Без верной длины тело не отделить от следующего запроса
+            self.close_connection = True
+            return self._reply(400, {"error": "invalid Content-Length"})
+        if length > self.max_body:
+            self.close_connection = True
+            return self._reply(413, {"error": "body too large"})
+        data = self.rfile.read(length)
+        if self.headers.get("Content-Type", "").startswith(wire_format.CONTENT_TYPE):
+            # Двоичный формат ретранслятор не принимает: агент вернётся к JSON
+            return self._reply(415, {"error": "binary format is not supported by relay"})
+        try:
+            if self.headers.get("Content-Encoding") == "gzip":
+                data = _gunzip(data, self.max_body)
+            body = json.loads(data)
+            samples = body["samples"] if path == "/predict_batch" else [body]
+            if not isinstance(samples, list) or not all(isinstance(s, dict) for s in samples):
+                raise ValueError("samples must be objects")
+            for sample in samples:
+                _check_sample(sample)
+        except (zlib.error, ValueError, KeyError, TypeError) as e:
+            return self._reply(400, {"error": str(e)})
+
+        results = self.relay.forward(samples)
+        self._reply(200, {"results": results} if path == "/predict_batch" else results[0])
+
+    def _reply(self, status, answer):
+        out = json.dumps(answer, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def _check_sample(sample):
+    """
+    Проверка образца до постановки в очередь: ошибочный образец получает 400
+    сразу, а не отвергается сервером позже, когда агент уже получил ответ.
+    ValueError — образец некорректен.
+    """
+    timestamp = sample.get("timestamp")
+    if timestamp:
+        if not isinstance(timestamp, str):
+            raise ValueError("timestamp must be a string")
+        datetime.datetime.strptime(timestamp, wire_format.TIMESTAMP_FORMAT)
+    features = sample.get("features", {})
+    if not isinstance(features, dict):
+        raise ValueError("features must be an object")
+    for group, values in features.items():
+        if not isinstance(values, dict):
+            raise ValueError(f"feature group {group} must be an object")
+        for name, value in values.items():
+            if isinstance(value, float) and not math.isfinite(value):
+                raise ValueError(f"feature {group}.{name} is not a finite number")
+
+
+def _gunzip(data, limit) -> bytes:
+    """Распаковка gzip с ограничением размера результата."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    out = decompressor.decompress(data, limit)
+    if decompressor.unconsumed_tail:
+        raise ValueError("decompressed body too large")
+    return out
+
+
+class _RelayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(relay, host, port, max_body=8 * 1024 * 1024, idle_timeout=90):
+    """
+    HTTP-сервер приёма образцов (поток на соединение агента); serve_forever() — у вызывающего.
+    Соединение, простаивающее idle_timeout секунд, закрывается.
+    """
+    handler = type("RelayHandler", (_RelayHandler,), {"relay": relay, "max_body": max_body, "timeout": idle_timeout})
+    return _RelayServer((host, port), handler)
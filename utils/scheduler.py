@@ -0,0 +1,208 @@
+# utils/scheduler.py
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.snapshot import SystemSnapshot
+from utils import telemetry
+
+
+def combine_features(sum_keys=(), max_keys=()):
+    """
+    Функция объединения результатов сборщика, запущенного несколько раз за
+    интервал отправки: sum_keys суммируются, max_keys берутся по максимуму
+    (флаги «было хотя бы раз»), остальные — из последнего запуска.
+    """
+    def combine(previous, current):
+        result = dict(current)
+        for key in sum_keys:
+            result[key] = previous.get(key, 0) + current.get(key, 0)
+        for key in max_keys:
+            result[key] = max(previous.get(key, 0), current.get(key, 0))
+        return result
+    return combine
+
+
+class _Job:
+    def __init__(self, name, func, interval, deadline, combine):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.base_interval = interval  # интервал из расписания (текущий может быть увеличен)
+        self.calm_runs = 0             # запуски подряд, уложившиеся в половину базового интервала
+        self.deadline = deadline
+        self.combine = combine
+        self.next_due = 0.0
+        self.running = False
+        self.started = 0.0
+        self.pending = None        # результат (объединённый) за текущий интервал отправки
+        self.last_sample = None    # значение, отправленное в прошлый раз
+        self.overruns = 0          # пропущенные запуски: предыдущий ещё не завершён
+        self.last_duration = 0.0   # длительность последнего завершённого запуска (в секундах)
+
+
+class CollectorScheduler:
+    """
+    Планировщик сборщиков признаков.
+
+    Каждый сборщик запускается в своём потоке со своей периодичностью;
+    моменты запуска и отправки выровнены по часам (кратны интервалу от начала
+    эпохи), поэтому период не накапливает сдвиг от времени сбора. Сборщики,
+    запущенные в один момент, получают общий SystemSnapshot.
+
+    Раз в send_interval секунд собирается образец: для каждого сборщика —
+    результат запусков за интервал (объединённый функцией combine). Если
+    сборщик не успел за свой срок (deadline секунд от запуска), в образец
+    попадает его последнее отправленное значение, а группа отмечается как
+    устаревшая. Запуск, пришедшийся на ещё не завершённый предыдущий,
+    пропускается.
+
+    При max_backoff > 1 интервал сборщика, не уложившегося в него (или
+    пропустившего запуск), удваивается, но не более чем в max_backoff раз
+    от интервала из расписания; после calm_runs быстрых запусков подряд
+    (быстрее половины исходного интервала) — уменьшается вдвое. Пока
+    интервал увеличен, часть образцов получает прошлое значение группы
+    и отмечает её устаревшей.
+    """
+
+    def __init__(self, send_interval, on_sample, clock=time.time, max_backoff=1, calm_runs=3):
+        self.send_interval = send_interval
+        self.on_sample = on_sample
+        self.clock = clock
+        self.max_backoff = max_backoff
+        self.calm_runs = calm_runs
+        self._jobs = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._executor = None
+
+    def add(self, name, func, interval=None, deadline=None, combine=None):
+        """Регистрирует сборщик func(snapshot) -> dict под именем группы признаков."""
+        interval = interval or self.send_interval
+        self._jobs.append(_Job(name, func, interval, deadline or interval, combine))
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def run_forever(self):
+        self._executor = ThreadPoolExecutor(max_workers=len(self._jobs), thread_name_prefix="dlp-collector")
+        now = self.clock()
+        for job in self._jobs:
+            job.next_due = now
+        next_send = _align(now, self.send_interval)
+        sample_due = None
+
+        try:
+            while not self._stop.is_set():
+                now = self.clock()
+                self._start_due(now)
+
+                if sample_due is None and now >= next_send:
+                    sample_due = next_send
+                    next_send = _align(now, self.send_interval)
+                if sample_due is not None and self._sample_ready(now):
+                    self._emit(sample_due)
+                    sample_due = None
+
+                wake_at = min([next_send] + [job.next_due for job in self._jobs])
+                if sample_due is not None:
+                    wake_at = min([wake_at] + [job.started + job.deadline for job in self._jobs if job.running])
+                self._wake.wait(max(0.0, wake_at - self.clock()))
+                self._wake.clear()
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def _start_due(self, now):
+        due = [job for job in self._jobs if job.next_due <= now]
+        if not due:
+            return
+        snapshot = SystemSnapshot()
+        for job in due:
+            job.next_due = _align(now, job.interval)
+            with self._lock:
+                if job.running:
+                    job.overruns += 1
+                    telemetry.inc("collector_overruns_total", collector=job.name)
+                    self._back_off(job)
+                    continue
+                job.running = True
+                job.started = self.clock()
+            self._executor.submit(self._run, job, snapshot)
+
+    def _run(self, job, snapshot):
+        started = time.perf_counter()
+        try:
+            value = job.func(snapshot)
+        except Exception as e:
+            print(f"⚠️ Ошибка сборщика {job.name}: {e}")
+            telemetry.inc("collector_errors_total", collector=job.name)
+            value = None
+        duration = time.perf_counter() - started
+        telemetry.observe("collector_seconds", duration, collector=job.name)
+        with self._lock:
+            job.last_duration = duration
+            self._adapt(job, duration)
+            if value is not None:
+                if job.pending is not None and job.combine:
+                    value = job.combine(job.pending, value)
+                job.pending = value
+            job.running = False
+        self._wake.set()
+
+    def _adapt(self, job, duration):
+        """Подстраивает интервал сборщика по длительности запуска (под self._lock)."""
+        if duration > job.interval:
+            self._back_off(job)
+        elif job.interval > job.base_interval and duration < job.base_interval / 2:
+            job.calm_runs += 1
+            if job.calm_runs >= self.calm_runs:
+                job.calm_runs = 0
+                job.interval = max(job.base_interval, job.interval / 2)
+                print(f"⏱️ Интервал сборщика {job.name} уменьшен до {job.interval:g} с")
+        else:
+            job.calm_runs = 0
+
+    def _back_off(self, job):
+        job.calm_runs = 0
+        longer = min(job.interval * 2, job.base_interval * self.max_backoff)
+        if longer > job.interval:
+            job.interval = longer
+            telemetry.inc("collector_backoffs_total", collector=job.name)
+            print(f"⏱️ Сборщик {job.name} не укладывается в интервал: увеличен до {job.interval:g} с")
+
+    def intervals(self) -> dict:
+        """Текущий интервал запуска каждого сборщика: {группа: секунды}."""
+        with self._lock:
+            return {job.name: job.interval for job in self._jobs}
+
+    def durations(self) -> dict:
+        """Длительность последнего запуска каждого сборщика: {группа: секунды}."""
+        with self._lock:
+            return {job.name: job.last_duration for job in self._jobs}
+
+    def _sample_ready(self, now) -> bool:
+        with self._lock:
+            return all(not job.running or now >= job.started + job.deadline for job in self._jobs)
+
+    def _emit(self, sample_time):
+        features = {}
+        stale = []
+        with self._lock:
+            for job in self._jobs:
+                if job.pending is not None:
+                    job.last_sample, job.pending = job.pending, None
+                else:
+                    stale.append(job.name)
+                    telemetry.inc("stale_groups_total", collector=job.name)
+                features[job.name] = dict(job.last_sample or {})
+        try:
+            self.on_sample(features, stale)
+        except Exception as e:
+            print(f"⚠️ Ошибка обработки образца: {e}")
+
+
+def _align(now, interval):
+    """Ближайший после now момент, кратный interval."""
+    return (int(now // interval) + 1) * interval
@@ -0,0 +1,281 @@
+# utils/sender.py
+
+import gzip
+import json
+import time
+import random
+import struct
+import threading
+from utils import wire_format
+
+# Ответы, которыми сервер отвергает сам образец: повтор не поможет, образец отбрасывается.
+# Остальные ошибки (адрес, доступ, перегрузка) — повод повторить позже
+REJECTED_STATUSES = (400, 413, 422)
+
+
+class Sender:
+    """
+    Фоновая отправка образцов признаков на сервер.
+
+    Образцы сначала записываются в Outbox, поэтому цикл сбора не ждёт сети,
+    а при недоступности сервера данные копятся на диске. Поток отправки
+    использует одну сессию requests (соединение keep-alive) и сжимает тела
+    запросов gzip. Накопившаяся очередь отправляется пачками по batch_size
+    образцов на batch_url; если batch_url не задан или сервер его не
+    поддерживает, образцы отправляются по одному на url. После ошибки
+    соединения, ответа 5xx/429 или ответа, означающего ошибку адреса,
+    доступа или таймаут прокси (401, 403, 404, 405, 408), повтор выполняется
+    с экспоненциальной задержкой (от backoff_min до backoff_max секунд, со
+    случайным разбросом): образцы остаются в очереди. Отбрасывается только
+    образец, отвергнутый сервером по содержимому (400, 413, 422; счётчик
+    rejected).
+
+    Если разрешено (use_binary) и сервер ответил заголовком X-DLP-Wire с
+    поддерживаемой версией, дальше образцы отправляются в двоичном формате
+    utils.wire_format пачками разностных кадров. Ответ 409 (сервер не знает
+    базовый образец) — повтор с полного кадра, 415 — возврат к JSON.
+
+    Сжатие отключается, только если сервер явно отверг его (415) или ответил
+    400, а тот же запрос без сжатия прошёл; пачки — после 404/405/501 на
+    batch_url. Отключённые режимы (сжатие, пачки, двоичный формат) снова
+    пробуются через mode_retry_interval секунд.
+
+    Образец, не помещающийся в двоичный кадр, отправляется в JSON; образец,
+    который не удаётся закодировать и в JSON, отбрасывается (счётчик invalid):
+    повтор его не исправит, а очередь за ним остановилась бы. Непредвиденная
+    ошибка в потоке отправки считается неудачей и ведёт к паузе, поток
+    продолжает работу.
+
+    batch_delay — сколько секунд после поступления образца ждать следующих,
+    чтобы отправить их одной пачкой (ретранслятор). on_response(rows, results)
+    получает доставленные строки очереди и ответы сервера на каждый образец.
+    """
+
+    def __init__(self, url, outbox, batch_url=None, batch_size=50, timeout=5,
+                 use_gzip=True, use_binary=True, backoff_min=1.0, backoff_max=300.0,
+                 batch_delay=0.0, on_response=None, name="dlp-sender", verbose=True,
+                 mode_retry_interval=600.0, clock=time.monotonic):
+        self.url = url
+        self.batch_url = batch_url
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.use_gzip = use_gzip
+        self.use_binary = use_binary
+        self.wire = None           # WireEncoder после согласования двоичного формата
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.batch_delay = batch_delay
+        self.on_response = on_response
+        self.name = name
+        self.verbose = verbose
+        self.mode_retry_interval = mode_retry_interval
+        self.clock = clock
+        # Режимы из настроек: восстанавливаются после временного отключения
+        self._configured = (batch_url, use_gzip, use_binary)
+        self._restore_at = None
+        # Сколько следующих образцов отправить по одному (после отказа в пачке)
+        self._isolate = 0
+        self.sent = 0
+        self.failures = 0
+        self.invalid = 0
+        self.rejected = 0
+        self._backoff = 0.0
+        self._session = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, payload: dict):
+        """Ставит образец в очередь на отправку (не блокируется на сети); возвращает результат outbox.append."""
+        row_id = self.outbox.append(payload)
+        self._wake.set()
+        return row_id
+
+    def flush(self) -> bool:
+        """Отправляет очередь, пока она не опустеет или не случится ошибка."""
+        while len(self.outbox):
+            if not self._send_next():
+                return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self.outbox),
+            "sent": self.sent,
+            "failures": self.failures,
+            "invalid": self.invalid,
+            "rejected": self.rejected,
+            "dropped": self.outbox.dropped
+        }
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if self.batch_delay:
+                self._stop.wait(self.batch_delay)
+            try:
+                delivered = self.flush()
+            except Exception as e:
+                # Ошибка очереди или кодирования не должна останавливать поток отправки
+                self.failures += 1
+                delivered = False
+                print(f"❌ Ошибка отправки образцов (в очереди {len(self.outbox)}): {e!r}")
+            if delivered:
+                self._backoff = 0.0
+                self._wake.wait()
+            else:
+                self._backoff = min(self.backoff_max, max(self.backoff_min, self._backoff * 2))
+                self._stop.wait(self._backoff * random.uniform(0.8, 1.2))
+            self._wake.clear()
+
+    def _send_next(self) -> bool:
+        import requests
+
+        if self._restore_at is not None and self.clock() >= self._restore_at:
+            self._restore_at = None
+            self.batch_url, self.use_gzip, self.use_binary = self._configured
+            print("🔁 Повторная проверка отключённых режимов отправки (сжатие, пачки, двоичный формат)")
+
+        if (self.batch_url or self.wire) and len(self.outbox) > 1 and not self._isolate:
+            rows = self.outbox.peek(self.batch_size)
+        else:
+            rows = self.outbox.peek(1)
+        if not rows:
+            return True
+
+        batch = len(rows) > 1
+        wire = self.wire
+        data = None
+        if wire:
+            try:
+                data = wire.encode_batch([payload for _, payload in rows])
+                url, content_type = self.batch_url or self.url, wire_format.CONTENT_TYPE
+            except (ValueError, TypeError, OverflowError, struct.error):
+                if batch:
+                    # Образец, не помещающийся в кадр, ищется отправкой по одному
+                    self._isolate = len(rows)
+                    return True
+                # Образец не помещается в двоичный кадр (например, дополнение длиннее
+                # 65535 байт): этот образец отправляется в JSON
+                wire = None
+        if data is None:
+            try:
+                body = {"samples": [payload for _, payload in rows]} if batch else rows[0][1]
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                url, content_type = self.batch_url if batch else self.url, "application/json"
+            except (ValueError, TypeError) as e:
+                if batch:
+                    self._isolate = len(rows)
+                    return True
+                print(f"[{rows[0][1].get('timestamp')}] ⚠️ Образец не удаётся закодировать, отброшен: {e}")
+                self.outbox.ack(row_id for row_id, _ in rows)
+                self.invalid += 1
+                self._isolate = max(0, self._isolate - 1)
+                return True
+        try:
+            response = self._post(url, data, content_type)
+            if self.use_gzip and response.status_code == 400:
+                # Отказ может относиться к сжатию или к самому образцу: тот же запрос без gzip
+                plain = self._post(url, data, content_type, compress=False)
+                if plain.status_code != 400:
+                    print("⚠️ Сервер не принимает сжатые запросы, отправка без gzip")
+                    self._downgrade(use_gzip=False)
+                response = plain
+        except requests.exceptions.RequestException as e:
+            self.failures += 1
+            print(f"❌ Ошибка соединения (в очереди {len(self.outbox)}): {e}")
+            return False
+
+        if wire and response.status_code == 409:
+            # Сервер потерял базовый образец (перезапуск): следующая пачка — с полного кадра
+            wire.reset()
+            return True
+        if wire and response.status_code == 415:
+            print("⚠️ Сервер больше не принимает двоичный формат, отправка в JSON")
+            self.wire = None
+            self._downgrade(use_binary=False)
+            return True
+        if batch and not wire and response.status_code in (404, 405, 501):
+            print("⚠️ Сервер не принимает пачки образцов, отправка по одному")
+            self._downgrade(batch_url=None)
+            return True
+        if self.use_gzip and response.status_code == 415:
+            print("⚠️ Сервер не принимает сжатые запросы, отправка без gzip")
+            self._downgrade(use_gzip=False)
+            return True
+        if response.status_code != 200 and response.status_code not in REJECTED_STATUSES:
+            # Сервер перегружен, неверный адрес, токен или прокси: образцы ждут в очереди
+            self.failures += 1
+            print(f"⚠️ Ошибка сервера: {response.status_code} (в очереди {len(self.outbox)})")
+            return False
+
+        if response.status_code == 200:
+            if wire:
+                wire.ack()
+            elif self.wire is None and self.use_binary and response.headers.get(wire_format.NEGOTIATION_HEADER) == str(wire_format.FORMAT_VERSION):
+                print("✅ Сервер поддерживает двоичный формат образцов, переключение")
+                self.wire = wire_format.WireEncoder()
+            self._report(rows, response, batch)
+        elif batch:
+            # Ошибка в одном из образцов пачки: образцы отправляются по одному,
+            # чтобы отбросить только ошибочный
+            print(f"⚠️ Пачка отвергнута сервером ({response.status_code}), отправка образцов по одному")
+            self._isolate = len(rows)
+            return True
+        else:
+            # Ошибка в самом образце: повтор не поможет, образец отбрасывается
+            print(f"[{rows[0][1].get('timestamp')}] ⚠️ Образец отвергнут сервером: {response.status_code} → {response.text}")
+            self.outbox.ack(row_id for row_id, _ in rows)
+            self.rejected += 1
+            self._isolate = max(0, self._isolate - 1)
+            return True
+        self.outbox.ack(row_id for row_id, _ in rows)
+        self.sent += len(rows)
+        self._isolate = max(0, self._isolate - len(rows))
+        return True
+
+    def _downgrade(self, **modes):
+        """Временно отключает режим отправки; через mode_retry_interval он пробуется снова."""
+        for name, value in modes.items():
+            setattr(self, name, value)
+        if self._restore_at is None:
+            self._restore_at = self.clock() + self.mode_retry_interval
+
+    def _post(self, url, data, content_type="application/json", compress=None):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        headers = {"Content-Type": content_type}
+        if self.use_gzip if compress is None else compress:
+            data = gzip.compress(data, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+        return self._session.post(url, data=data, headers=headers, timeout=self.timeout)
+
+    def _report(self, rows, response, batch):
+        timestamp = rows[-1][1].get("timestamp")
+        try:
+            answer = response.json()
+        except ValueError:
+            answer = {}
+        if self.on_response is not None:
+            results = (answer.get("results") or []) if batch else [answer]
+            self.on_response(rows, results)
+        if not self.verbose:
+            return
+        if batch:
+            results = answer.get("results") or [{}]
+            print(f"[{timestamp}] ✅ Отправлено образцов: {len(rows)} → уровень риска: {results[-1].get('risk_level')}")
+        else:
+            print(f"[{timestamp}] ✅ Отправлено → уровень риска: {answer.get('risk_level')}")
@@ -0,0 +1,269 @@
+# utils/sensitive_data.py
+
+import re
+import hashlib
+from collections import Counter
+
+# Весовые коэффициенты контрольных разрядов ИНН (10 и 12 цифр)
+_INN10_WEIGHTS = (2, 4, 10, 3, 5, 9, 4, 6, 8)
+_INN12_WEIGHTS_11 = (7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+_INN12_WEIGHTS_12 = (3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+
+# Число из 10–19 цифр, допускаются одиночные пробелы/дефисы/табуляции между цифрами.
+# Длина ограничена, поэтому на длинных цепочках цифр нет катастрофического отката.
+# Граница слова слева проверяется в коде: ретроспективная проверка в шаблоне
+# отключает быстрый поиск первого символа и замедляет проход в 3–4 раза.
+NUMBER_REGEX = re.compile(r"\d(?:[ \t-]?\d){9,18}(?!\w)")
+EMAIL_REGEX = re.compile(r"(?<![a-z0-9_.+-])[a-z0-9_.+-]{1,64}@[a-z0-9-]{1,63}(?:\.[a-z0-9-]{1,63})+")
+_SEPARATORS = re.compile(r"[ \t-]")
+
+# Максимальный хвост фрагмента без перевода строки, переносимый в следующий фрагмент
+MAX_CARRY = 64 * 1024
+
+
+def luhn_valid(digits: str) -> bool:
+    """Проверка контрольной суммы номера карты по алгоритму Луна."""
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = ord(ch) - 48
+        if i % 2:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return total % 10 == 0
+
+
+def inn_valid(digits: str) -> bool:
+    """Проверка контрольных разрядов ИНН (10 цифр — организация, 12 — физлицо)."""
+    d = [ord(ch) - 48 for ch in digits]
+    if len(d) == 10:
+        return sum(w * x for w, x in zip(_INN10_WEIGHTS, d)) % 11 % 10 == d[9]
+    if len(d) == 12:
+        return (sum(w * x for w, x in zip(_INN12_WEIGHTS_11, d)) % 11 % 10 == d[10] and
+                sum(w * x for w, x in zip(_INN12_WEIGHTS_12, d)) % 11 % 10 == d[11])
+    return False
+
+
+def passport_valid(digits: str) -> bool:
+    """
+    Структурная проверка серии и номера паспорта РФ (контрольной суммы у паспорта нет):
+    10 цифр, код региона в серии не 00, не одна и та же цифра.
+    """
+    return len(digits) == 10 and digits[:2] != "00" and digits.count(digits[0]) != 10
+
+
+# Запись серии и номера паспорта: 10 цифр подряд или 4 + 6 через разделитель.
+# Паспорт не имеет контрольной суммы, поэтому из других групп цифр он не составляется
+PASSPORT_GROUPS = ((10,), (4, 6))
+# Счётчики номеров, после которых при count_numbers=False поиск номеров прекращается
+FLAG_NUMBERS = ("card_numbers", "passport_numbers")
+
+
+def card_valid(digits: str) -> bool:
+    return 13 <= len(digits) <= 19 and digits[0] != "0" and luhn_valid(digits)
+
+
+def classify_number(digits: str, groups=None):
+    """
+    Определяет тип номера по цифрам: "card", "inn", "passport" или None.
+    groups — группы цифр в записи номера: паспорт принимается только
+    в записи из PASSPORT_GROUPS (без groups — если цифры записаны подряд).
+    """
+    if card_valid(digits):
+        return "card"
+    if len(digits) in (10, 12) and inn_valid(digits):
+        return "inn"
+    shape = tuple(len(g) for g in groups) if groups else (len(digits),)
+    if shape in PASSPORT_GROUPS and passport_valid(digits):
+        return "passport"
+    return None
+
+
+class SensitiveDataScanner:
+    """
+    Поиск чувствительных данных в тексте, все счётчики за один вызов.
+
+    Текст приводится к нижнему регистру один раз, затем просматривается
+    тремя линейными проходами на стороне C: словарь (одно объединённое
+    выражение вместо str.count на каждое слово), номера (одно выражение
+    вместо отдельных для карт и паспортов; карты проверяются по Луну,
+    ИНН — по контрольным разрядам, паспорта — структурно) и e-mail.
+    Вхождения ключевых слов считаются с перекрытиями: "my_password" даёт
+    совпадения для "my_password", "password" и "pass".
+    Аббревиатуры (слова в верхнем регистре, например "ИНН") ищутся только
+    как отдельные слова, чтобы "инн" не находилось внутри "длинный".
+
+    При count_numbers=False номера проверяются только до первой карты и
+    первого паспорта (FLAG_NUMBERS) — этого достаточно для признаков-флагов.
+    """
+
+    def __init__(self, keywords=(), emails=False, count_numbers=True):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.emails = emails
+        self.count_numbers = count_numbers
+
+        # Слово в нижнем регистре -> исходное слово из словаря
+        self._canonical = {kw.lower(): kw for kw in self.keywords}
+        words = [w for w in self._canonical if not _is_abbreviation(self._canonical[w])]
+        overlapping = any(a != b and a in b for a in words for b in words)
+        # Для каждого слова — более короткие слова, являющиеся его префиксом
+        self._prefixes = {w: [o for o in words if o != w and w.startswith(o)] for w in words}
+
+        # Обычные слова ищутся одним выражением из одних литералов: для такого
+        # шаблона движок использует быстрый поиск по первому символу.
+        # Если одни слова входят в другие, позиции начала ищутся просмотром вперёд.
+        self.keyword_regex = None
+        if words:
+            pattern = "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+            self.keyword_regex = re.compile(f"(?=({pattern}))" if overlapping else f"({pattern})")
+
+        # Аббревиатуры ищутся как литералы, границы слова проверяются в коде
+        # (\b в шаблоне отключает быстрый поиск и замедляет проход в разы)
+        self._abbreviations = [
+            (w, re.compile(re.escape(w))) for w in self._canonical if _is_abbreviation(self._canonical[w])
+        ]
+
+        signature = repr((self.keyword_regex and self.keyword_regex.pattern,
+                          [w for w, _ in self._abbreviations], NUMBER_REGEX.pattern, PASSPORT_GROUPS,
+                          emails and EMAIL_REGEX.pattern, count_numbers, FLAG_NUMBERS))
+        self.version = hashlib.md5(signature.encode("utf-8")).hexdigest()[:8]
+
+    def new_result(self) -> dict:
+        return {
+            "keyword_matches": 0,
+            "keywords": {},
+            "card_numbers": 0,
+            "inn_numbers": 0,
+            "passport_numbers": 0,
+            "emails": 0
+        }
+
+    def scan(self, text: str, result=None) -> dict:
+        """
+        Сканирует текст и возвращает счётчики:
+        keyword_matches, keywords (вхождения по словам), card_numbers,
+        inn_numbers, passport_numbers, emails.
+        """
+        if result is None:
+            result = self.new_result()
+        if not text:
+            return result
+        lowered = text.lower()
+        self._scan_keywords(lowered, result)
+        self._scan_numbers(lowered, result)
+        if self.emails:
+            result["emails"] += sum(1 for _ in EMAIL_REGEX.finditer(lowered))
+        return result
+
+    def scan_chunks(self, chunks, result=None) -> dict:
+        """
+        Потоковый вариант scan: принимает фрагменты текста (например, из
+        iter_text_chunks) и не держит документ в памяти целиком.
+
+        Хвост каждого фрагмента после последнего перевода строки переносится
+        в начало следующего: ни номера, ни e-mail не содержат перевода строки,
+        поэтому совпадения на стыке фрагментов не теряются и не считаются дважды.
+        """
+        if result is None:
+            result = self.new_result()
+        carry = ""
+        for chunk in chunks:
+            if not chunk:
+                continue
+            text = carry + chunk if carry else chunk
+            cut = text.rfind("\n") + 1
+            if cut == 0:
+                if len(text) < MAX_CARRY:
+                    carry = text
+                    continue
+                cut = _fallback_cut(text)
+            self.scan(text[:cut], result)
+            carry = text[cut:]
+        if carry:
+            self.scan(carry, result)
+        return result
+
+    def _scan_keywords(self, lowered, result):
+        hits = result["keywords"]
+        found = Counter()
+        if self.keyword_regex is not None:
+            # findall + Counter считают совпадения без цикла на Python
+            for w, n in Counter(self.keyword_regex.findall(lowered)).items():
+                found[w] += n
+                for prefix in self._prefixes[w]:
+                    found[prefix] += n
+
+        for w, regex in self._abbreviations:
+            for m in regex.finditer(lowered):
+                start, end = m.span()
+                if (start and _is_word_char(lowered[start - 1])) or (end < len(lowered) and _is_word_char(lowered[end])):
+                    continue
+                found[w] += 1
+
+        for w, n in found.items():
+            word = self._canonical[w]
+            hits[word] = hits.get(word, 0) + n
+            result["keyword_matches"] += n
+
+    def _scan_numbers(self, lowered, result):
+        for m in NUMBER_REGEX.finditer(lowered):
+            start = m.start()
+            if start and _is_word_char(lowered[start - 1]):
+                continue
+            kind = _classify_token(m.group())
+            if kind == "card":
+                result["card_numbers"] += 1
+            elif kind == "inn":
+                result["inn_numbers"] += 1
+            elif kind == "passport":
+                result["passport_numbers"] += 1
+            if not self.count_numbers and all(result[name] for name in FLAG_NUMBERS):
+                return
+
+
+def _classify_token(token: str):
+    """
+    Проверяет найденную цепочку цифр целиком, а если она не прошла проверку —
+    ищет внутри неё подряд идущие группы цифр, образующие номер
+    (например, паспорт "4510 123456" в строке таблицы "4510 123456 01").
+    Карты и ИНН защищены контрольной суммой и могут складываться из любых
+    групп; паспорт — только из одной группы в 10 цифр или групп 4 + 6.
+    """
+    groups = _SEPARATORS.split(token)
+    kind = classify_number("".join(groups), groups)
+    if kind or len(groups) == 1:
+        return kind
+
+    for i in range(len(groups)):
+        digits = ""
+        for j in range(i, len(groups)):
+            digits += groups[j]
+            if len(digits) > 19:
+                break
+            if (i, j) == (0, len(groups) - 1):
+                continue
+            if len(digits) >= 10:
+                kind = classify_number(digits, groups[i:j + 1])
+                if kind:
+                    return kind
+    return None
+
+
+def _is_abbreviation(word: str) -> bool:
+    return len(word) > 1 and word.isupper()
+
+
+def _fallback_cut(text: str) -> int:
+    """
+    Точка разреза для очень длинной строки без переводов строки: последний
+    пробельный символ, не соседствующий с цифрами (не внутри номера).
+    """
+    for i in range(len(text) - 1, max(len(text) - 4096, 0), -1):
+        if text[i].isspace() and not text[i - 1].isdigit() and (i + 1 == len(text) or not text[i + 1].isdigit()):
+            return i + 1
+    return len(text)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
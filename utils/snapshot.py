@@ -0,0 +1,78 @@
+# utils/snapshot.py
+
+import time
+import datetime
+from collections import namedtuple
+
+# Сведения о процессе, нужные сборщикам признаков
+ProcessInfo = namedtuple("ProcessInfo", ["pid", "name", "create_time"])
+
+
+class SystemSnapshot:
+    """
+    Снимок состояния системы на один тик, общий для всех сборщиков признаков.
+
+    Время фиксируется при создании снимка; остальные представления (процессы,
+    соединения, разделы дисков, счётчики сети) запрашиваются у psutil при
+    первом обращении и запоминаются, поэтому за тик каждый обход /proc
+    выполняется не более одного раза, а все признаки тика относятся к одному
+    моменту.
+
+    Для отладки и проверок представления можно передать готовыми:
+    SystemSnapshot(now=..., processes=[ProcessInfo(...)], connections=[...]).
+    """
+
+    def __init__(self, now=None, **views):
+        self.time = time.time() if now is None else now
+        self._views = dict(views)
+
+    @property
+    def now(self) -> datetime.datetime:
+        """Локальное время снимка."""
+        return self._memo("now", lambda: datetime.datetime.fromtimestamp(self.time))
+
+    def processes(self) -> list:
+        """Процессы системы: список ProcessInfo (имя — как сообщает система)."""
+        return self._memo("processes", _list_processes)
+
+    def connections(self) -> list:
+        """Сетевые соединения IPv4/IPv6 (psutil.net_connections(kind="inet"))."""
+        return self._memo("connections", lambda: _psutil().net_connections(kind="inet"))
+
+    def partitions(self) -> list:
+        """Смонтированные разделы физических устройств (psutil.disk_partitions())."""
+        return self._memo("partitions", lambda: _psutil().disk_partitions(all=False))
+
+    def net_io_counters(self, pernic=False):
+        """Суммарные счётчики сетевого ввода-вывода; pernic=True — {интерфейс: счётчики}."""
+        if pernic:
+            return self._memo("net_io_counters_pernic", lambda: _psutil().net_io_counters(pernic=True))
+        return self._memo("net_io_counters", lambda: _psutil().net_io_counters())
+
+    def cpu_percent(self) -> float:
+        """
+        Загрузка ЦП системы в процентах с прошлого запроса (psutil.cpu_percent);
+        первый запрос после запуска возвращает 0.0.
+        """
+        return self._memo("cpu_percent", lambda: _psutil().cpu_percent(interval=None))
+
+    def _memo(self, name, loader):
+        if name not in self._views:
+            self._views[name] = loader()
+        return self._views[name]
+
+
+def _psutil():
+    import psutil
+    return psutil
+
+
+def _list_processes():
+    psutil = _psutil()
+    processes = []
+    for proc in psutil.process_iter(["name", "create_time"]):
+        info = proc.info
+        if info["create_time"] is None:
+            continue
+        processes.append(ProcessInfo(proc.pid, info["name"] or "", info["create_time"]))
+    return processes
@@ -0,0 +1,333 @@
+# utils/telemetry.py
+#
+# Собственные метрики агента: счётчики, гистограммы длительностей и значения,
+# снимаемые при запросе (статистика кэшей, очереди отправки и т. п.).
+# Отдаются по HTTP в текстовом формате Prometheus (GET /metrics) и, при
+# SEND_AGENT_HEALTH, кратко — группой agent_health в образце.
+#
+# Профилирование одного интервала отправки: создать файл PROFILE_TRIGGER_FILE;
+# следующий интервал будет записан выборочным профилировщиком в PROFILE_DIR
+# (формат collapsed stacks, для flamegraph.pl / speedscope).
+
+import os
+import sys
+import time
+import bisect
+import threading
+from collections import Counter, defaultdict
+from contextlib import ContextDecorator
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Границы корзин гистограмм длительностей (в секундах)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PREFIX = "dlp_"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Хранилище метрик. Ключ метрики — имя и метки (name, (("метка", "значение"), ...)).
+    Запись — словарь под одной блокировкой (порядка микросекунды на операцию).
+    """
+
+    def __init__(self):
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._sources = {}        # имя -> функция, возвращающая словарь чисел
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def add_source(self, name, func):
+        """Значения func() (числовые поля словаря) отдаются как dlp_<name>_<поле> при каждом запросе."""
+        self._sources[name] = func
+
+    def counter(self, name, **labels) -> float:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def histogram(self, name, **labels):
+        """(число наблюдений, сумма) гистограммы или (0, 0.0)."""
+        histogram = self._histograms.get((name, tuple(sorted(labels.items()))))
+        return (histogram.count, histogram.sum) if histogram else (0, 0.0)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus 0.0.4."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (h.buckets, list(h.counts), h.sum, h.count)) for key, h in self._histograms.items()
+            )
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {PREFIX}{name} {self._help[name]}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{PREFIX}{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(list(buckets) + ["+Inf"], counts):
+                cumulative += n
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {count}")
+        for source, values in sorted(self._read_sources().items()):
+            for field, value in sorted(values.items()):
+                name = f"{source}_{field}"
+                declare(name, "gauge")
+                lines.append(f"{PREFIX}{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _read_sources(self) -> dict:
+        result = {}
+        for name, func in list(self._sources.items()):
+            try:
+                values = func() or {}
+            except Exception:
+                continue
+            result[name] = {k: v for k, v in values.items()
+                            if isinstance(v, (int, float)) and not isinstance(v, bool)}
+        return result
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        text = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{text}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = Registry()
+
+
+def inc(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+class timed(ContextDecorator):
+    """
+    Замер длительности блока или функции в гистограмму:
+        with timed("stage_seconds", stage="extract"): ...
+        @timed("stage_seconds", stage="classify")
+    """
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+        self._starts = threading.local()
+
+    def __enter__(self):
+        stack = getattr(self._starts, "stack", None)
+        if stack is None:
+            stack = self._starts.stack = []
+        stack.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self._starts.stack.pop(), **self.labels)
+        return False
+
+
+def process_stats() -> dict:
+    """Ресурсы процесса агента: процессорное время, RSS (пиковый, где доступен), число потоков."""
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu, rss_mb = usage.ru_utime + usage.ru_stime, usage.ru_maxrss / 1024
+    except ImportError:
+        # Windows: модуля resource нет, текущий RSS — через psutil
+        import psutil
+        proc = psutil.Process()
+        times = proc.cpu_times()
+        cpu, rss_mb = times.user + times.system, proc.memory_info().rss / 1024 / 1024
+    return {
+        "cpu_seconds": round(cpu, 3),
+        "max_rss_mb": round(rss_mb, 1),
+        "threads": threading.active_count(),
+    }
+
+
+REGISTRY.add_source("process", process_stats)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Запускает HTTP-сервер метрик в фоновом потоке; возвращает сервер или None при ошибке."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Не удалось открыть порт метрик {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="dlp-metrics", daemon=True).start()
+    return server
+
+
+class HealthTracker:
+    """
+    Краткая сводка о работе агента за интервал отправки (группа agent_health):
+    длительность самого долгого сборщика, процессорное время агента за интервал,
+    пиковый RSS, длина очереди отправки, число устаревших групп и задач,
+    отложенных из-за исчерпания бюджета ресурсов.
+    """
+
+    def __init__(self, registry=REGISTRY, queue_length=None, deferred=None):
+        self.registry = registry
+        self.queue_length = queue_length
+        self.deferred = deferred
+        self._cpu = None
+
+    def sample(self, durations: dict, stale=()) -> dict:
+        stats = process_stats()
+        cpu = stats["cpu_seconds"]
+        cpu_delta = cpu - self._cpu if self._cpu is not None else 0.0
+        self._cpu = cpu
+        return {
+            "tick_max_collector_sec": round(max(durations.values(), default=0.0), 3),
+            "cpu_sec": round(cpu_delta, 3),
+            "max_rss_mb": stats["max_rss_mb"],
+            "send_queue": self.queue_length() if self.queue_length else 0,
+            "stale_groups": len(stale),
+            "deferred_work": self.deferred() if self.deferred else 0,
+        }
+
+
+class SamplingProfiler:
+    """
+    Выборочный профилировщик: раз в interval секунд снимает стеки всех потоков
+    (sys._current_frames) и считает одинаковые стеки. Результат — строки
+    "поток;модуль:функция;... число" (collapsed stacks).
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="dlp-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> list:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+
+    def _loop(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+class TickProfiler:
+    """
+    Профилирование по запросу: если есть файл trigger_file, следующий интервал
+    отправки (от вызова on_sample до следующего) записывается профилировщиком
+    в output_dir, а файл-триггер удаляется.
+    """
+
+    def __init__(self, trigger_file, output_dir, interval=0.005):
+        self.trigger_file = trigger_file
+        self.output_dir = output_dir
+        self.interval = interval
+        self._profiler = None
+
+    def on_sample(self):
+        """Вызывается на границе интервала отправки."""
+        if self._profiler is not None:
+            lines = self._profiler.stop()
+            samples = self._profiler.samples
+            self._profiler = None
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, time.strftime("tick-%Y%m%d-%H%M%S.folded"))
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            print(f"⏱️ Профиль интервала записан: {path} (выборок: {samples})")
+        elif self.trigger_file and os.path.exists(self.trigger_file):
+            try:
+                os.remove(self.trigger_file)
+            except OSError:
+                pass
+            self._profiler = SamplingProfiler(self.interval).start()
+            print("⏱️ Профилирование следующего интервала отправки")
@@ -1,49 +1,132 @@
 from pathlib import Path
-import os
+import codecs
+import importlib
+import importlib.util
+from config import EXTRACT_MAX_BYTES, EXTRACT_MAX_PAGES
 
-# .docx
-try:
-    from docx import Document
-except ImportError:
-    Document = None
+# Библиотеки разбора документов импортируются при первом документе своего типа:
+# .docx — python-docx, .pdf — PyMuPDF (fitz)
+_EXTENSION_MODULES = {".docx": "docx", ".pdf": "fitz"}
+_modules = {}
 
-# .pdf
-try:
-    import fitz  # PyMuPDF
-except ImportError:
-    fitz = None
 
-def extract_text_from_file(path: str) -> str | None:
+def _load(name):
+    """Импортирует модуль при первом обращении; None — модуль не установлен."""
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.import_module(name)
+        except ImportError:
+            _modules[name] = None
+    return _modules[name]
+
+
+def _available(name) -> bool:
+    if name in _modules:
+        return _modules[name] is not None
+    return importlib.util.find_spec(name) is not None
+
+
+def warm_up():
+    """Заранее импортирует библиотеки разбора документов."""
+    for name in _EXTENSION_MODULES.values():
+        _load(name)
+
+
+# Размер блока при потоковом чтении .txt (в байтах) и ориентир для размера фрагментов .docx
+CHUNK_SIZE = 256 * 1024
+
+# Версия логики извлечения текста (входит в ключ кэша анализа документов)
+EXTRACTOR_VERSION = f"2:{EXTRACT_MAX_BYTES}:{EXTRACT_MAX_PAGES}"
+
+
+def is_supported(path: str) -> bool:
+    """Можно ли извлечь текст из файла с таким расширением."""
+    ext = Path(path).suffix.lower()
+    return ext == ".txt" or (ext in _EXTENSION_MODULES and _available(_EXTENSION_MODULES[ext]))
+
+
+def iter_text_chunks(path: str, max_bytes: int = EXTRACT_MAX_BYTES, max_pages: int = EXTRACT_MAX_PAGES):
     """
-    Универсальный интерфейс для извлечения текста из поддерживаемых типов файлов.
+    Потоковое извлечение текста: генератор фрагментов, память не зависит от размера файла.
+
+    .txt — декодированные блоки по CHUNK_SIZE байт, .pdf — по странице,
+    .docx — группы абзацев. max_bytes ограничивает объём извлекаемого текста
+    (байты файла для .txt, символы текста для .pdf/.docx), max_pages — число
+    страниц PDF. Фрагменты не перекрываются; совпадения на стыках сохраняют
+    потребители (см. SensitiveDataScanner.scan_chunks).
+    Ошибка чтения завершает поток без исключения.
     """
     ext = Path(path).suffix.lower()
+    if ext == ".txt":
+        chunks = iter_txt_chunks(path, max_bytes)
+    elif ext == ".docx" and _load("docx"):
+        chunks = iter_docx_chunks(path, max_bytes)
+    elif ext == ".pdf" and _load("fitz"):
+        chunks = iter_pdf_chunks(path, max_bytes, max_pages)
+    else:
+        return
     try:
-        if ext == ".txt":
-            return extract_from_txt(path)
-        elif ext == ".docx" and Document:
-            return extract_from_docx(path)
-        elif ext == ".pdf" and fitz:
-            return extract_from_pdf(path)
-        else:
-            return None
+        yield from chunks
     except Exception:
+        return
+
+
+def extract_text_from_file(path: str) -> str | None:
+    """
+    Универсальный интерфейс для извлечения текста из поддерживаемых типов файлов.
+    Собирает весь текст в памяти (в пределах бюджетов); для больших файлов
+    используйте iter_text_chunks.
+    """
+    if not is_supported(path):
         return None
+    return "".join(iter_text_chunks(path)) or None
 
 
-def extract_from_txt(path: str) -> str:
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        return f.read()
+def iter_txt_chunks(path: str, max_bytes: int):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    remaining = max_bytes
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(min(CHUNK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            text = decoder.decode(block)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
 
 
-def extract_from_docx(path: str) -> str:
-    doc = Document(path)
-    return "\n".join(p.text for p in doc.paragraphs)
+def iter_docx_chunks(path: str, max_bytes: int):
+    doc = _load("docx").Document(path)
+    parts = []
+    size = 0
+    produced = 0
+    for p in doc.paragraphs:
+        text = p.text + "\n"
+        if produced + len(text) > max_bytes:
+            text = text[:max_bytes - produced]
+        parts.append(text)
+        size += len(text)
+        produced += len(text)
+        if size >= CHUNK_SIZE:
+            yield "".join(parts)
+            parts, size = [], 0
+        if produced >= max_bytes:
+            break
+    if parts:
+        yield "".join(parts)
 
 
-def extract_from_pdf(path: str) -> str:
-    text = ""
-    with fitz.open(path) as pdf:
-        for page in pdf:
-            text += page.get_text()
-    return text
+def iter_pdf_chunks(path: str, max_bytes: int, max_pages: int):
+    produced = 0
+    with _load("fitz").open(path) as pdf:
+        for number, page in enumerate(pdf):
+            if number >= max_pages or produced >= max_bytes:
+                break
+            text = page.get_text()[:max_bytes - produced]
+            produced += len(text)
+            if text:
+                yield text
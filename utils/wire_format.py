@@ -0,0 +1,300 @@
+# utils/wire_format.py
+#
+# Компактный двоичный формат образцов признаков (альтернатива JSON).
+#
+# Кадр (все числа little-endian):
+#   b"DW" | версия формата u8 | флаги u8 | версия схемы u16 |
+#   номер образца u32 | номер базового образца u32 | время u32 |
+#   маска групп u8 | длина user_id u8 | user_id (UTF-8) |
+#   число записей u16 | записи: id признака u16 + значение (i32 или f32) |
+#   длина дополнения u16 | дополнение (JSON: stale_groups, неизвестные признаки)
+#
+# Полный кадр опускает нулевые признаки, разностный (флаг DELTA) — признаки,
+# не изменившиеся относительно базового образца, последнего подтверждённого
+# сервером. Пачка — кадры с префиксом длины u32, каждый следующий кадр
+# разностный относительно предыдущего.
+#
+# Сервер включает формат заголовком ответа X-DLP-Wire: 1 (см. utils/sender.py).
+
+import json
+import struct
+import calendar
+import datetime
+
+FORMAT_VERSION = 1
+SCHEMA_VERSION = 2
+CONTENT_TYPE = "application/x-dlp-wire"
+# Заголовок ответа, которым сервер сообщает о поддержке формата
+NEGOTIATION_HEADER = "X-DLP-Wire"
+
+FLAG_DELTA = 1
+
+_MAGIC = b"DW"
+_HEADER = struct.Struct("<2sBBHIIIBB")
+_COUNT = struct.Struct("<H")
+_FRAME_LEN = struct.Struct("<I")
+_INT = struct.Struct("<Hi")
+_FLOAT = struct.Struct("<Hf")
+_F32 = struct.Struct("<f")
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+# Признаки с плавающей точкой округлены до тысячных: в поле f32 записывается
+# только значение, которое после округления восстанавливается точно
+FLOAT_DIGITS = 3
+
+# Схема: группа -> признаки (имя, тип) в порядке README.
+# Идентификаторы назначаются по порядку и не меняются: новые признаки
+# добавляются только в конец списка группы с увеличением SCHEMA_VERSION.
+SCHEMA = {
+    "file_activity": [
+        ("file_create_count", "i"), ("file_update_count", "i"), ("file_delete_count", "i"),
+        ("file_access_sensitive_docs", "i"), ("file_sensitive_word_matches", "i"),
+        ("file_contains_card_number", "i"), ("file_contains_passport_data", "i"),
+        ("file_confidentiality_score", "f"), ("archive_created_count", "i"),
+        ("file_permission_changed_count", "i"), ("file_system_update_count", "i"),
+    ],
+    "network_activity": [
+        ("visited_webmail_allowed", "i"), ("visited_file_sharing_allowed", "i"),
+        ("http_requests_count", "i"), ("upload_volume_MB", "f"), ("distinct_domains_accessed", "i"),
+        ("visited_webmail", "i"), ("visited_file_sharing_site", "i"), ("vpn_activated", "i"),
+        ("proxy_used", "i"), ("external_ip_contacted", "i"), ("site_contains_sensitive_words", "i"),
+        ("dns_request_count", "i"), ("suspicious_dns_queries", "i"), ("non_http_traffic_count", "i"),
+        ("used_ftp_or_smtp", "i"), ("upload_spike_detected", "i"), ("visited_risky_category_sites", "i"),
+        ("site_category_diversity", "i"), ("external_upload_without_web_activity", "i"),
+        ("site_semantic_risk_score", "f"),
+    ],
+    "process_activity": [
+        ("process_count", "i"), ("unknown_processes_started", "i"), ("admin_tools_used", "i"),
+        ("time_in_terminal_sec", "i"), ("automation_tool_detected", "i"), ("screen_capture_tools_used", "i"),
+    ],
+    "usb_activity": [
+        ("usb_devices_connected", "i"), ("usb_vendor_blacklisted", "i"), ("usb_file_copy_count", "i"),
+        ("usb_copy_volume_MB", "f"), ("usb_executable_found", "i"), ("usb_encrypted_volume_found", "i"),
+        ("usb_access_outside_hours", "i"),
+    ],
+    "behavioral_context": [
+        ("activity_outside_work_hours", "i"), ("activity_weekend_hours", "i"),
+        ("clipboard_sensitive_matches", "i"),
+        # Схема 2
+        ("clipboard_sensitive_events", "i"),
+    ],
+}
+
+GROUPS = list(SCHEMA)
+# (группа, имя) -> (id, тип) и обратно
+_IDS = {}
+_BY_ID = {}
+for _group in GROUPS:
+    for _name, _kind in SCHEMA[_group]:
+        _IDS[(_group, _name)] = (len(_BY_ID) + 1, _kind)
+        _BY_ID[len(_BY_ID) + 1] = (_group, _name, _kind)
+
+
+class WireError(ValueError):
+    """Кадр повреждён, другой версии или не согласуется с базовым образцом."""
+
+
+def encode(payload: dict, seq: int, base: dict = None, base_seq: int = 0) -> bytes:
+    """
+    Кодирует образец {"user_id", "timestamp", "features", ...} в кадр.
+    base — базовый образец (тогда кадр разностный относительно него).
+    """
+    features = payload.get("features", {})
+    base_features = base.get("features", {}) if base else {}
+    entries = []
+    extra = {k: v for k, v in payload.items() if k not in ("user_id", "timestamp", "features")}
+    unknown = {}
+    group_mask = 0
+
+    for bit, group in enumerate(GROUPS):
+        values = features.get(group)
+        if values is None:
+            continue
+        group_mask |= 1 << bit
+        previous = base_features.get(group, {})
+        for name, value in values.items():
+            spec = _IDS.get((group, name))
+            if spec is None or not _fits(value, spec[1]):
+                # Признак вне схемы или значение не помещается в поле — передаётся в дополнении
+                unknown.setdefault(group, {})[name] = value
+                continue
+            reference = previous.get(name, 0) if base else 0
+            if value != reference:
+                entries.append((spec, value))
+    for group, values in features.items():
+        if group not in SCHEMA:
+            unknown[group] = values
+    if unknown:
+        extra["_unknown_features"] = unknown
+
+    user_id = str(payload.get("user_id", "")).encode("utf-8")[:255]
+    parts = [
+        _HEADER.pack(_MAGIC, FORMAT_VERSION, FLAG_DELTA if base else 0, SCHEMA_VERSION,
+                     seq, base_seq if base else 0, _encode_time(payload.get("timestamp")),
+                     group_mask, len(user_id)),
+        user_id,
+        _COUNT.pack(len(entries)),
+    ]
+    for (feature_id, kind), value in entries:
+        parts.append(_INT.pack(feature_id, int(value)) if kind == "i" else _FLOAT.pack(feature_id, value))
+    trailer = json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8") if extra else b""
+    if len(trailer) > 0xFFFF:
+        raise WireError(f"дополнение кадра длиннее 65535 байт: {len(trailer)}")
+    parts.append(_COUNT.pack(len(trailer)))
+    parts.append(trailer)
+    return b"".join(parts)
+
+
+def decode(data: bytes, base: dict = None):
+    """
+    Декодирует кадр; возвращает (образец, номер, номер базового образца).
+    Для разностного кадра нужен base — образец с номером базового.
+    """
+    try:
+        magic, version, flags, schema, seq, base_seq, timestamp, group_mask, user_len = _HEADER.unpack_from(data)
+    except struct.error as e:
+        raise WireError(f"кадр повреждён: {e}")
+    if magic != _MAGIC or version != FORMAT_VERSION:
+        raise WireError(f"неподдерживаемый кадр (версия {version})")
+    if schema > SCHEMA_VERSION:
+        raise WireError(f"неизвестная версия схемы: {schema}")
+    if flags & FLAG_DELTA and base is None:
+        raise WireError(f"нет базового образца {base_seq}")
+
+    position = _HEADER.size
+    user_id = data[position:position + user_len].decode("utf-8")
+    position += user_len
+    (count,) = _COUNT.unpack_from(data, position)
+    position += _COUNT.size
+
+    base_features = base.get("features", {}) if flags & FLAG_DELTA else {}
+    features = {}
+    for bit, group in enumerate(GROUPS):
+        if group_mask & (1 << bit):
+            previous = base_features.get(group, {})
+            features[group] = {name: previous.get(name, 0.0 if kind == "f" else 0) for name, kind in SCHEMA[group]}
+
+    for _ in range(count):
+        (feature_id,) = struct.unpack_from("<H", data, position)
+        group, name, kind = _BY_ID.get(feature_id, (None, None, "i"))
+        if kind == "i":
+            _, value = _INT.unpack_from(data, position)
+        else:
+            _, value = _FLOAT.unpack_from(data, position)
+            value = round(value, FLOAT_DIGITS)
+        position += _INT.size
+        if group in features:
+            features[group][name] = value
+
+    (trailer_len,) = _COUNT.unpack_from(data, position)
+    position += _COUNT.size
+    extra = json.loads(data[position:position + trailer_len]) if trailer_len else {}
+    for group, values in extra.pop("_unknown_features", {}).items():
+        features.setdefault(group, {}).update(values)
+
+    payload = {"user_id": user_id, "timestamp": _decode_time(timestamp), "features": features}
+    payload.update(extra)
+    return payload, seq, base_seq if flags & FLAG_DELTA else 0
+
+
+def encode_batch(payloads, first_seq: int, base: dict = None, base_seq: int = 0) -> bytes:
+    """Пачка кадров: первый — относительно base, каждый следующий — относительно предыдущего."""
+    parts = []
+    seq = first_seq
+    for payload in payloads:
+        frame = encode(payload, seq, base, base_seq)
+        parts.append(_FRAME_LEN.pack(len(frame)))
+        parts.append(frame)
+        base, base_seq = payload, seq
+        seq += 1
+    return b"".join(parts)
+
+
+def decode_batch(data: bytes, base: dict = None) -> list:
+    """Декодирует пачку; возвращает список (образец, номер, номер базового образца)."""
+    result = []
+    position = 0
+    while position < len(data):
+        (length,) = _FRAME_LEN.unpack_from(data, position)
+        position += _FRAME_LEN.size
+        payload, seq, base_seq = decode(data[position:position + length], base)
+        position += length
+        result.append((payload, seq, base_seq))
+        base = payload
+    return result
+
+
+class WireEncoder:
+    """
+    Состояние отправителя: номер следующего кадра и последний образец,
+    подтверждённый сервером (база для разностного кодирования).
+    """
+
+    def __init__(self):
+        self.next_seq = 1
+        self._acked = None
+        self._acked_seq = 0
+        self._pending = None
+
+    def encode_batch(self, payloads) -> bytes:
+        data = encode_batch(payloads, self.next_seq, self._acked, self._acked_seq)
+        self._pending = (payloads[-1], self.next_seq + len(payloads) - 1)
+        self.next_seq += len(payloads)
+        return data
+
+    def ack(self):
+        """Сервер принял последнюю пачку: её последний образец становится базой."""
+        if self._pending is not None:
+            self._acked, self._acked_seq = self._pending
+            self._pending = None
+
+    def reset(self):
+        """Сервер не знает базовый образец: следующая пачка начнётся с полного кадра."""
+        self._acked, self._acked_seq, self._pending = None, 0, None
+
+
+class WireDecoder:
+    """Состояние приёмника: последний принятый образец каждого user_id."""
+
+    def __init__(self):
+        self._last = {}   # user_id -> (номер, образец)
+
+    def decode_batch(self, data: bytes) -> list:
+        """Декодирует пачку; WireError — базовый образец неизвестен (ответить 409)."""
+        if len(data) < _FRAME_LEN.size + _HEADER.size:
+            raise WireError("пустой кадр")
+        first = data[_FRAME_LEN.size:]
+        _, _, flags, _, _, base_seq, _, _, user_len = _HEADER.unpack_from(first)
+        user_id = first[_HEADER.size:_HEADER.size + user_len].decode("utf-8")
+        base = None
+        if flags & FLAG_DELTA:
+            last = self._last.get(user_id)
+            if last is None or last[0] != base_seq:
+                raise WireError(f"нет базового образца {base_seq} для {user_id}")
+            base = last[1]
+        frames = decode_batch(data, base)
+        payload, seq, _ = frames[-1]
+        self._last[user_id] = (seq, payload)
+        return [payload for payload, _, _ in frames]
+
+
+def _fits(value, kind) -> bool:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    if kind == "i":
+        return value == int(value) and -2 ** 31 <= value < 2 ** 31
+    # f32 хранит ~7 значащих цифр: большие значения и значения точнее тысячных
+    # (например, 12345.67 или 0.12345) передаются в дополнении без потерь
+    return abs(value) < 3.4e38 and round(_F32.unpack(_F32.pack(value))[0], FLOAT_DIGITS) == value
+
+
+def _encode_time(timestamp) -> int:
+    if not timestamp:
+        return 0
+    # Время агента локальное и без пояса; кодируется как есть (как если бы это было UTC)
+    return calendar.timegm(datetime.datetime.strptime(timestamp, TIMESTAMP_FORMAT).timetuple())
+
+
+def _decode_time(value: int) -> str:
+    if not value:
+        return ""
+    return (datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=value)).strftime(TIMESTAMP_FORMAT)